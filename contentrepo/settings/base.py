@@ -200,6 +200,69 @@ if "REDIS_LOCATION" in os.environ:
     os.environ["CACHE_URL"] = os.environ["REDIS_LOCATION"]
 
 CACHES = {"default": env.cache("CACHE_URL", default="redis://127.0.0.1:6379/1")}
+# How long (in seconds) rendered API page responses are cached for. Entries are also
+# invalidated whenever content is published, so this is just an upper bound. Set to
+# 0 to disable the response cache.
+API_CACHE_TIMEOUT = env.int("API_CACHE_TIMEOUT", 60 * 60)
+# How long (in seconds) changes wait before they're listed by the changes API, so
+# that changes committed out of order aren't skipped. See home/changes.py
+CHANGES_DELAY = env.float("CHANGES_DELAY", 5)
+
+# How page views are saved, one of "sync", "memory" or "redis". See
+# home/page_view_ingestion.py for details.
+PAGE_VIEW_INGESTION = env.str("PAGE_VIEW_INGESTION", "sync")
+# The maximum number of buffered page views to save in a single insert
+PAGE_VIEW_BATCH_SIZE = env.int("PAGE_VIEW_BATCH_SIZE", 500)
+# The maximum time (in seconds) buffered page views wait before they're saved
+PAGE_VIEW_FLUSH_INTERVAL = env.float("PAGE_VIEW_FLUSH_INTERVAL", 5)
+# How many days before the latest page view count to recount from, so that page views
+# saved late are still counted
+PAGE_VIEW_ROLLUP_LOOKBACK_DAYS = env.int("PAGE_VIEW_ROLLUP_LOOKBACK_DAYS", 2)
+# The PageView data keys that can be filtered on in the page views API. Filters on
+# these keys use the index on the data field, filters on any other key return a 400
+PAGE_VIEW_INDEXED_DATA_KEYS = env.list("PAGE_VIEW_INDEXED_DATA_KEYS", default=["user"])
+# How old (in seconds) rows need to be before they're included in the page view and
+# rating exports, so that rows saved late, e.g. buffered page views, aren't skipped.
+# Should be longer than PAGE_VIEW_FLUSH_INTERVAL. See home/data_export.py
+DATA_EXPORT_DELAY = env.float("DATA_EXPORT_DELAY", 60)
+# How many rows the page view and rating exports fetch from the database at a time
+DATA_EXPORT_CHUNK_SIZE = env.int("DATA_EXPORT_CHUNK_SIZE", 2000)
+# On Postgres, page views and ratings are partitioned by month, see
+# home/partitions.py. How many months ahead `maintain_partitions` creates partitions
+# for, how many months of partitions it keeps (unset keeps everything), and where it
+# saves the archived partitions.
+PARTITION_MONTHS_AHEAD = env.int("PARTITION_MONTHS_AHEAD", 3)
+PARTITION_RETENTION_MONTHS = env.int("PARTITION_RETENTION_MONTHS", None)
+PARTITION_ARCHIVE_DIR = env.path("PARTITION_ARCHIVE_DIR", BASE_DIR / "archives")
+# Where uploaded imports are run, either "thread" or "worker". See
+# home/import_jobs.py for details.
+IMPORT_JOB_RUNNER = env.str("IMPORT_JOB_RUNNER", "thread")
+# How long (in seconds) a running import's lease lasts. The lease is renewed while the
+# import runs, so an import whose lease has expired has stopped
+IMPORT_JOB_TIMEOUT = env.int("IMPORT_JOB_TIMEOUT", 10 * 60)
+# How often (in seconds) the `run_import_jobs` worker checks for new jobs
+IMPORT_JOB_POLL_INTERVAL = env.float("IMPORT_JOB_POLL_INTERVAL", 2)
+# Split content imports for every locale into a job for each locale, so that they
+# can be imported at the same time. Each locale is imported in its own transaction.
+# Imports that purge existing content aren't split. See home/import_jobs.py for details.
+IMPORT_PARTITION_BY_LOCALE = env.bool("IMPORT_PARTITION_BY_LOCALE", False)
+# How many locales content exports export at the same time, each in a thread with
+# its own database connection. With more than one, the rows of the locales that
+# aren't being sent yet are kept in memory.
+EXPORT_LOCALE_WORKERS = env.int("EXPORT_LOCALE_WORKERS", 1)
+# The Postgres text search configuration to use for each language code when searching
+# content pages, e.g. "zu=simple,pt=portuguese". These are added to the defaults in
+# home/search.py
+SEARCH_LANGUAGE_CONFIGS = env.dict("SEARCH_LANGUAGE_CONFIGS", default={})
+# The admin, template and form searches use Wagtail's database search backend, which
+# uses Postgres full-text search on Postgres. Unset uses the database's default text
+# search configuration.
+WAGTAILSEARCH_BACKENDS = {
+    "default": {
+        "BACKEND": "wagtail.search.backends.database",
+        "SEARCH_CONFIG": env.str("WAGTAILSEARCH_CONFIG", None),
+    }
+}
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
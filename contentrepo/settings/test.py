@@ -1,7 +1,11 @@
+import tempfile
+
 from .dev import *  # noqa
 
 DATABASES = {"default": env.db("CONTENTREPO_DATABASE", default="sqlite://:memory:")}
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
+# Keep the images, documents and media that tests upload out of the project
+MEDIA_ROOT = tempfile.mkdtemp(prefix="contentrepo-test-media-")
 
 WHATSAPP_API_URL = "http://whatsapp"
 WHATSAPP_ACCESS_TOKEN = "fake-access-token"  # noqa: S105 (This is a test config.)
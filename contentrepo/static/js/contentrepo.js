@@ -3,6 +3,7 @@ getUploadStateInterval = null;
 function getUploadState(){
  $.getJSON({
   url: importURL,
+  data: {job: importJobId},
   success: function(response){
    if(!response.loading){
     window.location.href = destinationURL;
@@ -19,6 +20,13 @@ function getUploadState(){
           );
       });
     }
+   if(response.locales) {
+      $("#localeProgress").text(
+        Object.entries(response.locales)
+          .map(([code, progress]) => code + ": " + progress + "%")
+          .join(", ")
+      );
+    }
   }
  });
 }
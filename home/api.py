@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.exceptions import NotFound
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
@@ -9,7 +10,15 @@ from wagtail.images.api.v2.views import ImagesAPIViewSet
 from wagtail.models import Locale
 from wagtailmedia.api.views import MediaAPIViewSet
 
-from .models import Assessment, AssessmentTag, OrderedContentSet
+from . import api_cache, conditional_get, trigger_index
+from .drafts import get_latest_drafts, get_latest_stream_data
+from .models import (
+    PROFILE_FIELD_COLUMNS,
+    Assessment,
+    AssessmentTag,
+    OrderedContentSet,
+)
+from .references import ReferenceResolver
 from .serializers import (
     AssessmentSerializer,
     ContentPageSerializer,
@@ -25,7 +34,37 @@ from .models import (  # isort:skip
 from typing import Any
 
 
-class ContentPagesViewSet(PagesAPIViewSet):
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified headers to the listing and detail views, and
+    answers conditional requests with a 304, see home/conditional_get.py
+    """
+
+    def detail_view(self, request, pk):
+        instance = self.get_object()
+        validators = conditional_get.for_object(request, instance)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(instance)
+        return validators.set_headers(Response(serializer.data))
+
+    def listing_view(self, request):
+        # The same as BaseAPIViewSet.listing_view, with the validators from the
+        # filtered queryset, so that the queryset is only built once
+        queryset = self.get_queryset()
+        self.check_query_parameters(queryset)
+        queryset = self.filter_queryset(queryset)
+        validators = conditional_get.for_queryset(request, queryset)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+        queryset = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(queryset, many=True)
+        return validators.set_headers(self.get_paginated_response(serializer.data))
+
+
+class ContentPagesViewSet(ConditionalGetMixin, PagesAPIViewSet):
     base_serializer_class = ContentPageSerializer
     known_query_parameters = PagesAPIViewSet.known_query_parameters.union(
         [
@@ -40,11 +79,22 @@ class ContentPagesViewSet(PagesAPIViewSet):
             "s",
             "sms",
             "ussd",
+            "text",
         ]
     )
 
     pagination_class = PageNumberPagination
 
+    @classmethod
+    def get_urlpatterns(cls):
+        return super().get_urlpatterns() + [
+            path(
+                "resolve_trigger/",
+                cls.as_view({"get": "resolve_trigger_view"}),
+                name="resolve_trigger",
+            ),
+        ]
+
     def detail_view(self, request, pk):
         try:
             if "qa" in request.GET and request.GET["qa"].lower() == "true":
@@ -54,11 +104,75 @@ class ContentPagesViewSet(PagesAPIViewSet):
                 serializer = self.get_serializer(instance)
                 return Response(serializer.data)
             else:
-                ContentPage.objects.get(id=pk).save_page_view(request.query_params)
+                # Only what we need for the page view and the validators, so that
+                # we can answer conditional requests without loading the page
+                page = ContentPage.objects.only(
+                    "live_revision_id", "latest_revision_id", "last_published_at"
+                ).get(id=pk)
+                page.save_page_view(request.query_params)
         except ContentPage.DoesNotExist:
             raise NotFound({"page": ["Page matching query does not exist."]})
 
-        return super().detail_view(request, pk)
+        validators = conditional_get.for_object(request, page)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = api_cache.get_cache_key(request)
+        data = api_cache.get_response(cache_key)
+        if data is not None:
+            return validators.set_headers(Response(data))
+        serializer = self.get_serializer(self.get_object())
+        api_cache.set_response(cache_key, serializer.data)
+        return validators.set_headers(Response(serializer.data))
+
+    def resolve_trigger_view(self, request):
+        """
+        Finds the pages with a trigger or quick reply in a user's message, in one
+        request, rather than one request for each way of writing the trigger. The
+        best matches come first, see `trigger_index.find_matches`, and each page
+        has the trigger or quick reply that it matched.
+        """
+        queryset = self.get_queryset()
+        self.check_query_parameters(queryset)
+        text = request.query_params.get("text", "")
+        locale = request.query_params.get("locale")
+        if locale:
+            language_codes = [locale]
+        else:
+            language_codes = Locale.objects.values_list("language_code", flat=True)
+
+        matches = trigger_index.find_matches(text, language_codes)
+        pages = queryset.in_bulk([match.keyword.page_id for match in matches])
+        matches = [match for match in matches if match.keyword.page_id in pages]
+        serializer = self.get_serializer(
+            [pages[match.keyword.page_id] for match in matches], many=True
+        )
+        results = serializer.data
+        for result, match in zip(results, matches, strict=True):
+            result["match"] = {
+                "name": match.keyword.name,
+                "kind": match.keyword.kind,
+                "exact": match.exact,
+            }
+        return Response({"count": len(results), "results": results})
+
+    def get_serializer_class(self):
+        # Resolving triggers returns the details of more than one page
+        if self.action == "resolve_trigger_view":
+            return self._get_serializer_class(
+                self.request.wagtailapi_router, ContentPage, [], show_details=True
+            )
+        return super().get_serializer_class()
+
+    def get_serializer(self, instance, *args, **kwargs):
+        # Resolve everything the pages we're returning refer to in bulk, rather
+        # than one lookup per page
+        pages = instance if kwargs.get("many") else [instance]
+        context = self.get_serializer_context()
+        context["resolver"] = ReferenceResolver(pages)
+        serializer_class = self.get_serializer_class()
+        return serializer_class(instance, *args, context=context, **kwargs)
 
     def get_queryset(self) -> Any:
         qa = self.request.query_params.get("qa", "").lower() == "true"
@@ -92,7 +206,9 @@ class ContentPagesViewSet(PagesAPIViewSet):
             for t in TriggeredContent.objects.filter(tag__name__iexact=trigger.strip()):
                 ids.append(t.content_object_id)
             queryset = queryset.filter(id__in=ids)
-        return queryset
+        return queryset.select_related(
+            "latest_revision", "live_revision"
+        ).prefetch_related("tags", "triggers", "quick_replies")
 
 
 class ContentPageIndexViewSet(PagesAPIViewSet):
@@ -102,7 +218,24 @@ class ContentPageIndexViewSet(PagesAPIViewSet):
         return ContentPageIndex.objects.live()
 
 
-class OrderedContentSetViewSet(BaseAPIViewSet):
+class DraftListingMixin:
+    """
+    With the `qa` param, listings show the latest revision of each object instead of
+    the live version. Filtering and pagination use the saved objects, and only the
+    objects on the page are swapped for their latest revisions.
+    """
+
+    # The foreign keys the serializer uses
+    draft_related_fields: list[str] = ["locale"]
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.request.query_params.get("qa"):
+            return get_latest_drafts(page, self.draft_related_fields)
+        return page
+
+
+class OrderedContentSetViewSet(ConditionalGetMixin, DraftListingMixin, BaseAPIViewSet):
     model = OrderedContentSet
     base_serializer_class = OrderedContentSetSerializer
     listing_default_fields = BaseAPIViewSet.listing_default_fields + [
@@ -119,60 +252,18 @@ class OrderedContentSetViewSet(BaseAPIViewSet):
     search_fields = ["name", "profile_fields"]
     filter_backends = (SearchFilter,)
 
-    def _filter_queryset_by_profile_fields(
-        self, ocs, gender_value, age_value, relationship_value
-    ):
-        pf_gender = ocs.profile_fields.blocks_by_name("gender")
-        pf_age = ocs.profile_fields.blocks_by_name("age")
-        pf_relationship = ocs.profile_fields.blocks_by_name("relationship")
-
-        pf_gender = pf_gender[0] if len(pf_gender) > 0 else None
-        pf_age = pf_age[0] if len(pf_age) > 0 else None
-        pf_relationship = pf_relationship[0] if len(pf_relationship) > 0 else None
-
-        if gender_value and age_value and relationship_value:
-            if (
-                pf_gender
-                and pf_gender.value == gender_value
-                and pf_age
-                and pf_age.value == age_value
-                and pf_relationship
-                and pf_relationship.value == relationship_value
-            ):
-                return ocs.id
-        elif gender_value and age_value:
-            if (
-                pf_gender
-                and pf_gender.value == gender_value
-                and pf_age
-                and pf_age.value == age_value
-            ):
-                return ocs.id
-        elif gender_value and relationship_value:
-            if (
-                pf_gender
-                and pf_gender.value == gender_value
-                and pf_relationship
-                and pf_relationship.value == relationship_value
-            ):
-                return ocs.id
-        elif age_value and relationship_value:
-            if (
-                pf_age
-                and pf_age.value == age_value
-                and pf_relationship
-                and pf_relationship.value == relationship_value
-            ):
-                return ocs.id
-        elif gender_value:
-            if pf_gender and pf_gender.value == gender_value:
-                return ocs.id
-        elif age_value:
-            if pf_age and pf_age.value == age_value:
-                return ocs.id
-        elif relationship_value:
-            if pf_relationship and pf_relationship.value == relationship_value:
-                return ocs.id
+    def _matches_profile_fields(self, profile_fields, profile_values):
+        """
+        Whether the first value of each profile field matches every given value
+        """
+        values = {}
+        for field in profile_fields:
+            values.setdefault(field["type"], field["value"])
+        return all(
+            values.get(field_name) == value
+            for field_name, value in profile_values.items()
+            if value
+        )
 
     def get_queryset(self):
         qa = self.request.query_params.get("qa")
@@ -181,43 +272,44 @@ class OrderedContentSetViewSet(BaseAPIViewSet):
         relationship = self.request.query_params.get("relationship", "")
         slug = self.request.query_params.get("slug", "")
         locale = self.request.query_params.get("locale", "")
+        profile_values = {"gender": gender, "age": age, "relationship": relationship}
 
         if qa:
-            # return the latest revision for each OrderedContentSet
+            # The latest revisions are swapped in once the listing is paginated
             queryset = OrderedContentSet.objects.all().order_by("latest_revision_id")
-
-            for ocs in queryset:
-                latest_revision = ocs.revisions.order_by("-created_at").first()
-                if latest_revision:
-                    latest_revision = latest_revision.as_object()
-                    ocs.name = latest_revision.name
-                    ocs.pages = latest_revision.pages
-                    ocs.profile_fields = latest_revision.profile_fields
-                    ocs.locale = latest_revision.locale
-                    ocs.slug = latest_revision.slug
-
         else:
             queryset = OrderedContentSet.objects.filter(
                 live=True,
             ).order_by("last_published_at")
 
-        if gender or age or relationship:
-            # it looks like you can't use advanced queries to filter on StreamFields
-            # so we have to do it like this.``
-            filter_ids = [
-                self._filter_queryset_by_profile_fields(x, gender, age, relationship)
-                for x in queryset
-            ]
-            queryset = queryset.filter(id__in=filter_ids).order_by("last_published_at")
         if slug:
             queryset = queryset.filter(slug=slug)
         if locale:
             locale = Locale.objects.get(language_code=locale)
             queryset = queryset.filter(locale=locale)
+
+        if (gender or age or relationship) and qa:
+            # The drafts' profile fields are only in their revisions, so we have to
+            # check them here
+            profile_fields = get_latest_stream_data(queryset, "profile_fields")
+            filter_ids = [
+                pk
+                for pk, fields in profile_fields.items()
+                if self._matches_profile_fields(fields, profile_values)
+            ]
+            queryset = queryset.filter(id__in=filter_ids).order_by("last_published_at")
+        elif gender or age or relationship:
+            queryset = queryset.filter(
+                **{
+                    PROFILE_FIELD_COLUMNS[field_name]: value
+                    for field_name, value in profile_values.items()
+                    if value
+                }
+            )
         return queryset
 
 
-class AssessmentViewSet(BaseAPIViewSet):
+class AssessmentViewSet(ConditionalGetMixin, DraftListingMixin, BaseAPIViewSet):
     base_serializer_class = AssessmentSerializer
     known_query_parameters = BaseAPIViewSet.known_query_parameters.union(
         [
@@ -263,36 +355,21 @@ class AssessmentViewSet(BaseAPIViewSet):
     pagination_class = PageNumberPagination
     search_fields = ["title"]
     filter_backends = (SearchFilter,)
+    draft_related_fields = [
+        "locale",
+        "high_result_page",
+        "medium_result_page",
+        "low_result_page",
+        "skip_high_result_page",
+    ]
 
     def get_queryset(self):
         qa = self.request.query_params.get("qa")
         locale_code = self.request.query_params.get("locale")
 
         if qa:
-            # return the latest revision for each Assessment
+            # The latest revisions are swapped in once the listing is paginated
             queryset = Assessment.objects.all().order_by("latest_revision_id")
-            for assessment in queryset:
-                latest_revision = assessment.revisions.order_by("-created_at").first()
-                if latest_revision:
-                    latest_revision = latest_revision.as_object()
-                    # set the assessment's details to that of the latest revision
-                    assessment.title = latest_revision.title
-                    assessment.slug = latest_revision.slug
-                    assessment.version = latest_revision.version
-                    assessment.locale = latest_revision.locale
-                    assessment.tags = latest_revision.tags
-                    assessment.high_result_page = latest_revision.high_result_page
-                    assessment.high_inflection = latest_revision.high_inflection
-                    assessment.medium_result_page = latest_revision.medium_result_page
-                    assessment.medium_inflection = latest_revision.medium_inflection
-                    assessment.low_result_page = latest_revision.low_result_page
-                    assessment.skip_threshold = latest_revision.skip_threshold
-                    assessment.skip_high_result_page = (
-                        latest_revision.skip_high_result_page
-                    )
-                    assessment.generic_error = latest_revision.generic_error
-                    assessment.questions = latest_revision.questions
-
         else:
             queryset = Assessment.objects.filter(live=True).order_by(
                 "last_published_at"
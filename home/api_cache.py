@@ -0,0 +1,101 @@
+import hashlib
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "api-cache:version"
+HITS_KEY = "api-cache:hits"
+MISSES_KEY = "api-cache:misses"
+
+# These only affect the page views we record, not the response we return
+IGNORED_PARAM_PREFIX = "data__"
+DRAFT_PARAMS = ["qa", "return_drafts"]
+
+
+def is_cacheable(request: Any) -> bool:
+    """
+    Drafts can change without anything being published, so we never cache them
+    """
+    if settings.API_CACHE_TIMEOUT <= 0:
+        return False
+    return not any(
+        request.query_params.get(param, "").lower() == "true" for param in DRAFT_PARAMS
+    )
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # If the version has been evicted, start from somewhere new, so that we
+        # can't return entries cached under an older version with the same number
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate() -> None:
+    """
+    Invalidate every cached response, by moving on to a new version
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def get_cache_key(request: Any) -> str | None:
+    """
+    The path has the API version and page id or slug, and the query parameters have
+    the locale, channel, message index and anything else that changes the response.
+
+    The key includes the current version, so it should be fetched before the
+    response is built. That way a response built while content is being published
+    is stored under the old version, rather than the new one.
+    """
+    if not is_cacheable(request):
+        return None
+    digest = hashlib.sha256(get_request_key(request).encode()).hexdigest()
+    return f"api-cache:{get_version()}:{digest}"
+
+
+def get_request_key(request: Any) -> str:
+    """
+    Everything about the request that changes the response
+    """
+    params = sorted(
+        (key, values)
+        for key, values in request.query_params.lists()
+        if not key.startswith(IGNORED_PARAM_PREFIX)
+    )
+    return repr((request.get_host(), request.path, params))
+
+
+def _increment(key: str) -> None:
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+
+
+def get_response(cache_key: str | None) -> Any | None:
+    if cache_key is None:
+        return None
+    data = cache.get(cache_key)
+    _increment(MISSES_KEY if data is None else HITS_KEY)
+    return data
+
+
+def set_response(cache_key: str | None, data: Any) -> None:
+    if cache_key is not None:
+        cache.set(cache_key, data, timeout=settings.API_CACHE_TIMEOUT)
+
+
+def get_stats() -> dict[str, int]:
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+def reset_stats() -> None:
+    cache.delete_many([HITS_KEY, MISSES_KEY])
@@ -1,15 +1,22 @@
 from .models import (  # isort:skip
+    ContentChange,
     ContentPage,
+    ContentPageDraftTag,
     ContentPageTag,
     WhatsAppTemplate,
     TriggeredContent,
 )
+from datetime import timedelta
+from itertools import takewhile
 from typing import Any
 
+from django.conf import settings
 from django.core.exceptions import MultipleObjectsReturned
+from django.db.models import Case, F, Q, When
 from django.http.response import Http404
 from django.shortcuts import get_object_or_404
 from django.urls import path
+from django.utils import timezone
 from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import PageNumberPagination
@@ -18,7 +25,15 @@ from wagtail.api.v2.router import WagtailAPIRouter
 from wagtail.api.v2.views import BaseAPIViewSet, PagesAPIViewSet
 from wagtail.models.sites import Site
 
-from home.serializers_v3 import ContentPageSerializerV3, WhatsAppTemplateSerializer
+from home import api_cache, conditional_get
+from home.page_view_ingestion import record_page_views
+from home.references import ReferenceResolver
+from home.search import search_pages
+from home.serializers_v3 import (
+    ContentChangeSerializer,
+    ContentPageSerializerV3,
+    WhatsAppTemplateSerializer,
+)
 
 from .models import ContentPageIndex, Page
 
@@ -59,9 +74,14 @@ class WhatsAppTemplateViewset(BaseAPIViewSet):
         except Http404:
             raise NotFound({"template": ["Template matching query does not exist."]})
 
+        validators = conditional_get.for_object(request, instance)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
         serializer = WhatsAppTemplateSerializer(instance, context={"request": request})
 
-        return Response(serializer.data)
+        return validators.set_headers(Response(serializer.data))
 
     def detail_view_by_id(self, request, pk):
         return self.process_detail_view(request, pk=pk)
@@ -71,11 +91,21 @@ class WhatsAppTemplateViewset(BaseAPIViewSet):
 
     def listing_view(self, request, *args, **kwargs):
         queryset = self.get_queryset()
+        validators = conditional_get.for_queryset(request, queryset)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
         queryset_list = self.paginate_queryset(queryset)
         serializer = WhatsAppTemplateSerializer(
-            queryset_list, context={"request": request}, many=True
+            queryset_list,
+            context={
+                "request": request,
+                "resolver": ReferenceResolver(templates=queryset_list),
+            },
+            many=True,
         )
-        return self.get_paginated_response(serializer.data)
+        return validators.set_headers(self.get_paginated_response(serializer.data))
 
     def get_queryset(self):
         draft_queryset = (
@@ -159,11 +189,15 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
         if self.lookup_field == "slug" and self.return_drafts:
             queryset = self.get_queryset()
             # Check the latest draft of each page with changes
-            draft_queryset = queryset.filter(has_unpublished_changes=True)
-            for draft_page in draft_queryset:
-                latest_revision = draft_page.get_latest_revision_as_object()
-                if self.kwargs["slug"] == latest_revision.slug:
-                    return latest_revision
+            draft_page = (
+                queryset.filter(
+                    has_unpublished_changes=True, draft__slug=self.kwargs["slug"]
+                )
+                .order_by("pk")
+                .first()
+            )
+            if draft_page is not None:
+                return draft_page.get_latest_revision_as_object()
             # Now check all pages without changes
             published_queryset = queryset.filter(has_unpublished_changes=False)
             return get_object_or_404(published_queryset, slug=self.kwargs["slug"])
@@ -191,8 +225,21 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
             raise NotFound({"page": ["Page matching query does not exist."]})
 
         instance.save_page_view(request.query_params)
-        serializer = ContentPageSerializerV3(instance, context={"request": request})
-        return Response(serializer.data)
+        validators = conditional_get.for_object(request, instance)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = api_cache.get_cache_key(request)
+        data = api_cache.get_response(cache_key)
+        if data is None:
+            serializer = ContentPageSerializerV3(
+                instance,
+                context={"request": request, "resolver": ReferenceResolver([instance])},
+            )
+            data = serializer.data
+            api_cache.set_response(cache_key, data)
+        return validators.set_headers(Response(data))
 
     def detail_view_by_id(self, request, pk):
         return self.process_detail_view(request, pk=pk)
@@ -205,13 +252,23 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
         queryset = self.get_queryset()
         if channel:
             queryset = queryset.filter(**{f"enable_{channel}": True})
+        query = request.query_params.get("search", "").strip()
+        if query:
+            locale = request.query_params.get("locale", DEFAULT_LOCALE).casefold()
+            queryset = search_pages(queryset, query, locale)
+        validators = conditional_get.for_queryset(request, queryset)
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return not_modified
 
         queryset_list = self.paginate_queryset(queryset)
 
         serializer = ContentPageSerializerV3(
-            queryset_list, context={"request": request}, many=True
+            queryset_list,
+            context={"request": request, "resolver": ReferenceResolver(queryset_list)},
+            many=True,
         )
-        return self.get_paginated_response(serializer.data)
+        return validators.set_headers(self.get_paginated_response(serializer.data))
 
     def get_queryset(self) -> Any:
         all_queryset = (
@@ -229,56 +286,35 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
         tag = self.request.query_params.get("tag", "").casefold()
         child_of = self.request.query_params.get("child_of", "").casefold()
 
-        locale_matches = set()
-        slug_matches = set()
-        title_matches = set()
-        trigger_matches = set()
-        tag_matches = set()
-        child_of_matches = set()
+        parent_page = None
+        if child_of:
+            try:
+                parent_page = Page.objects.get(
+                    locale__language_code=locale, slug=child_of
+                )
+            except Page.DoesNotExist:
+                raise NotFound({"page": ["Page matching query does not exist."]})
 
-        # Build of Draft results
+        # Build of Draft results, from the latest revision of each page, see
+        # ContentPageDraft
         if self.return_drafts:
-            for dp in draft_queryset:
-                l_rev = dp.get_latest_revision_as_object()
-                if locale == l_rev.locale.language_code.casefold():
-                    locale_matches.add(dp.pk)
-                if slug and slug in l_rev.slug.casefold():
-                    slug_matches.add(dp.pk)
-                if title and title in l_rev.title.casefold():
-                    title_matches.add(dp.pk)
-                if trigger:
-                    l_rev_triggers = {
-                        t.name.casefold() for t in l_rev.triggers.all() if t
-                    }
-                    if trigger in l_rev_triggers:
-                        trigger_matches.add(dp.pk)
-                if tag:
-                    l_rev_tags = {t.name.casefold() for t in l_rev.tags.all() if t}
-                    if tag in l_rev_tags:
-                        tag_matches.add(dp.pk)
-                if child_of:
-                    try:
-                        parent_page = Page.objects.get(
-                            locale__language_code=locale, slug=child_of
-                        )
-                        if l_rev.get_parent() == parent_page:
-                            child_of_matches.add(dp.pk)
-                    except Page.DoesNotExist:
-                        raise NotFound(
-                            {"page": ["Page matching query does not exist."]}
-                        )
-
-            draft_ids = locale_matches
+            draft_queryset = draft_queryset.filter(locale__language_code__iexact=locale)
             if slug:
-                draft_ids &= slug_matches
+                draft_queryset = draft_queryset.filter(draft__slug__icontains=slug)
             if title:
-                draft_ids &= title_matches
+                draft_queryset = draft_queryset.filter(draft__title__icontains=title)
             if trigger:
-                draft_ids &= trigger_matches
+                draft_queryset = draft_queryset.filter(
+                    draft__tags__kind=ContentPageDraftTag.TRIGGER,
+                    draft__tags__name=trigger,
+                )
             if tag:
-                draft_ids &= tag_matches
-            if child_of:
-                draft_ids &= child_of_matches
+                draft_queryset = draft_queryset.filter(
+                    draft__tags__kind=ContentPageDraftTag.TAG, draft__tags__name=tag
+                )
+            if parent_page is not None:
+                draft_queryset = draft_queryset.child_of(parent_page)
+            draft_ids = draft_queryset.values("pk")
 
             # We have filtered drafts, now we only need to filter pages without drafts
             live_queryset = all_queryset.filter(has_unpublished_changes=False)
@@ -290,14 +326,8 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
             live_queryset = live_queryset.filter(slug__icontains=slug)
         if title:
             live_queryset = live_queryset.filter(title__icontains=title)
-        if child_of:
-            try:
-                parent_page = Page.objects.get(
-                    locale__language_code=locale, slug=child_of
-                )
-                live_queryset = live_queryset.child_of(parent_page)
-            except Page.DoesNotExist:
-                raise NotFound({"page": ["Page matching query does not exist."]})
+        if parent_page is not None:
+            live_queryset = live_queryset.child_of(parent_page)
 
         if trigger:
             ids = TriggeredContent.objects.filter(
@@ -335,7 +365,161 @@ class ContentPagesV3APIViewset(PagesAPIViewSet):
         ]
 
 
+class ContentPagesBatchV3APIViewset(ContentPagesV3APIViewset):
+    """
+    Fetches several pages by id and/or slug in one request, e.g. a page, its related
+    pages and the pages its buttons go to. This is a separate endpoint, rather than
+    a path under pages, so that it can't clash with a page's slug.
+    """
+
+    known_query_parameters = ContentPagesV3APIViewset.known_query_parameters.union(
+        ["ids", "slugs", "record_page_views"]
+    )
+    max_batch_size = 100
+
+    def get_list_param(self, name: str) -> list[str]:
+        values = self.request.query_params.get(name, "")
+        return [value.strip() for value in values.split(",") if value.strip()]
+
+    def batch_view(self, request):
+        self.validate_channel()
+        ids = self.get_list_param("ids")
+        slugs = [slug.casefold() for slug in self.get_list_param("slugs")]
+        if not all(pk.isdigit() for pk in ids):
+            raise ValidationError({"ids": ["Page ids must be numbers."]})
+        ids = [int(pk) for pk in ids]
+        if not ids and not slugs:
+            raise ValidationError({"ids": ["Provide ids or slugs of pages to fetch."]})
+        if len(ids) + len(slugs) > self.max_batch_size:
+            raise ValidationError(
+                {"ids": [f"Fetch at most {self.max_batch_size} pages at a time."]}
+            )
+
+        queryset = self.get_queryset()
+        if self.return_drafts:
+            # A slug could have changed in a draft version of a page
+            queryset = queryset.annotate(
+                current_slug=Case(
+                    When(has_unpublished_changes=True, then=F("draft__slug")),
+                    default=F("slug"),
+                )
+            )
+        else:
+            queryset = queryset.annotate(current_slug=F("slug"))
+        pages = list(queryset.filter(Q(pk__in=ids) | Q(current_slug__in=slugs)))
+        by_id = {page.pk: page for page in pages}
+        by_slug = {page.current_slug: page for page in pages}
+
+        # Pages are returned in the order they were asked for, once each
+        found: dict[int, ContentPage] = {}
+        missing: dict[str, list[Any]] = {"ids": [], "slugs": []}
+        for key, values, lookup in [("ids", ids, by_id), ("slugs", slugs, by_slug)]:
+            for value in values:
+                page = lookup.get(value)
+                if page is None:
+                    missing[key].append(value)
+                else:
+                    found.setdefault(page.pk, page)
+        results = list(found.values())
+
+        if request.query_params.get("record_page_views", "").lower() == "true":
+            record_page_views(
+                [page.page_view_data(request.query_params) for page in results]
+            )
+
+        serializer = ContentPageSerializerV3(
+            results,
+            context={"request": request, "resolver": ReferenceResolver(results)},
+            many=True,
+        )
+        data = serializer.data
+        return Response({"count": len(data), "results": data, "missing": missing})
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return [path("", cls.as_view({"get": "batch_view"}), name="listing")]
+
+
+class ContentChangesV3ViewSet(BaseAPIViewSet):
+    """
+    The content that's been published, unpublished, moved or deleted since the
+    `since` cursor, oldest first, so that clients can keep their copy of the content
+    up to date by fetching only what's changed. `since=latest` returns no changes,
+    and a cursor to start following the changes from. See home/changes.py
+    """
+
+    model = ContentChange
+    known_query_parameters = BaseAPIViewSet.known_query_parameters.union(
+        ["since", "kind", "locale"]
+    )
+    default_limit = 100
+    max_limit = 1000
+
+    def get_int_param(self, name: str, default: int) -> int:
+        value = self.request.query_params.get(name, "")
+        if value == "":
+            return default
+        if not value.isdigit():
+            raise ValidationError({name: [f"{name} must be a positive number."]})
+        return int(value)
+
+    def listing_view(self, request):
+        queryset = ContentChange.objects.order_by("id")
+        self.check_query_parameters(queryset)
+        # Changes are only listed once they're old enough that every change with a
+        # lower id has been committed, see home/changes.py
+        cutoff = timezone.now() - timedelta(seconds=settings.CHANGES_DELAY)
+        if request.query_params.get("since") == "latest":
+            cursor = (
+                queryset.filter(timestamp__lte=cutoff)
+                .values_list("id", flat=True)
+                .last()
+                or 0
+            )
+            return Response({"changes": [], "cursor": cursor, "has_more": False})
+
+        since = self.get_int_param("since", 0)
+        limit = self.get_int_param("limit", self.default_limit)
+        if not 0 < limit <= self.max_limit:
+            raise ValidationError(
+                {"limit": [f"limit must be between 1 and {self.max_limit}."]}
+            )
+
+        kind = request.query_params.get("kind")
+        if kind:
+            if kind not in ContentChange.Kind.values:
+                raise ValidationError(
+                    {
+                        "kind": [
+                            f"kind must be one of {', '.join(ContentChange.Kind.values)}."
+                        ]
+                    }
+                )
+            queryset = queryset.filter(kind=kind)
+        locale = request.query_params.get("locale")
+        if locale:
+            queryset = queryset.filter(language_code=locale)
+
+        # Fetch one more than we return to know whether there are more
+        changes = list(queryset.filter(id__gt=since)[: limit + 1])
+        # Stop before the first change that's too recent
+        changes = list(takewhile(lambda c: c.timestamp <= cutoff, changes))
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        cursor = changes[-1].id if changes else since
+        serializer = ContentChangeSerializer(changes, many=True)
+        return Response(
+            {"changes": serializer.data, "cursor": cursor, "has_more": has_more}
+        )
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return [path("", cls.as_view({"get": "listing_view"}), name="listing")]
+
+
 api_router_v3 = WagtailAPIRouter("wagtailapiv3_router")
 api_router_v3.register_endpoint("whatsapptemplates", WhatsAppTemplateViewset)
 api_router_v3.register_endpoint("pages", ContentPagesV3APIViewset)
 api_router_v3.register_endpoint("indexes", ContentPageIndexV3ViewSet)
+api_router_v3.register_endpoint("pages-batch", ContentPagesBatchV3APIViewset)
+api_router_v3.register_endpoint("changes", ContentChangesV3ViewSet)
@@ -1,7 +1,7 @@
+from collections.abc import Iterator
 from logging import getLogger
 
 from django.db import transaction  # type: ignore
-from django.http import HttpResponse  # type: ignore
 from wagtail.query import PageQuerySet  # type: ignore
 
 from .export_assessments import AssessmentExporter, AssessmentExportWriter
@@ -10,16 +10,16 @@ from .import_assessments import AssessmentImporter
 logger = getLogger(__name__)
 
 
-def export_xlsx_assessment(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_xlsx_assessment(queryset: PageQuerySet) -> Iterator[bytes]:
     exporter = AssessmentExporter(queryset)
     export_rows = exporter.perform_export()
-    AssessmentExportWriter(export_rows).write_xlsx(response)
+    return AssessmentExportWriter(export_rows).write_xlsx()
 
 
-def export_csv_assessment(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_csv_assessment(queryset: PageQuerySet) -> Iterator[str]:
     exporter = AssessmentExporter(queryset)
     export_rows = exporter.perform_export()
-    AssessmentExportWriter(export_rows).write_csv(response)
+    return AssessmentExportWriter(export_rows).write_csv()
 
 
 @transaction.atomic
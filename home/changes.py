@@ -0,0 +1,78 @@
+"""
+A log of content being published, unpublished, moved or deleted, so that API clients
+that keep a copy of the content can fetch only what's changed since they last
+synced, from /api/v3/changes/?since=<cursor>, instead of listing everything again.
+
+Changes are recorded from signals (see home/signals.py), and written once the
+transaction that made them is committed, so that a client never sees a change before
+it can fetch the changed content, and a change that's rolled back is never seen.
+Each change is written in its own short transaction, so changes get their ids, which
+are the cursors, in about the order they were committed.
+
+Ids aren't always committed in order though: a change can be given a lower id than
+another, and be committed just after it. A client that synced in between would have
+a cursor past the lower id, and never see that change. So changes are only listed
+once they're CHANGES_DELAY seconds old, and the listing stops before the first change
+that isn't. Clients see every change as long as no change takes longer than
+CHANGES_DELAY to commit after it's timestamped, which is just before it's written.
+
+There's no record of anything from before the log was added, so clients should sync
+everything once, and then follow the changes from /api/v3/changes/?since=latest.
+"""
+
+from typing import Any
+
+from django.db import transaction
+from django.utils import timezone
+from wagtail.models import Locale
+
+from .models import (
+    Assessment,
+    ContentChange,
+    ContentPage,
+    ContentPageIndex,
+    OrderedContentSet,
+    WhatsAppTemplate,
+)
+
+KINDS = {
+    ContentPage: ContentChange.Kind.CONTENT_PAGE,
+    ContentPageIndex: ContentChange.Kind.CONTENT_PAGE_INDEX,
+    WhatsAppTemplate: ContentChange.Kind.WHATSAPP_TEMPLATE,
+    Assessment: ContentChange.Kind.ASSESSMENT,
+    OrderedContentSet: ContentChange.Kind.ORDERED_CONTENT_SET,
+}
+
+
+def get_language_code(instance: Any) -> str:
+    # The locale could be being deleted along with the instance
+    try:
+        return instance.locale.language_code
+    except Locale.DoesNotExist:
+        return ""
+
+
+def record_change(
+    model: type,
+    instance: Any,
+    action: ContentChange.Action,
+    revision_id: int | None = None,
+) -> None:
+    """
+    Adds a change to `instance` to the log, once the current transaction is committed.
+    `instance` can be a plain Page when it's moved, so its kind is from `model`.
+    """
+    change = ContentChange(
+        kind=KINDS[model],
+        object_id=instance.pk,
+        action=action,
+        slug=instance.slug,
+        language_code=get_language_code(instance),
+        revision_id=revision_id,
+    )
+
+    def save() -> None:
+        change.timestamp = timezone.now()
+        change.save()
+
+    transaction.on_commit(save)
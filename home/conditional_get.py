@@ -0,0 +1,101 @@
+"""
+Conditional GETs for the content API, so that clients and proxies that poll for
+content only download it again when it has changed.
+
+Responses get a strong ETag, from the revisions of the objects in the response,
+the request's path and query parameters (which include the channel and locale), and
+the API cache version. Responses include the titles and slugs of the parents,
+related pages, templates and forms they refer to, so the ETag has to change when
+any of those are published, which is what the cache version tracks (see
+home/api_cache.py). Listings use the highest revision id and the number of objects
+in the listing. Responses also get a Last-Modified, from when the objects were last
+published.
+
+Requests with a matching If-None-Match, or with an If-Modified-Since that isn't
+before Last-Modified, get a 304 as soon as the revisions are known, before anything
+is serialized. Drafts can change without anything being published, so draft
+responses don't get validators, just like they aren't cached.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from django.db.models import Count, Max, QuerySet
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import api_cache
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str | None = None
+    last_modified: datetime | None = None
+
+    @property
+    def timestamp(self) -> int | None:
+        if self.last_modified is None:
+            return None
+        return int(self.last_modified.timestamp())
+
+    def not_modified(self, request: Any) -> HttpResponseBase | None:
+        """
+        A 304 response if the client already has this response, otherwise None
+        """
+        if self.etag is None:
+            return None
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=self.timestamp
+        )
+        if response is not None:
+            self.set_headers(response)
+        return response
+
+    def set_headers(self, response: HttpResponseBase) -> HttpResponseBase:
+        if self.etag is not None:
+            response["ETag"] = self.etag
+        if self.timestamp is not None:
+            response["Last-Modified"] = http_date(self.timestamp)
+        return response
+
+
+def is_draft(request: Any) -> bool:
+    return any(
+        request.query_params.get(param, "").lower() not in ("", "false")
+        for param in api_cache.DRAFT_PARAMS
+    )
+
+
+def get_etag(request: Any, *revisions: Any) -> str:
+    key = repr((api_cache.get_request_key(request), api_cache.get_version(), revisions))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def for_object(request: Any, obj: Any) -> Validators:
+    """
+    The validators for a response with a single page, template, form or ordered
+    content set
+    """
+    if is_draft(request):
+        return Validators()
+    return Validators(get_etag(request, obj.live_revision_id), obj.last_published_at)
+
+
+def for_queryset(request: Any, queryset: QuerySet) -> Validators:
+    """
+    The validators for a listing of `queryset`, before it's paginated
+    """
+    if is_draft(request):
+        return Validators()
+    stats = queryset.order_by().aggregate(
+        revision=Max("live_revision_id"),
+        count=Count("pk"),
+        last_published=Max("last_published_at"),
+    )
+    return Validators(
+        get_etag(request, stats["revision"], stats["count"]),
+        stats["last_published"],
+    )
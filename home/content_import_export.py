@@ -1,32 +1,37 @@
+from collections.abc import Iterator
 from logging import getLogger
 
 from django.db import transaction
-from django.http import HttpResponse
 from wagtail.query import PageQuerySet
 
 logger = getLogger(__name__)
 
 
 @transaction.atomic
-def import_content(file, filetype, progress_queue, purge=True, locale=None) -> None:
+def import_content(
+    file, filetype, progress_queue, purge=True, locale=None, dry_run=False
+):
     from .import_content_pages import ContentImporter
+    from .import_helpers import spool_file
 
-    importer = ContentImporter(file.read(), filetype, progress_queue, purge, locale)
+    importer = ContentImporter(
+        spool_file(file), filetype, progress_queue, purge, locale, dry_run
+    )
     importer.perform_import()
     return importer
 
 
-def export_xlsx_content(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_xlsx_content(queryset: PageQuerySet) -> Iterator[bytes]:
     from .export_content_pages import ContentExporter, ExportWriter
 
     exporter = ContentExporter(queryset)
     export_rows = exporter.perform_export()
-    ExportWriter(export_rows).write_xlsx(response)
+    return ExportWriter(export_rows).write_xlsx()
 
 
-def export_csv_content(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_csv_content(queryset: PageQuerySet) -> Iterator[str]:
     from .export_content_pages import ContentExporter, ExportWriter
 
     exporter = ContentExporter(queryset)
     export_rows = exporter.perform_export()
-    ExportWriter(export_rows).write_csv(response)
+    return ExportWriter(export_rows).write_csv()
@@ -0,0 +1,160 @@
+"""
+Bulk exports of page views and ratings, for analytics pipelines that need every row
+rather than a page at a time.
+
+Rows are streamed from a server-side cursor, oldest first, so memory use doesn't
+depend on the size of the export. The last line of every export is a resume token,
+which can be passed back as `resume_token` to export only the rows saved since.
+
+Rows aren't saved in timestamp order: a page view is timestamped when it's
+requested, but can be buffered for a few seconds before it's saved, and concurrent
+transactions can commit in any order. So an export only includes rows that are
+DATA_EXPORT_DELAY seconds old, and the resume token never moves past a row that
+could still be saved after it. Every row is exported as long as no row takes longer
+than DATA_EXPORT_DELAY to be saved after it's timestamped.
+"""
+
+import base64
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta
+from io import StringIO
+from typing import Any
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model, Q, QuerySet
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+RESUME_TOKEN_PARAM = "resume_token"  # noqa: S105
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(ndjson_line(row) for row in rows)
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        if not rows:
+            return ""
+        fields = list(rows[0].keys())
+        return csv_line(fields) + "".join(
+            csv_line([row.get(f) for f in fields]) for row in rows
+        )
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    """
+    Keeps the full precision of timestamps, so that they match the resume tokens
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def ndjson_line(row: dict[str, Any]) -> str:
+    return json.dumps(row, cls=ExportJSONEncoder) + "\n"
+
+
+def csv_line(values: Iterable[Any]) -> str:
+    def to_csv(value: Any) -> Any:
+        if isinstance(value, dict | list):
+            return json.dumps(value, cls=ExportJSONEncoder)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    line = StringIO()
+    csv.writer(line).writerow([to_csv(v) for v in values])
+    return line.getvalue()
+
+
+def get_export_fields(model: type[Model]) -> list[str]:
+    """
+    The exported fields, named the same as in the API, e.g. `page` for the page id
+    """
+    return [field.name for field in model._meta.concrete_fields]
+
+
+def make_resume_token(timestamp: datetime, pk: int) -> str:
+    value = f"{timestamp.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def parse_resume_token(token: str) -> tuple[datetime, int]:
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(pk)
+    except ValueError:
+        raise ValidationError({RESUME_TOKEN_PARAM: ["Invalid resume token"]})
+
+
+def resume_from(queryset: QuerySet, token: str | None) -> QuerySet:
+    """
+    Orders the queryset for export, starting after the row the token was made from.
+
+    Page views can share a timestamp, so this uses the id as a tie-breaker instead
+    of only filtering on the timestamp like `timestamp_gt`. Rows that are newer than
+    DATA_EXPORT_DELAY are left for the next export.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.DATA_EXPORT_DELAY)
+    queryset = queryset.filter(timestamp__lte=cutoff).order_by("timestamp", "pk")
+    if token:
+        timestamp, pk = parse_resume_token(token)
+        queryset = queryset.filter(
+            Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk)
+        )
+    return queryset
+
+
+def stream_export(
+    queryset: QuerySet, export_format: str, token: str | None = None
+) -> Iterator[str]:
+    """
+    Returns an iterator over the rows of the queryset in the export format, followed
+    by a resume token. If there are no rows, the resume token is the one the export
+    started from.
+
+    For NDJSON the token is the last line, as `{"resume_token": "..."}`. For CSV it's
+    the last row, with `#resume_token` in the first column and the token in the
+    second.
+
+    The token is checked straight away, so that an invalid token can be reported
+    before anything is streamed.
+    """
+    fields = get_export_fields(queryset.model)
+    rows = resume_from(queryset, token).values(*fields)
+    if export_format == "csv":
+        return _stream_csv(rows, fields, token)
+    return _stream_ndjson(rows, token)
+
+
+def _stream_ndjson(rows: QuerySet, token: str | None) -> Iterator[str]:
+    for row in rows.iterator(chunk_size=settings.DATA_EXPORT_CHUNK_SIZE):
+        token = make_resume_token(row["timestamp"], row["id"])
+        yield ndjson_line(row)
+    yield ndjson_line({RESUME_TOKEN_PARAM: token})
+
+
+def _stream_csv(rows: QuerySet, fields: list[str], token: str | None) -> Iterator[str]:
+    yield csv_line(fields)
+    for row in rows.iterator(chunk_size=settings.DATA_EXPORT_CHUNK_SIZE):
+        token = make_resume_token(row["timestamp"], row["id"])
+        yield csv_line(row.values())
+    yield csv_line([f"#{RESUME_TOKEN_PARAM}", token])
@@ -1,19 +1,30 @@
-import copy
 import csv
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict, astuple, dataclass, fields
-from itertools import zip_longest
+from itertools import chain, zip_longest
 from json import dumps
 from math import ceil
 
-from django.http import HttpResponse  # type: ignore
-from openpyxl.styles import Border, Color, Font, NamedStyle, PatternFill, Side
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from openpyxl.styles import Color, Font, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 from openpyxl.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 from wagtail import blocks  # type: ignore
 from wagtail.models import Locale, Page  # type: ignore
 from wagtail.query import PageQuerySet  # type: ignore
 
+from .export_helpers import (
+    EXPORT_CHUNK_SIZE,
+    Echo,
+    append_xlsx_row,
+    stream_workbook,
+    xlsx_row,
+)
+from .import_helpers import chunked
 from .models import (
     ContentPage,
     ContentPageIndex,
@@ -26,12 +37,6 @@ from .models import (
     WhatsappBlock,
     WhatsAppTemplate,
 )
-from .xlsx_helpers import get_active_sheet
-
-HP_CTYPE = HomePage._meta.verbose_name
-CP_CTYPE = ContentPage._meta.verbose_name
-CPI_CTYPE = ContentPageIndex._meta.verbose_name
-
 
 MsgBlocks = tuple[
     WhatsappBlock | None,
@@ -167,40 +172,149 @@ class ExportRow:
 
 
 class ContentExporter:
-    rows: list[ExportRow]
-
     def __init__(self, queryset: PageQuerySet):
-        self.rows = []
         self.queryset = queryset
 
-    def perform_export(self) -> list[ExportRow]:
-        for locale in Locale.objects.all():
-            home = HomePage.objects.get(locale_id=locale.id)
-            self._export_locale(home)
-        return self.rows
-
-    def _export_locale(self, home: HomePage) -> None:
-        main_menu_pages = home.get_children()
-        for index, page in enumerate(main_menu_pages, 1):
-            structure_string = f"Menu {index}"
-            self._export_page(page, structure_string)
-
-    def _export_page(self, page: Page, structure: str) -> None:
-        if page.content_type.name == CPI_CTYPE:
-            self._export_cpi(ContentPageIndex.objects.get(id=page.id), structure)
-        elif page.content_type.name == CP_CTYPE:
-            content_page = self.queryset.filter(id=page.id).first()
-            if content_page:
-                self._export_content_page(content_page, structure)
-        else:
-            raise ValueError(f"Unexpected page type: {page.content_type.name}")
-        # Now handle any child pages.
-        if page.get_children_count() > 0:
-            for index, child in enumerate(page.get_children(), 1):
-                child_structure = f"{structure.replace('Menu', 'Sub')}.{index}"
-                self._export_page(child, child_structure)
-
-    def _export_content_page(self, page: ContentPage, structure: str) -> None:
+    def perform_export(self) -> Iterator[ExportRow]:
+        """
+        The export rows, in tree order, as each page is exported. With
+        EXPORT_LOCALE_WORKERS, locales are exported at the same time, and each
+        locale's rows are sent once the locales before it have been sent.
+        """
+        homes = [
+            HomePage.objects.get(locale_id=locale.id) for locale in Locale.objects.all()
+        ]
+        if settings.EXPORT_LOCALE_WORKERS <= 1 or len(homes) <= 1:
+            for home in homes:
+                yield from self._export_locale(home)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=settings.EXPORT_LOCALE_WORKERS)
+        try:
+            for rows in executor.map(self._export_locale_in_thread, homes):
+                yield from rows
+        finally:
+            # If the response is closed early, the locales that haven't started
+            # aren't exported
+            executor.shutdown(cancel_futures=True)
+
+    def _export_locale_in_thread(self, home: HomePage) -> list[ExportRow]:
+        try:
+            return list(self._export_locale(home))
+        finally:
+            # Each thread has its own connection, which would otherwise stay open
+            connection.close()
+
+    def _export_locale(self, home: HomePage) -> Iterator[ExportRow]:
+        """
+        Walks the pages under the home page in path order, which is depth first with
+        each page's children in menu order. The tree is read with one query, and the
+        pages with one query per page type, instead of querying each page's children
+        and parent.
+        """
+        cp_ctype = ContentType.objects.get_for_model(ContentPage).id
+        cpi_ctype = ContentType.objects.get_for_model(ContentPageIndex).id
+        tree = (
+            Page.objects.descendant_of(home)
+            .order_by("path")
+            .values_list("id", "depth", "title", "content_type_id")
+        )
+        index_pages = self._index_pages(home)
+        content_pages = self._content_pages(home)
+        next_index_page = next(index_pages, None)
+        next_content_page, related = next(content_pages, (None, []))
+
+        # The position of the current page under each of its ancestors, and the
+        # title of the last page we saw at each depth
+        positions: list[int] = []
+        titles = {home.depth: ""}
+        for page_id, depth, title, content_type_id in tree.iterator(
+            chunk_size=EXPORT_CHUNK_SIZE
+        ):
+            level = depth - home.depth
+            del positions[level:]
+            if len(positions) == level:
+                positions[-1] += 1
+            else:
+                positions.append(1)
+            structure = self._structure(positions)
+            # Pages directly under the home page are treated as parentless
+            parent_title = titles[depth - 1]
+            titles[depth] = title
+
+            if content_type_id == cpi_ctype:
+                if next_index_page is not None and next_index_page.id == page_id:
+                    yield self._export_cpi(next_index_page, structure, parent_title)
+                    next_index_page = next(index_pages, None)
+            elif content_type_id == cp_ctype:
+                # Content pages that aren't in the queryset are skipped, but their
+                # children are still exported.
+                if next_content_page is not None and next_content_page.id == page_id:
+                    yield from self._export_content_page(
+                        next_content_page, structure, parent_title, related
+                    )
+                    next_content_page, related = next(content_pages, (None, []))
+            else:
+                content_type = ContentType.objects.get_for_id(content_type_id)
+                raise ValueError(f"Unexpected page type: {content_type.name}")
+
+    @staticmethod
+    def _structure(positions: list[int]) -> str:
+        if len(positions) == 1:
+            return f"Menu {positions[0]}"
+        return f"Sub {'.'.join(str(p) for p in positions)}"
+
+    @staticmethod
+    def _index_pages(home: HomePage) -> Iterator[ContentPageIndex]:
+        return (
+            ContentPageIndex.objects.descendant_of(home)
+            .order_by("path")
+            .select_related("locale")
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+
+    def _content_pages(self, home: HomePage) -> Iterator[tuple[ContentPage, list[str]]]:
+        """
+        The content pages under the home page in path order, with their tags, quick
+        replies and triggers, and the slugs of their related pages
+        """
+        pages = (
+            self.queryset.descendant_of(home)
+            .order_by("path")
+            .select_related("locale")
+            .prefetch_related("tags", "quick_replies", "triggers")
+        )
+        for chunk in chunked(
+            pages.iterator(chunk_size=EXPORT_CHUNK_SIZE), EXPORT_CHUNK_SIZE
+        ):
+            related_ids = {pk for page in chunk for pk in self._related_page_ids(page)}
+            slugs = dict(
+                Page.objects.filter(id__in=related_ids).values_list("id", "slug")
+            )
+            for page in chunk:
+                # Ideally, all related page links would be removed when the page
+                # they link to is deleted. We don't currently do that, so for now
+                # we just make sure that we skip such links during export.
+                related = [
+                    slugs[pk] for pk in self._related_page_ids(page) if pk in slugs
+                ]
+                yield page, related
+
+    @staticmethod
+    def _related_page_ids(page: ContentPage) -> list[int]:
+        if not page.related_pages:
+            return []
+        return [
+            rp["value"] for rp in page.related_pages.raw_data if rp["value"] is not None
+        ]
+
+    def _export_content_page(
+        self,
+        page: ContentPage,
+        structure: str,
+        parent_title: str,
+        related_pages: list[str],
+    ) -> Iterator[ExportRow]:
         """
         Export a ContentPage.
 
@@ -220,7 +334,7 @@ class ContentExporter:
             message=1,
             page_id=page.id,
             slug=page.slug,
-            parent=self._parent_title(page),
+            parent=parent_title,
             web_title=page.title,
             web_subtitle=page.subtitle,
             web_body=str(page.body),
@@ -234,10 +348,9 @@ class ContentExporter:
             tags=self._comma_sep_qs(page.tags.all()),
             quick_replies=self._comma_sep_qs(page.quick_replies.all()),
             triggers=self._comma_sep_qs(page.triggers.all()),
-            related_pages=self._comma_sep_qs(self._related_pages(page)),
+            related_pages=self._comma_sep_qs(related_pages),
             language_code=page.locale.language_code,
         )
-        self.rows.append(row)
         message_bodies = list(
             zip_longest(
                 page.whatsapp_body,
@@ -247,21 +360,28 @@ class ContentExporter:
                 page.viber_body,
             )
         )
+        if not message_bodies:
+            yield row
+        # The first message is on the page's row, so the row is only complete once
+        # the message has been added to it.
         for msg_blocks in message_bodies:
-            self._export_row_message(row, msg_blocks)
+            yield from self._export_row_message(row, msg_blocks)
             row = row.new_message_row()
 
-    def _export_row_message(self, row: ExportRow, msg_blocks: MsgBlocks) -> None:
+    def _export_row_message(
+        self, row: ExportRow, msg_blocks: MsgBlocks
+    ) -> Iterator[ExportRow]:
         row.add_message_fields(msg_blocks)
-        if self.rows[-1] is not row:
-            self.rows.append(row)
+        yield row
         # Only WhatsappBlock has variations at present.
         if msg_blocks[0] is None or isinstance(msg_blocks[0].value, WhatsAppTemplate):
             return
         for variation in msg_blocks[0].value["variation_messages"]:
-            self.rows.append(row.new_variation_row(variation))
+            yield row.new_variation_row(variation)
 
-    def _export_cpi(self, page: ContentPageIndex, structure: str) -> None:
+    def _export_cpi(
+        self, page: ContentPageIndex, structure: str, parent_title: str
+    ) -> ExportRow:
         """
         Export a ContentPageIndex.
 
@@ -269,31 +389,15 @@ class ContentExporter:
          * We should use the parent slug (which is expected to be unique per
            locale (probably?)) instead of the parent title.
         """
-        row = ExportRow(
+        return ExportRow(
             structure=structure,
             page_id=page.id,
             slug=page.slug,
-            parent=self._parent_title(page),
+            parent=parent_title,
             web_title=page.title,
             translation_tag=str(page.translation_key),
             language_code=page.locale.language_code,
         )
-        self.rows.append(row)
-
-    @staticmethod
-    def _parent_title(page: Page) -> str:
-        parent = page.get_parent()
-        # If the parent is a HomePage, we treat the page as parentless.
-        if parent.content_type.name == HP_CTYPE:
-            return ""
-        return parent.title
-
-    @staticmethod
-    def _related_pages(page: ContentPage) -> list[str]:
-        # Ideally, all related page links would be removed when the page they
-        # link to is deleted. We don't currently do that, so for now we just
-        # make sure that we skip such links during export.
-        return [rp.value.slug for rp in page.related_pages if rp.value is not None]
 
     @staticmethod
     def _comma_sep_qs(unformatted_query: PageQuerySet) -> str:
@@ -302,33 +406,67 @@ class ContentExporter:
 
 @dataclass
 class ExportWriter:
-    rows: list[ExportRow]
+    rows: Iterable[ExportRow]
 
-    def write_csv(self, response: HttpResponse) -> None:
-        writer = csv.DictWriter(response, ExportRow.headings())
-        writer.writeheader()
+    def write_csv(self) -> Iterator[str]:
+        writer = csv.DictWriter(Echo(), ExportRow.headings())
+        yield writer.writeheader()
         for row in self.rows:
-            writer.writerow(row.to_dict())
+            yield writer.writerow(row.to_dict())
+
+    def write_xlsx(self) -> Iterator[bytes]:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        header_style, menu_style = _add_named_styles(workbook)
+        _set_xlsx_layout(worksheet)
+
+        rows = chain([ExportRow.headings()], (row.to_tuple() for row in self.rows))
+        for row_idx, values in enumerate(rows, 1):
+            # Menu rows are highlighted, but the first row after the headings is
+            # styled like the headings.
+            if row_idx <= 2:
+                style = header_style
+            elif isinstance(values[0], str) and "Menu" in values[0]:
+                style = menu_style
+            else:
+                style = None
+            # The first column is left empty as padding
+            cells = xlsx_row(worksheet, [None, *values], style, border_column=5)
+            append_xlsx_row(worksheet, row_idx, cells)
+        yield from stream_workbook(workbook)
 
-    def write_xlsx(self, response: HttpResponse) -> None:
-        workbook = Workbook()
-        worksheet = get_active_sheet(workbook)
 
-        worksheet.append(ExportRow.headings())
-        for row in self.rows:
-            worksheet.append(row.to_tuple())
-        _set_xlsx_styles(workbook, worksheet)
-        workbook.save(response)  # type: ignore
+def _add_named_styles(wb: Workbook) -> tuple[NamedStyle, NamedStyle]:
+    # Colours
+    blue = Color(rgb="0099CCFF")
 
+    # Fills
+    blue_fill = PatternFill(patternType="solid", fgColor=blue)
+
+    # Named Styles
+    header_style = NamedStyle(name="header_style")
+    menu_style = NamedStyle(name="menu_style")
 
-def _set_xlsx_styles(wb: Workbook, sheet: Worksheet) -> None:
-    """Sets the style for the workbook adding any formatting that will make the sheet more aesthetically pleasing"""
+    # Set attributes to styles
+    header_style.font = Font(bold=True, size=10)
+    menu_style.fill = blue_fill
+    menu_style.font = Font(bold=True, size=10)
+
+    # Add named styles to wb
+    wb.add_named_style(header_style)
+    wb.add_named_style(menu_style)
+    return header_style, menu_style
+
+
+def _set_xlsx_layout(sheet: WriteOnlyWorksheet) -> None:
+    """
+    Sets the column widths and frozen panes, which have to be set before any rows
+    are written
+    """
     # Adjustment is because the size in openxlsx and google sheets are not equivalent
     adjustment = 7
-    # Padding
-    sheet.insert_cols(1)
 
-    # Set columns based on best size
+    # Set columns based on best size, after the padding column
 
     column_widths_in_pts = {
         "structure": 110,
@@ -371,55 +509,4 @@ def _set_xlsx_styles(wb: Workbook, sheet: Worksheet) -> None:
         )
 
     # Freeze heading row and side panel, 1 added because it freezes before the column
-    panel_column = get_column_letter(5)
-    sheet.freeze_panes = sheet[f"{panel_column}2"]
-
-    # Colours
-    blue = Color(rgb="0099CCFF")
-
-    # Boarders
-    left_border = Border(left=Side(border_style="thin", color="FF000000"))
-
-    # Fills
-    blue_fill = PatternFill(patternType="solid", fgColor=blue)
-
-    # Named Styles
-    header_style = NamedStyle(name="header_style")
-    menu_style = NamedStyle(name="menu_style")
-
-    # Set attributes to styles
-    header_style.font = Font(bold=True, size=10)
-    menu_style.fill = blue_fill
-    menu_style.font = Font(bold=True, size=10)
-
-    # Add named styles to wb
-    wb.add_named_style(header_style)
-    wb.add_named_style(menu_style)
-
-    # column widths
-
-    # Set menu style for any "Menu" row
-    for row in sheet.iter_rows():
-        if isinstance(row[1].value, str) and "Menu" in row[1].value:
-            for cell in row:
-                cell.style = menu_style
-
-    # Set header style for row 1 and 2
-    for row in sheet["1:2"]:
-        for cell in row:
-            cell.style = header_style
-
-    # Set dividing border for side panel
-    for cell in sheet[f"{panel_column}:{panel_column}"]:
-        cell.border = left_border
-
-    # set font on all cells initially to 10pt and row height
-    general_font = Font(size=10)
-    for index, row in enumerate(sheet.iter_rows()):
-        if index > 2:
-            sheet.row_dimensions[index].height = 60  # type: ignore # Bad annotation.
-        for cell in row:
-            cell.font = general_font
-            alignment = copy.copy(cell.alignment)
-            alignment.wrapText = True
-            cell.alignment = alignment  # type: ignore # Broken typeshed update, maybe?
+    sheet.freeze_panes = f"{get_column_letter(5)}2"
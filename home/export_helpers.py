@@ -0,0 +1,89 @@
+"""
+Exports are streamed, so that the first rows are sent straight away and memory use
+doesn't depend on how much content there is.
+
+CSV rows are written to the response as they're exported. XLSX files are zip files,
+which can't be sent until they're complete, so the rows are written to a
+write-only workbook, which keeps them in a temporary file, and the finished file
+is then streamed in chunks.
+"""
+
+from collections.abc import Iterable, Iterator
+from tempfile import SpooledTemporaryFile
+from typing import Any
+
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from openpyxl.workbook import Workbook
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# How many objects exports fetch from the database at a time
+EXPORT_CHUNK_SIZE = 500
+
+# Finished XLSX files are kept in memory up to this size, and moved to a temporary
+# file on disk if they're bigger
+XLSX_SPOOL_MAX_SIZE = 1024 * 1024
+XLSX_CHUNK_SIZE = 64 * 1024
+
+GENERAL_FONT = Font(size=10)
+WRAP_TEXT = Alignment(wrap_text=True)
+LEFT_BORDER = Border(left=Side(border_style="thin", color="FF000000"))
+
+
+class Echo:
+    """
+    A file-like object that returns what's written to it instead of keeping it, so
+    that csv writers return each row for it to be streamed
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def xlsx_row(
+    worksheet: WriteOnlyWorksheet,
+    values: Iterable[Any],
+    style: NamedStyle | None = None,
+    border_column: int | None = None,
+) -> list[WriteOnlyCell]:
+    """
+    The cells for a row of a write-only worksheet, in the 10pt wrapped text that
+    all our exports use. Write-only worksheets can't be styled after rows are
+    added, so the cells are styled as they're written.
+    """
+    cells = []
+    for column, value in enumerate(values, 1):
+        cell = WriteOnlyCell(worksheet, value)
+        if style is not None:
+            cell.style = style
+        if column == border_column:
+            cell.border = LEFT_BORDER
+        cell.font = GENERAL_FONT
+        cell.alignment = WRAP_TEXT
+        cells.append(cell)
+    return cells
+
+
+def append_xlsx_row(
+    worksheet: WriteOnlyWorksheet, row_idx: int, cells: list[WriteOnlyCell]
+) -> None:
+    """
+    Appends the cells as row `row_idx`, with the row height of our exports. Row
+    heights are only needed while the row is written, so they're removed again.
+    """
+    if row_idx > 2:
+        worksheet.row_dimensions[row_idx].height = 60
+    worksheet.append(cells)
+    worksheet.row_dimensions.pop(row_idx, None)
+
+
+def stream_workbook(workbook: Workbook) -> Iterator[bytes]:
+    """
+    Saves the workbook to a temporary file, and returns its contents in chunks
+    """
+    with SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE) as file:
+        workbook.save(file)
+        file.seek(0)
+        yield from iter(lambda: file.read(XLSX_CHUNK_SIZE), b"")
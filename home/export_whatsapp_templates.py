@@ -1,19 +1,26 @@
-import copy
 import csv
 import io
 import json
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from dataclasses import asdict, astuple, dataclass, fields
+from itertools import chain
 from math import ceil
 
-from django.http import HttpResponse  # type: ignore
-from openpyxl.styles import Border, Color, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles import Color, Font, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 from openpyxl.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 from wagtail import blocks  # type: ignore
 from wagtail.query import PageQuerySet  # type: ignore
 
+from .export_helpers import (
+    EXPORT_CHUNK_SIZE,
+    Echo,
+    append_xlsx_row,
+    stream_workbook,
+    xlsx_row,
+)
+
 
 @dataclass
 class ExportRow:
@@ -45,7 +52,7 @@ class WhatsAppTemplateExporter:
         self.queryset = queryset
 
     def perform_export(self) -> Iterable[ExportRow]:
-        for item in self.queryset:
+        for item in self.queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
             image_link = ""
             if item.image:
                 image_link = item.image.file.url
@@ -110,31 +117,58 @@ class WhatsAppTemplateExportWriter:
     def __init__(self, rows: Iterable[ExportRow]):
         self.rows = rows
 
-    def write_xlsx(self, response: HttpResponse) -> None:
-        workbook = Workbook()
-        worksheet: Worksheet = workbook.active  # type: ignore  # This is not a write or read only workbook
-        worksheet.append(ExportRow.headings())
+    def write_xlsx(self) -> Iterator[bytes]:
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        header_style = _add_named_styles(workbook)
+        _set_xlsx_layout(worksheet)
+
+        rows = chain([ExportRow.headings()], (row.to_tuple() for row in self.rows))
+        for row_idx, values in enumerate(rows, 1):
+            style = header_style if row_idx <= 2 else None
+            # The first column is left empty as padding
+            cells = xlsx_row(worksheet, [None, *values], style, border_column=5)
+            append_xlsx_row(worksheet, row_idx, cells)
+        yield from stream_workbook(workbook)
+
+    def write_csv(self) -> Iterator[str]:
+        writer = csv.DictWriter(Echo(), ExportRow.headings())
+        yield writer.writeheader()
         for row in self.rows:
-            worksheet.append(row.to_tuple())
-        _set_xlsx_styles(workbook, worksheet)
-        workbook.save(response)  # type: ignore
+            yield writer.writerow(row.to_dict())
 
-    def write_csv(self, response: HttpResponse) -> None:
-        writer = csv.DictWriter(f=response, fieldnames=ExportRow.headings())
-        writer.writeheader()
 
-        for row in self.rows:
-            writer.writerow(row.to_dict())
+def _add_named_styles(wb: Workbook) -> NamedStyle:
+    # Colours
+    blue = Color(rgb="0099CCFF")
+
+    # Fills
+    blue_fill = PatternFill(patternType="solid", fgColor=blue)
+
+    # Named Styles
+    header_style = NamedStyle(name="header_style")
+    menu_style = NamedStyle(name="menu_style")
 
+    # Set attributes to styles
+    header_style.font = Font(bold=True, size=10)
+    menu_style.fill = blue_fill
+    menu_style.font = Font(bold=True, size=10)
 
-def _set_xlsx_styles(wb: Workbook, sheet: Worksheet) -> None:
-    """Sets the style for the workbook adding any formatting that will make the sheet more aesthetically pleasing"""
+    # Add named styles to wb
+    wb.add_named_style(header_style)
+    wb.add_named_style(menu_style)
+    return header_style
+
+
+def _set_xlsx_layout(sheet: WriteOnlyWorksheet) -> None:
+    """
+    Sets the column widths and frozen panes, which have to be set before any rows
+    are written
+    """
     # Adjustment is because the size in openxlsx and google sheets are not equivalent
     adjustment = 7
-    # Padding
-    sheet.insert_cols(1)
 
-    # Set columns based on best size
+    # Set columns based on best size, after the padding column
 
     column_widths_in_pts = {
         "name": 110,
@@ -155,49 +189,4 @@ def _set_xlsx_styles(wb: Workbook, sheet: Worksheet) -> None:
         )
 
     # Freeze heading row and side panel, 1 added because it freezes before the column
-    panel_column = get_column_letter(5)
-    sheet.freeze_panes = sheet[f"{panel_column}2"]
-
-    # Colours
-    blue = Color(rgb="0099CCFF")
-
-    # Boarders
-    left_border = Border(left=Side(border_style="thin", color="FF000000"))
-
-    # Fills
-    blue_fill = PatternFill(patternType="solid", fgColor=blue)
-
-    # Named Styles
-    header_style = NamedStyle(name="header_style")
-    menu_style = NamedStyle(name="menu_style")
-
-    # Set attributes to styles
-    header_style.font = Font(bold=True, size=10)
-    menu_style.fill = blue_fill
-    menu_style.font = Font(bold=True, size=10)
-
-    # Add named styles to wb
-    wb.add_named_style(header_style)
-    wb.add_named_style(menu_style)
-
-    # column widths
-
-    # Set header style for row 1 and 2
-    for row in sheet["1:2"]:
-        for cell in row:
-            cell.style = header_style
-
-    # Set dividing border for side panel
-    for cell in sheet[f"{panel_column}:{panel_column}"]:
-        cell.border = left_border
-
-    # set font on all cells initially to 10pt and row height
-    general_font = Font(size=10)
-    for index, row in enumerate(sheet.iter_rows()):
-        if index > 2:
-            sheet.row_dimensions[index].height = 60  # type: ignore # Bad annotation.
-        for cell in row:
-            cell.font = general_font
-            alignment = copy.copy(cell.alignment)
-            alignment.wrapText = True
-            cell.alignment = alignment  # type: ignore # Broken typeshed update, maybe?
+    sheet.freeze_panes = f"{get_column_letter(5)}2"
@@ -1,17 +1,22 @@
 import contextlib
 import csv
+import json
 from collections import defaultdict
-from dataclasses import dataclass, field, fields
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass, field, fields
+from hashlib import sha256
+from io import SEEK_END, BytesIO
 from queue import Queue
-from typing import Any, Union
+from typing import IO, Any, Union
 from uuid import uuid4
 
-from django.core.exceptions import ObjectDoesNotExist, ValidationError  # type: ignore
-from taggit.models import Tag  # type: ignore
+from django.core.exceptions import ValidationError  # type: ignore
+from django.db import transaction
+from taggit.models import Tag, TagBase  # type: ignore
 from treebeard.exceptions import NodeAlreadySaved  # type: ignore
 from wagtail.blocks import StructValue  # type: ignore
 from wagtail.coreutils import get_content_languages  # type: ignore
-from wagtail.models import Locale, Page  # type: ignore
+from wagtail.models import Locale, Page, Revision  # type: ignore
 from wagtail.models.sites import Site  # type: ignore
 from wagtail.rich_text import RichText  # type: ignore
 
@@ -19,13 +24,15 @@ from home.import_helpers import (
     ImportException,
     ImportWarning,
     JSON_loader,
+    chunked,
     parse_file,
-    validate_using_form,
+    validate_fields,
 )
 
 from .models import (
     Assessment,
     ContentPage,
+    ContentPageImportHash,
     ContentPageIndex,
     ContentQuickReply,
     ContentTrigger,
@@ -40,25 +47,40 @@ from .models import (
 
 PageId = tuple[str, Locale]
 
+# Pages are saved, and then published, in batches of this many pages, so that only
+# one batch of pages is in memory at a time
+PAGE_BATCH_SIZE = 500
+
 
 class ContentImporter:
     def __init__(
         self,
-        file_content: bytes,
+        file: bytes | IO[bytes],
         file_type: str,
         progress_queue: Queue[int],
         purge: bool | str = True,
         locale: Locale | str | None = None,
+        dry_run: bool = False,
     ):
         if isinstance(locale, str):
             locale = Locale.objects.get(language_code=locale)
-        self.file_content = file_content
+        if isinstance(file, bytes):
+            file = BytesIO(file)
+        self.file = file
+        self.file_size = file.seek(0, SEEK_END)
+        file.seek(0)
         self.file_type = file_type
         self.progress_queue = progress_queue
         self.purge = purge in ["True", "yes", True]
         self.locale = locale
+        self.dry_run = dry_run
         self.locale_map: dict[str, Locale] = {}
-        self.shadow_pages: dict[PageId, ShadowContentPage] = {}
+        self.lookups = ImportLookups()
+        # The page that the message and variation rows are added to
+        self.current_page: ShadowContentPage | None = None
+        self.unsaved_pages: dict[PageId, ShadowContentPage] = {}
+        self.saved_pages: dict[PageId, SavedContentPage] = {}
+        self.imported_pages: set[PageId] = set()
         self.imported_index_pages: set[PageId] = set()
         self.go_to_page_buttons: dict[PageId, dict[int, list[dict[str, Any]]]] = (
             defaultdict(lambda: defaultdict(list))
@@ -67,6 +89,11 @@ class ContentImporter:
             defaultdict(lambda: defaultdict(list))
         )
         self.import_warnings: list[ImportWarning] = []
+        # The pages (and index pages) in the file, by whether they were created,
+        # updated, or skipped because they haven't changed since they were imported
+        self.created_pages: list[PageId] = []
+        self.updated_pages: list[PageId] = []
+        self.unchanged_pages: list[PageId] = []
 
     def locale_from_display_name(self, langname: str) -> Locale:
         if langname not in self.locale_map:
@@ -83,43 +110,79 @@ class ContentImporter:
             self.locale_map[langname] = Locale.objects.get(language_code=codes[0])
         return self.locale_map[langname]
 
+    @transaction.atomic
     def perform_import(self) -> None:
         rows = self.parse_file()
-        self.set_progress("Loaded file", 5)
 
         if self.purge:
             self.delete_existing_content()
-        self.set_progress("Deleted existing content", 10)
+        self.set_progress("Deleted existing content", 5)
 
         self.process_rows(rows)
-        self.save_pages()
-        self.link_related_pages()
-
-        self.add_go_to_page_items(self.go_to_page_buttons, "buttons")
-
-        self.add_go_to_page_items(self.go_to_page_list_items, "list_items")
-
-        self.add_media_link(rows)
+        self.publish_pages()
+        if self.dry_run:
+            # Everything's been checked, but nothing is kept
+            transaction.set_rollback(True)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.created_pages)} pages created, "
+            f"{len(self.updated_pages)} updated, "
+            f"{len(self.unchanged_pages)} unchanged"
+        )
 
-    def add_media_link(self, rows: list["ContentRow"]) -> None:
-        for row_num, row in enumerate(rows, start=2):
-            if row.media_link:
-                if row.media_link is not None or row.media_link != "":
-                    self.import_warnings.append(
-                        ImportWarning(
-                            f"Media import not supported, {row.media_link} not added to {row.slug}",
-                            row_num,
-                        )
+    def prepare_locale_partitions(self) -> list[Locale]:
+        """
+        Reads the file for the locales of its pages, so that each locale can be
+        imported separately, and creates the tags, quick replies and triggers that
+        the pages use. Importers for different locales can then run at the same time
+        without trying to create the same terms.
+        """
+        locales: dict[int, Locale] = {}
+        tags, quick_replies, triggers = set(), set(), set()
+        for i, row in self.parse_file():
+            try:
+                if row.is_page_index or row.is_content_page:
+                    locale = self._get_locale_from_row(row)
+                    locales.setdefault(locale.pk, locale)
+            except ImportException as e:
+                e.row_num = i
+                e.slug = row.slug
+                e.locale = row.locale
+                raise e
+            if row.is_content_page:
+                tags.update(row.tags)
+                quick_replies.update(row.quick_replies)
+                triggers.update(row.triggers)
+        get_or_create_terms(Tag, tags)
+        get_or_create_terms(ContentQuickReply, quick_replies)
+        get_or_create_terms(ContentTrigger, triggers)
+        return list(locales.values())
+
+    def add_media_link(self, row: "ContentRow", row_num: int) -> None:
+        if row.media_link:
+            if row.media_link is not None or row.media_link != "":
+                self.import_warnings.append(
+                    ImportWarning(
+                        f"Media import not supported, {row.media_link} not added to {row.slug}",
+                        row_num,
                     )
+                )
 
-    def process_rows(self, rows: list["ContentRow"]) -> None:
+    def process_rows(self, rows: Iterator[tuple[int, "ContentRow"]]) -> None:
+        """
+        Adds each row to its page as the file is read. Message and variation rows
+        are for the page in the rows above them, so a page is complete once the
+        next page starts, and is saved with the next batch of pages.
+        """
         # Non-page rows don't have a locale, so we need to remember the last
         # row that does have a locale.
 
         prev_locale: Locale | None = None
-        for i, row in enumerate(rows, start=2):
+        for i, row in rows:
             try:
                 if row.is_page_index:
+                    self.finish_page()
                     prev_locale = self._get_locale_from_row(row)
                     if self.locale and self.locale != prev_locale:
                         # This page index isn't for the locale we're importing, so skip it.
@@ -127,6 +190,7 @@ class ContentImporter:
                     self.create_content_page_index_from_row(row)
 
                 elif row.is_content_page:
+                    self.finish_page()
                     self.create_shadow_content_page_from_row(row, i)
                     prev_locale = self._get_locale_from_row(row)
                 elif row.is_variation_message:
@@ -139,138 +203,259 @@ class ContentImporter:
                 e.slug = row.slug
                 e.locale = row.locale
                 raise e
+            self.add_media_link(row, i)
+
+        self.finish_page()
+        self.save_pages()
 
     def _get_locale_from_row(self, row: "ContentRow") -> Locale:
         if row.language_code:
-            try:
-                return Locale.objects.get(language_code=row.language_code.lower())
-            except Locale.DoesNotExist:
-                # language_code might be a display name, try that
-                return self.locale_from_display_name(row.language_code)
+            locale = self.lookups.locales.get(row.language_code.lower())
+            if locale is not None:
+                return locale
+            # language_code might be a display name, try that
+            return self.locale_from_display_name(row.language_code)
         else:
             return self.locale_from_display_name(row.locale)
 
+    def finish_page(self) -> None:
+        page = self.current_page
+        if page is None:
+            return
+        self.current_page = None
+        key = (page.slug, page.locale)
+        if self.locale and page.locale != self.locale:
+            # This page isn't for the locale we're importing, so skip it.
+            self.go_to_page_buttons.pop(key, None)
+            self.go_to_page_list_items.pop(key, None)
+            return
+        # If the page is in the file more than once, the last one is imported
+        self.unsaved_pages[key] = page
+        if len(self.unsaved_pages) >= PAGE_BATCH_SIZE:
+            self.save_pages()
+
     def save_pages(self) -> None:
-        for i, page in enumerate(self.shadow_pages.values()):
-            if self.locale and page.locale != self.locale:
-                # This page isn't for the locale we're importing, so skip it.
+        """
+        Adds the new pages in the batch to the tree and saves the fields of existing
+        pages, without saving revisions. Related pages and go_to_page links can point
+        at pages later in the file, so they're added once every page has been saved,
+        and then each page is published once, see `publish_pages`.
+        """
+        shadow_pages = list(self.unsaved_pages.values())
+        self.unsaved_pages = {}
+        existing_pages = self.load_existing_pages(shadow_pages)
+        import_hashes = self.load_import_hashes(existing_pages.values())
+        terms = ImportTerms.for_pages(shadow_pages)
+        for page in shadow_pages:
+            key = (page.slug, page.locale)
+            parent = self.get_parent(page)
+            existing_page = existing_pages.get((page.slug, page.locale.pk))
+            content_hash = page.content_hash(
+                self.go_to_page_buttons.get(key, {}),
+                self.go_to_page_list_items.get(key, {}),
+            )
+            if existing_page is None:
+                self.created_pages.append(key)
+            elif import_hashes.get(existing_page.pk) == content_hash:
+                self.unchanged_pages.append(key)
+                self.go_to_page_buttons.pop(key, None)
+                self.go_to_page_list_items.pop(key, None)
                 continue
-            if page.parent:
-                # TODO: We should need to use something unique for `parent`
-                try:
-                    parent = Page.objects.get(title=page.parent, locale=page.locale)
-
-                except Page.DoesNotExist:
-                    raise ImportException(
-                        f"Cannot find parent page with title '{page.parent}' and "
-                        f"locale '{page.locale}'",
-                        page.row_num,
-                    )
-                except Page.MultipleObjectsReturned:
-                    parents = Page.objects.filter(
-                        title=page.parent, locale=page.locale
-                    ).values("slug")
-
-                    # Check which parents are in import vs database only
-                    # Include both ContentPages (shadow_pages) and ContentPageIndex (imported_index_pages)
-                    import_slugs = {
-                        slug for slug, loc in self.shadow_pages if loc == page.locale
-                    } | {
-                        slug
-                        for slug, loc in self.imported_index_pages
-                        if loc == page.locale
-                    }
-
-                    parent_slugs = [p["slug"] for p in parents]
-                    in_import = [s for s in parent_slugs if s in import_slugs]
-                    in_db = [s for s in parent_slugs if s not in import_slugs]
-
-                    lines = [
-                        f"Cannot determine parent for page '{page.slug}'. "
-                        f"Multiple pages found with title '{page.parent}' and locale '{page.locale}':"
-                    ]
-                    if in_import:
-                        lines.append(f"  - Import: {in_import}")
-                    if in_db:
-                        lines.append(f"  - Database: {in_db}")
-                    lines.append("")
-                    lines.append(
-                        "Parent pages must have unique title+locale+slug combinations across Database and Import."
-                    )
-                    lines.append("")
-                    lines.append(
-                        'See <a href="/kb/1/" target="_blank">KB1</a> for detailed resolution steps.'
-                    )
-
-                    raise ImportException("\n".join(lines), page.row_num)
-
-                try:
-                    child = Page.objects.get(slug=page.slug, locale=page.locale)
-
-                except Page.DoesNotExist:
-                    # Nothing to check if the child doesn't exist yet.
-                    pass
-                else:
-                    if child.get_parent().title != page.parent:
-                        raise ImportException(
-                            f"Changing the parent from '{child.get_parent()}' to '{page.parent}' "
-                            f"for the page with title '{page.title}' during import is not allowed. Please use the UI",
-                            page.row_num,
-                        )
-
             else:
-                parent = self.home_page(page.locale)
+                self.updated_pages.append(key)
+            saved_page = page.save(parent, existing_page, terms, self.lookups)
+            self.lookups.add_page(saved_page)
+            self.saved_pages[key] = SavedContentPage(
+                pk=saved_page.pk,
+                locale=page.locale,
+                row_num=page.row_num,
+                related_pages=page.related_pages,
+                content_hash=content_hash,
+            )
+        self.set_progress(
+            "Importing pages", 5 + 45 * self.file.tell() // max(self.file_size, 1)
+        )
 
-            page.save(parent)
-            self.set_progress("Importing pages", 10 + 70 * i // len(self.shadow_pages))
+    def get_parent(self, page: "ShadowContentPage") -> Page:
+        if not page.parent:
+            return self.home_page(page.locale)
 
-    def link_related_pages(self) -> None:
-        for i, page in enumerate(self.shadow_pages.values()):
-            if page.related_pages:
-                page.link_related_pages()
-            self.set_progress(
-                "Linking related pages", 80 + 10 * i // len(self.shadow_pages)
+        # TODO: We should need to use something unique for `parent`
+        parents = self.lookups.pages_titled(page.parent, page.locale)
+        if not parents:
+            raise ImportException(
+                f"Cannot find parent page with title '{page.parent}' and "
+                f"locale '{page.locale}'",
+                page.row_num,
+            )
+        if len(parents) > 1:
+            # Check which parents are in import vs database only
+            # Include both ContentPages and ContentPageIndexes that have been
+            # imported so far
+            import_slugs = {
+                slug for slug, loc in self.imported_pages if loc == page.locale
+            } | {slug for slug, loc in self.imported_index_pages if loc == page.locale}
+
+            parent_slugs = [p.slug for p in parents]
+            in_import = [s for s in parent_slugs if s in import_slugs]
+            in_db = [s for s in parent_slugs if s not in import_slugs]
+
+            lines = [
+                f"Cannot determine parent for page '{page.slug}'. "
+                f"Multiple pages found with title '{page.parent}' and locale '{page.locale}':"
+            ]
+            if in_import:
+                lines.append(f"  - Import: {in_import}")
+            if in_db:
+                lines.append(f"  - Database: {in_db}")
+            lines.append("")
+            lines.append(
+                "Parent pages must have unique title+locale+slug combinations across Database and Import."
+            )
+            lines.append("")
+            lines.append(
+                'See <a href="/kb/1/" target="_blank">KB1</a> for detailed resolution steps.'
             )
 
-    def add_go_to_page_items(
-        self, items_dict: dict[PageId, dict[int, list[dict[str, Any]]]], item_type: str
-    ) -> None:
-        for (slug, locale), messages in items_dict.items():
-            row_num = self.shadow_pages[(slug, locale)].row_num
-            try:
-                page = ContentPage.objects.get(slug=slug, locale=locale)
-            except ContentPage.DoesNotExist:
+            raise ImportException("\n".join(lines), page.row_num)
+
+        child = self.lookups.page_with_slug(page.slug, page.locale)
+        if child is not None:
+            current_parent = self.lookups.get_parent(child, page.locale)
+            if current_parent is not None and current_parent.title != page.parent:
                 raise ImportException(
-                    f"No content pages found with slug '{slug}' and locale '{locale}' for go_to_page {item_type[:-1]} on page '{slug}'"
+                    f"Changing the parent from '{current_parent.title}' to '{page.parent}' "
+                    f"for the page with title '{page.title}' during import is not allowed. Please use the UI",
+                    page.row_num,
                 )
+        return self.lookups.page_object(parents[0].pk)
+
+    def load_existing_pages(
+        self, shadow_pages: list["ShadowContentPage"]
+    ) -> dict[tuple[str, int], ContentPage]:
+        """
+        The pages that are already in the database, by slug and locale id
+        """
+        locales = {page.locale for page in shadow_pages}
+        existing_pages = {}
+        for slugs in chunked({page.slug for page in shadow_pages}):
+            for page in ContentPage.objects.filter(slug__in=slugs, locale__in=locales):
+                existing_pages[(page.slug, page.locale_id)] = page
+        return existing_pages
+
+    @staticmethod
+    def load_import_hashes(pages: Iterable[ContentPage]) -> dict[int, str]:
+        """
+        The hashes of the pages whose live revision is the one that was imported,
+        and that don't have any changes since, by page id
+        """
+        revisions = {
+            page.live_revision_id: page.pk
+            for page in pages
+            if page.live
+            and page.live_revision_id is not None
+            and page.live_revision_id == page.latest_revision_id
+        }
+        hashes = {}
+        for chunk in chunked(revisions):
+            for import_hash in ContentPageImportHash.objects.filter(
+                revision_id__in=chunk
+            ):
+                if revisions[import_hash.revision_id] == import_hash.page_id:
+                    hashes[import_hash.page_id] = import_hash.content_hash
+        return hashes
+
+    def load_link_targets(self, keys: list[PageId]) -> dict[tuple[str, int], Page]:
+        """
+        The pages that these pages link to as related pages or with go_to_page
+        items, by slug and locale id
+        """
+        slugs = set()
+        for key in keys:
+            slugs.update(self.saved_pages[key].related_pages)
+            for items_dict in [self.go_to_page_buttons, self.go_to_page_list_items]:
+                for items in items_dict.get(key, {}).values():
+                    slugs.update(item["slug"] for item in items)
+        locales = {locale for _, locale in keys}
+        targets = {}
+        for chunk in chunked(slugs):
+            for page in Page.objects.filter(slug__in=chunk, locale__in=locales):
+                targets[(page.slug, page.locale_id)] = page
+        return targets
+
+    def add_go_to_page_items(
+        self,
+        key: PageId,
+        page: ContentPage,
+        link_targets: dict[tuple[str, int], Page],
+    ) -> None:
+        slug, locale = key
+        row_num = self.saved_pages[key].row_num
+        items_dicts = [
+            (self.go_to_page_buttons.pop(key, {}), "buttons"),
+            (self.go_to_page_list_items.pop(key, {}), "list_items"),
+        ]
+        if not any(messages for messages, _ in items_dicts):
+            return
+        for messages, item_type in items_dicts:
             for message_index, items in messages.items():
                 for item in items:
                     title = item["title"]
                     try:
-                        related_page = Page.objects.get(
-                            slug=item["slug"], locale=locale
-                        )
-                    except Page.DoesNotExist:
-                        row = self.shadow_pages[(slug, locale)]
+                        related_page = link_targets[(item["slug"], locale.pk)]
+                    except KeyError:
                         raise ImportException(
                             f"No pages found with slug '{item['slug']}' and locale "
                             f"'{locale}' for go_to_page {item_type[:-1]} '{item['title']}' on "
                             f"page '{slug}'",
-                            row.row_num,
+                            row_num,
                         )
                     page.whatsapp_body[message_index].value[item_type].insert(
                         item["index"],
                         ("go_to_page", {"page": related_page, "title": title}),
                     )
-            edit_handler = page.edit_handler.bind_to_model(ContentPage)
-            validate_using_form(edit_handler, page, row_num)
-            page.save()
+        validate_fields(page, row_num)
+
+    def publish_pages(self) -> None:
+        """
+        Adds related pages and go_to_page items to the saved pages, now that every
+        page they can link to exists, and publishes each page
+        """
+        keys = list(self.saved_pages)
+        for i, batch in enumerate(chunked(keys, PAGE_BATCH_SIZE)):
+            pages = ContentPage.objects.in_bulk(
+                [self.saved_pages[key].pk for key in batch]
+            )
+            link_targets = self.load_link_targets(batch)
+            import_hashes = []
+            for key in batch:
+                saved_page = self.saved_pages[key]
+                page = pages[saved_page.pk]
+                if saved_page.related_pages:
+                    saved_page.link_related_pages(page, link_targets)
+                self.add_go_to_page_items(key, page, link_targets)
+                revision = saved_page.publish(page)
+                import_hashes.append(
+                    ContentPageImportHash(
+                        page_id=page.pk,
+                        revision=revision,
+                        content_hash=saved_page.content_hash,
+                    )
+                )
+            ContentPageImportHash.objects.bulk_create(
+                import_hashes,
+                update_conflicts=True,
+                unique_fields=["page"],
+                update_fields=["revision", "content_hash"],
+            )
+            self.set_progress(
+                "Publishing pages",
+                50 + 50 * (i * PAGE_BATCH_SIZE + len(batch)) // len(keys),
+            )
 
-    def parse_file(self) -> list["ContentRow"]:
-        return [
-            ContentRow.from_flat(row, i)
-            for i, row in parse_file(self.file_content, self.file_type)
-        ]
+    def parse_file(self) -> Iterator[tuple[int, "ContentRow"]]:
+        rows = parse_file(self.file, self.file_type)
+        return ((i, ContentRow.from_flat(row, i)) for i, row in rows)
 
     def set_progress(self, message: str, progress: int) -> None:
         self.progress_queue.put_nowait(progress)
@@ -279,34 +464,44 @@ class ContentImporter:
         ContentPage.objects.all().delete()
         ContentPageIndex.objects.all().delete()
 
-    def home_page(self, locale: Locale) -> HomePage:
-        try:
-            return HomePage.objects.get(locale=locale)
-        except ObjectDoesNotExist:
+    def home_page(self, locale: Locale) -> Page:
+        home_page = self.lookups.home_page(locale)
+        if home_page is None:
             raise ImportException(
                 f"You are trying to add a child page to a '{locale}' HomePage that does not exist. Please create the '{locale}' HomePage first"
             )
+        return home_page
 
     def default_locale(self) -> Locale:
-        site = Site.objects.get(is_default_site=True)
-        return site.root_page.locale
+        return self.lookups.default_locale()
 
     def create_content_page_index_from_row(self, row: "ContentRow") -> None:
         locale = self._get_locale_from_row(row)
-        self.imported_index_pages.add((row.slug, locale))
+        key = (row.slug, locale)
+        self.imported_index_pages.add(key)
+        # Translation keys are required for pages with a non-default locale,
+        # but optional for the default locale.
+        translation_key = None
+        if row.translation_tag or locale != self.default_locale():
+            translation_key = row.translation_tag
         try:
             index = ContentPageIndex.objects.get(slug=row.slug, locale=locale)
         except ContentPageIndex.DoesNotExist:
             index = ContentPageIndex(slug=row.slug, locale=locale)
+            self.created_pages.append(key)
+        else:
+            if self.index_page_unchanged(index, row.web_title, translation_key):
+                self.unchanged_pages.append(key)
+                return
+            self.updated_pages.append(key)
         index.title = row.web_title
-        # Translation keys are required for pages with a non-default locale,
-        # but optional for the default locale.
-        if row.translation_tag or locale != self.default_locale():
-            index.translation_key = row.translation_tag
+        if translation_key is not None:
+            index.translation_key = translation_key
         try:
             with contextlib.suppress(NodeAlreadySaved):
                 self.home_page(locale).add_child(instance=index)
             index.save_revision().publish()
+            self.lookups.add_page(index)
         except ValidationError as errors:
             err = []
             for error in errors:
@@ -315,6 +510,24 @@ class ContentImporter:
                     err.append(f"{field_name} - {msg}")
             raise ImportException([f"Validation error: {msg}" for msg in err])
 
+    @staticmethod
+    def index_page_unchanged(
+        index: ContentPageIndex, title: str, translation_key: str | None
+    ) -> bool:
+        """
+        Whether the live index page already has this title and translation key, and
+        doesn't have any changes since it was published
+        """
+        return (
+            index.live
+            and index.live_revision_id is not None
+            and index.live_revision_id == index.latest_revision_id
+            and index.title == title
+            and (
+                translation_key is None or str(index.translation_key) == translation_key
+            )
+        )
+
     def create_shadow_content_page_from_row(
         self, row: "ContentRow", row_num: int
     ) -> None:
@@ -333,23 +546,21 @@ class ContentImporter:
             parent=row.parent,
             related_pages=row.related_pages,
         )
-        self.shadow_pages[(row.slug, locale)] = page
+        self.current_page = page
+        self.imported_pages.add((row.slug, locale))
 
         if row.is_whatsapp_message or row.is_whatsapp_template_message:
             page.whatsapp_title = row.whatsapp_title
             page.enable_whatsapp = True
 
         if row.is_whatsapp_template_message:
-            try:
-                wa_template = WhatsAppTemplate.objects.get(
-                    slug=row.whatsapp_template_slug, locale=locale
-                )
-            except WhatsAppTemplate.DoesNotExist:
+            wa_template = self.lookups.template(row.whatsapp_template_slug, locale)
+            if wa_template is None:
                 raise ImportException(
                     f"The template '{row.whatsapp_template_slug}' does not exist for locale '{locale}'"
                 )
             page.whatsapp_body.append(
-                ShadowWhatsAppTemplate(slug=wa_template.slug, locale=wa_template.locale)
+                ShadowWhatsAppTemplate(slug=wa_template.slug, locale=locale)
             )
 
             if row.is_whatsapp_message:
@@ -383,12 +594,9 @@ class ContentImporter:
     def add_variation_to_shadow_content_page_from_row(
         self, row: "ContentRow", locale: Locale
     ) -> None:
-        try:
-            page = self.shadow_pages[(row.slug, locale)]
-        except KeyError:
-            raise ImportException(
-                f"This is a variation for the content page with slug '{row.slug}' and locale '{locale}', but no such page exists"
-            )
+        page = self._get_shadow_page(
+            row.slug, locale, "This is a variation for the content page"
+        )
         whatsapp_block = page.whatsapp_body[-1]
 
         if isinstance(whatsapp_block, ShadowWhatsappBlock):
@@ -399,23 +607,33 @@ class ContentImporter:
                 )
             )
 
-    def _get_shadow_page(self, slug: str, locale: Locale) -> Page:
-        try:
-            return self.shadow_pages[(slug, locale)]
-        except KeyError:
+    def _get_shadow_page(
+        self, slug: str, locale: Locale, row_type: str = "This is a message for page"
+    ) -> "ShadowContentPage":
+        """
+        Message and variation rows are for the page in the rows above them
+        """
+        page = self.current_page
+        if page is not None and (page.slug, page.locale) == (slug, locale):
+            return page
+        if (slug, locale) in self.imported_pages:
             raise ImportException(
-                f"This is a message for page with slug '{slug}' and locale '{locale}', but no such page exists"
+                f"{row_type} with slug '{slug}' and locale '{locale}', but it isn't "
+                f"in the rows that follow that page"
             )
+        raise ImportException(
+            f"{row_type} with slug '{slug}' and locale '{locale}', but no such page exists"
+        )
 
     def _get_form(
         self, slug: str, locale: Locale, title: str, page_slug: str, item_type: str
-    ) -> Assessment:
-        try:
-            return Assessment.objects.get(slug=slug, locale=locale)
-        except Assessment.DoesNotExist:
+    ) -> int:
+        form_id = self.lookups.form_id(slug, locale)
+        if form_id is None:
             raise ImportException(
                 f"No form found with slug '{slug}' and locale '{locale}' for go_to_form {item_type} '{title}' on page '{page_slug}'"
             )
+        return form_id
 
     def _create_interactive_items(
         self,
@@ -445,7 +663,7 @@ class ContentImporter:
                     page_gtp = go_to_page[(slug, locale)]
                     page_gtp[len(page.whatsapp_body)].append(item)
                 elif item["type"] == "go_to_form":
-                    form = self._get_form(
+                    form_id = self._get_form(
                         item["slug"],
                         locale,
                         item["title"],
@@ -458,7 +676,7 @@ class ContentImporter:
                             "type": item["type"],
                             "value": {
                                 "title": item["title"],
-                                "form": form.id,
+                                "form": form_id,
                             },
                         }
                     )
@@ -475,15 +693,9 @@ class ContentImporter:
     def add_message_to_shadow_content_page_from_row(
         self, row: "ContentRow", locale: Locale
     ) -> None:
-        try:
-            page = self.shadow_pages[(row.slug, locale)]
-        except KeyError:
-            raise ImportException(
-                f"This is a message for page with slug '{row.slug}' and locale '{locale}', but no such page exists"
-            )
+        page = self._get_shadow_page(row.slug, locale)
         if row.is_whatsapp_message:
             page.enable_whatsapp = True
-            page = self._get_shadow_page(row.slug, locale)
             buttons = self._create_interactive_items(
                 row.buttons, page, row.slug, locale, "button"
             )
@@ -554,42 +766,54 @@ class ShadowContentPage:
     triggers: list[str] = field(default_factory=list)
     related_pages: list[str] = field(default_factory=list)
 
+    def content_hash(self, *extra: Any) -> str:
+        """
+        A hash of everything that's imported into the page, along with `extra`
+        things that are imported separately, e.g. go_to_page items. The row number
+        is left out, so that moving a page in the file doesn't change it.
+        """
+        content = asdict(self)
+        del content["row_num"]
+        data = json.dumps([content, *extra], sort_keys=True, default=str)
+        return sha256(data.encode()).hexdigest()
+
     # FIXME: collect errors across all fields
-    def validate_page_using_form(self, page: Page) -> None:
-        edit_handler = page.edit_handler.bind_to_model(ContentPage)
-        validate_using_form(edit_handler, page, self.row_num)
+    def validate_page(self, page: Page) -> None:
+        validate_fields(page, self.row_num)
 
-    def save(self, parent: Page) -> None:
-        try:
-            page = ContentPage.objects.get(slug=self.slug, locale=self.locale)
-        except ContentPage.DoesNotExist:
+    def save(
+        self,
+        parent: Page,
+        page: ContentPage | None,
+        terms: "ImportTerms",
+        lookups: "ImportLookups",
+    ) -> ContentPage:
+        """
+        Updates and saves `page`, or creates a new page if it's None and adds it to
+        the tree. The revision is saved by `SavedContentPage.publish`.
+        """
+        if page is None:
             page = ContentPage(slug=self.slug, locale=self.locale)
 
         self.add_web_to_page(page)
-        self.add_whatsapp_to_page(page)
+        self.add_whatsapp_to_page(page, lookups)
         self.add_sms_to_page(page)
         self.add_ussd_to_page(page)
         self.add_messenger_to_page(page)
         self.add_viber_to_page(page)
-        self.add_tags_to_page(page)
-        self.add_quick_replies_to_page(page)
-        self.add_triggers_to_page(page)
-        self.validate_page_using_form(page)
+        self.add_tags_to_page(page, terms.tags)
+        self.add_quick_replies_to_page(page, terms.quick_replies)
+        self.add_triggers_to_page(page, terms.triggers)
+        self.validate_page(page)
 
         try:
-            with contextlib.suppress(NodeAlreadySaved):
+            if page.pk is None:
                 parent.add_child(instance=page)
-            page.save_revision().publish()
-
+            else:
+                page.save()
         except ValidationError as errors:
-            err = []
-            for error in errors:
-                field_name = error[0]
-                for msg in error[1]:
-                    err.append(f"{field_name} - {msg}")
-            raise ImportException(
-                [f"Validation error: {msg}" for msg in err], self.row_num
-            )
+            raise validation_exception(errors, self.row_num)
+        return page
 
     def add_web_to_page(self, page: ContentPage) -> None:
         page.enable_web = self.enable_web
@@ -599,11 +823,11 @@ class ShadowContentPage:
         if self.translation_key is not None:
             page.translation_key = self.translation_key
 
-    def add_whatsapp_to_page(self, page: ContentPage) -> None:
+    def add_whatsapp_to_page(self, page: ContentPage, lookups: "ImportLookups") -> None:
         page.enable_whatsapp = self.enable_whatsapp
         page.whatsapp_title = self.whatsapp_title
         page.whatsapp_body.clear()
-        for message in self.formatted_whatsapp_body:
+        for message in self.formatted_whatsapp_body(lookups):
             body_type = (
                 "Whatsapp_Template"
                 if isinstance(message, WhatsAppTemplate)
@@ -639,41 +863,22 @@ class ShadowContentPage:
         for message in self.formatted_viber_body:
             page.viber_body.append(("viber_message", message))
 
-    def add_tags_to_page(self, page: ContentPage) -> None:
+    def add_tags_to_page(self, page: ContentPage, tags: dict[str, Tag]) -> None:
         page.tags.clear()
         for tag_name in self.tags:
-            tag, _ = Tag.objects.get_or_create(name=tag_name)
-            page.tags.add(tag)
+            page.tags.add(tags[tag_name])
 
-    def add_quick_replies_to_page(self, page: ContentPage) -> None:
+    def add_quick_replies_to_page(
+        self, page: ContentPage, quick_replies: dict[str, ContentQuickReply]
+    ) -> None:
         for quick_reply_name in self.quick_replies:
-            quick_reply, _ = ContentQuickReply.objects.get_or_create(
-                name=quick_reply_name
-            )
-            page.quick_replies.add(quick_reply)
+            page.quick_replies.add(quick_replies[quick_reply_name])
 
-    def add_triggers_to_page(self, page: ContentPage) -> None:
+    def add_triggers_to_page(
+        self, page: ContentPage, triggers: dict[str, ContentTrigger]
+    ) -> None:
         for trigger_name in self.triggers:
-            trigger, _ = ContentTrigger.objects.get_or_create(name=trigger_name)
-            page.triggers.add(trigger)
-
-    def link_related_pages(self) -> None:
-        page = ContentPage.objects.get(slug=self.slug, locale=self.locale)
-        related_pages = []
-        for related_page_slug in self.related_pages:
-            try:
-                related_page = Page.objects.get(
-                    slug=related_page_slug, locale=self.locale
-                )
-            except Page.DoesNotExist:
-                raise ImportException(
-                    f"Cannot find related page with slug '{related_page_slug}' and "
-                    f"locale '{self.locale}'",
-                    self.row_num,
-                )
-            related_pages.append(("related_page", related_page))
-        page.related_pages = related_pages
-        page.save_revision().publish()
+            page.triggers.add(triggers[trigger_name])
 
     @property
     def formatted_body(self) -> list[tuple[str, RichText]]:
@@ -685,13 +890,13 @@ class ShadowContentPage:
                 formatted.append(("paragraph", RichText(line)))
         return formatted
 
-    @property
-    def formatted_whatsapp_body(self) -> list[StructValue]:
-        formatted = []
+    def formatted_whatsapp_body(
+        self, lookups: "ImportLookups"
+    ) -> list[StructValue | WhatsAppTemplate]:
+        formatted: list[StructValue | WhatsAppTemplate] = []
         for m in self.whatsapp_body:
             if isinstance(m, ShadowWhatsAppTemplate):
-                template = WhatsAppTemplate.objects.get(slug=m.slug, locale=m.locale)
-                formatted.append(template)
+                formatted.append(lookups.template(m.slug, self.locale))
             else:
                 formatted.append(WhatsappBlock().to_python(m.wagtail_format))
 
@@ -716,6 +921,223 @@ class ShadowContentPage:
         return [ViberBlock().to_python(m.wagtail_format) for m in self.viber_body]
 
 
+@dataclass(slots=True)
+class SavedContentPage:
+    """
+    What's kept of a ShadowContentPage once it's been saved, to link and publish it
+    """
+
+    pk: int
+    locale: Locale
+    row_num: int
+    related_pages: list[str]
+    content_hash: str
+
+    def link_related_pages(
+        self, page: ContentPage, link_targets: dict[tuple[str, int], Page]
+    ) -> None:
+        related_pages = []
+        for related_page_slug in self.related_pages:
+            try:
+                related_page = link_targets[(related_page_slug, self.locale.pk)]
+            except KeyError:
+                raise ImportException(
+                    f"Cannot find related page with slug '{related_page_slug}' and "
+                    f"locale '{self.locale}'",
+                    self.row_num,
+                )
+            related_pages.append(("related_page", related_page))
+        page.related_pages = related_pages
+
+    def publish(self, page: ContentPage) -> Revision:
+        try:
+            revision = page.save_revision()
+            revision.publish()
+            return revision
+        except ValidationError as errors:
+            raise validation_exception(errors, self.row_num)
+
+
+def validation_exception(errors: ValidationError, row_num: int) -> ImportException:
+    err = []
+    for error in errors:
+        field_name = error[0]
+        for msg in error[1]:
+            err.append(f"{field_name} - {msg}")
+    return ImportException([f"Validation error: {msg}" for msg in err], row_num)
+
+
+@dataclass(slots=True)
+class ImportTerms:
+    """
+    The tags, quick replies and triggers used by the imported pages, by name
+    """
+
+    tags: dict[str, Tag]
+    quick_replies: dict[str, ContentQuickReply]
+    triggers: dict[str, ContentTrigger]
+
+    @classmethod
+    def for_pages(cls, pages: list[ShadowContentPage]) -> "ImportTerms":
+        return cls(
+            tags=get_or_create_terms(Tag, {n for p in pages for n in p.tags}),
+            quick_replies=get_or_create_terms(
+                ContentQuickReply, {n for p in pages for n in p.quick_replies}
+            ),
+            triggers=get_or_create_terms(
+                ContentTrigger, {n for p in pages for n in p.triggers}
+            ),
+        )
+
+
+def get_or_create_terms(model: type[TagBase], names: set[str]) -> dict[str, Any]:
+    """
+    Looks up the terms with these names, and creates any that don't exist yet, in a
+    few queries instead of a get_or_create for each name
+    """
+    terms = {}
+    for chunk in chunked(names):
+        terms.update({t.name: t for t in model.objects.filter(name__in=chunk)})
+    new_terms = {}
+    for name in sorted(names - terms.keys()):
+        term = model(name=name)
+        term.slug = term.slugify(name)
+        new_terms[term.slug] = term
+    taken_slugs = set()
+    for chunk in chunked(new_terms):
+        taken_slugs.update(
+            model.objects.filter(slug__in=chunk).values_list("slug", flat=True)
+        )
+    model.objects.bulk_create(
+        t for slug, t in new_terms.items() if slug and slug not in taken_slugs
+    )
+    for chunk in chunked(names - terms.keys()):
+        terms.update({t.name: t for t in model.objects.filter(name__in=chunk)})
+    # Terms whose slugs are taken, e.g. names that only differ by case, need
+    # numbered slugs, which get_or_create takes care of
+    for name in names - terms.keys():
+        terms[name], _ = model.objects.get_or_create(name=name)
+    return terms
+
+
+@dataclass(slots=True)
+class IndexedPage:
+    pk: int
+    slug: str
+    title: str
+    path: str
+
+
+class LocalePages:
+    """
+    A locale's pages, by path, slug and title
+    """
+
+    def __init__(self, pages: Iterable[IndexedPage]) -> None:
+        self.by_path: dict[str, IndexedPage] = {}
+        self.by_slug: dict[str, IndexedPage] = {}
+        self.by_title: dict[str, list[IndexedPage]] = defaultdict(list)
+        for page in pages:
+            self.add(page)
+
+    def add(self, page: IndexedPage) -> None:
+        old = self.by_path.get(page.path)
+        if old is not None:
+            self.by_title[old.title].remove(old)
+            if self.by_slug.get(old.slug) is old:
+                del self.by_slug[old.slug]
+        self.by_path[page.path] = page
+        self.by_slug[page.slug] = page
+        self.by_title[page.title].append(page)
+
+
+class ImportLookups:
+    """
+    The locales, pages, WhatsApp templates and forms that the rows of an import
+    refer to. Each locale's pages, templates and forms are loaded with a query each
+    the first time a row for that locale needs them, and pages are added as they're
+    saved, so that the lookups for each row don't need any queries.
+    """
+
+    def __init__(self) -> None:
+        self.locales = {locale.language_code: locale for locale in Locale.objects.all()}
+        self._default_locale: Locale | None = None
+        self._pages: dict[int, LocalePages] = {}
+        self._home_page_ids: dict[int, int | None] = {}
+        # The pages that children are added to. Treebeard keeps count of each
+        # page's children on the instance, so we reuse the same instance.
+        self._page_objects: dict[int, Page] = {}
+        self._templates: dict[int, dict[str, WhatsAppTemplate]] = {}
+        self._form_ids: dict[int, dict[str, int]] = {}
+
+    def default_locale(self) -> Locale:
+        if self._default_locale is None:
+            site = Site.objects.select_related("root_page__locale").get(
+                is_default_site=True
+            )
+            self._default_locale = site.root_page.locale
+        return self._default_locale
+
+    def _locale_pages(self, locale: Locale) -> LocalePages:
+        if locale.pk not in self._pages:
+            pages = (
+                Page.objects.filter(locale=locale)
+                .order_by("path")
+                .values_list("pk", "slug", "title", "path")
+            )
+            self._pages[locale.pk] = LocalePages(
+                IndexedPage(*page) for page in pages.iterator()
+            )
+        return self._pages[locale.pk]
+
+    def pages_titled(self, title: str, locale: Locale) -> list[IndexedPage]:
+        return self._locale_pages(locale).by_title.get(title, [])
+
+    def page_with_slug(self, slug: str, locale: Locale) -> IndexedPage | None:
+        return self._locale_pages(locale).by_slug.get(slug)
+
+    def get_parent(self, page: IndexedPage, locale: Locale) -> IndexedPage | None:
+        return self._locale_pages(locale).by_path.get(page.path[: -Page.steplen])
+
+    def add_page(self, page: Page) -> None:
+        """
+        Adds a page that was created or changed by the import
+        """
+        self._locale_pages(page.locale).add(
+            IndexedPage(page.pk, page.slug, page.title, page.path)
+        )
+
+    def page_object(self, pk: int) -> Page:
+        if pk not in self._page_objects:
+            self._page_objects[pk] = Page.objects.get(pk=pk)
+        return self._page_objects[pk]
+
+    def home_page(self, locale: Locale) -> Page | None:
+        if locale.pk not in self._home_page_ids:
+            self._home_page_ids[locale.pk] = (
+                HomePage.objects.filter(locale=locale)
+                .values_list("pk", flat=True)
+                .first()
+            )
+        pk = self._home_page_ids[locale.pk]
+        return None if pk is None else self.page_object(pk)
+
+    def template(self, slug: str, locale: Locale) -> WhatsAppTemplate | None:
+        if locale.pk not in self._templates:
+            self._templates[locale.pk] = {
+                template.slug: template
+                for template in WhatsAppTemplate.objects.filter(locale=locale)
+            }
+        return self._templates[locale.pk].get(slug)
+
+    def form_id(self, slug: str, locale: Locale) -> int | None:
+        if locale.pk not in self._form_ids:
+            self._form_ids[locale.pk] = dict(
+                Assessment.objects.filter(locale=locale).values_list("slug", "pk")
+            )
+        return self._form_ids[locale.pk].get(slug)
+
+
 @dataclass(slots=True)
 class ShadowWhatsappBlock:
     message: str = ""
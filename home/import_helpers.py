@@ -1,25 +1,32 @@
 # The error messages are processed and parsed into a list of messages we return to the user
 import csv
 import json
-from collections.abc import Iterator, Sequence
+import shutil
+from collections.abc import Iterable, Iterator, Sequence
 from datetime import datetime
-from io import BytesIO, StringIO
+from functools import cache
+from io import BytesIO
+from itertools import chain
 from json.decoder import JSONDecodeError
-from typing import Any
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any
 
-from django.core.exceptions import ValidationError  # type: ignore
-from django.db.models import Model  # type: ignore
+from django.core.exceptions import FieldDoesNotExist, ValidationError  # type: ignore
+from django.db.models import Field, Model  # type: ignore
 from django.forms import model_to_dict  # type: ignore
 from openpyxl import load_workbook
+from wagtail.admin.panels import get_edit_handler  # type: ignore
 from wagtail.admin.rich_text.converters.contentstate import (  # type: ignore
     ContentstateConverter,  # type: ignore
 )
 from wagtail.blocks import (  # type: ignore
+    RichTextBlock,
     StreamBlockValidationError,
     StreamValue,
     StructValue,  # type: ignore
 )
 from wagtail.blocks.list_block import ListValue  # type: ignore
+from wagtail.fields import StreamField  # type: ignore
 from wagtail.models import Locale  # type: ignore
 from wagtail.rich_text import RichText  # type: ignore
 from wagtail.test.utils.form_data import nested_form_data, streamfield  # type: ignore
@@ -114,18 +121,80 @@ def validate_using_form(edit_handler: Any, model: Model, row_num: int) -> None:
 
     form = form_class(form_data)
     if not form.is_valid():
-        errs = form.errors.as_data()
-        if "slug" in errs:
-            errs["slug"] = [err for err in errs["slug"] if err.code != "slug-in-use"]
-            if not errs["slug"]:
-                del errs["slug"]
-        # TODO: better error stuff
-        if errs:
-            errors = []
-            error_message = errors_to_list(errs)
-            for err in error_message:
-                errors.append(f"Validation error: {err}")
-            raise ImportException(errors, row_num)
+        raise_validation_errors(form.errors.as_data(), row_num)
+
+
+def validate_fields(model: Model, row_num: int) -> None:
+    """
+    Validates the fields in the model's edit form without building the form, and
+    raises the same errors as `validate_using_form`. StreamFields are cleaned by
+    their blocks, using the values that are already on the model, instead of
+    converting them to form data and back, and other fields are cleaned by their
+    form fields.
+    """
+    errs: dict[str, list[ValidationError]] = {}
+    for field, form_field in _edit_form_fields(type(model)):
+        value = field.value_from_object(model)
+        try:
+            if isinstance(field, StreamField):
+                field.stream_block.clean(without_rich_text(value))
+            else:
+                form_field.clean(value)
+        except ValidationError as e:
+            errs[field.name] = e.error_list
+    if errs:
+        raise_validation_errors(errs, row_num)
+
+
+def without_rich_text(value: StreamValue) -> StreamValue:
+    """
+    The form converts rich text to the editor's format and back, which is never
+    empty, so rich text blocks always pass the form's validation and aren't cleaned
+    """
+    if not any(isinstance(child.block, RichTextBlock) for child in value):
+        return value
+    return StreamValue(
+        value.stream_block,
+        [
+            (child.block_type, child.value, child.id)
+            for child in value
+            if not isinstance(child.block, RichTextBlock)
+        ],
+    )
+
+
+@cache
+def _edit_form_fields(model_class: type[Model]) -> list[tuple[Field, Any]]:
+    """
+    The model fields in the edit form, in the order that the form validates them,
+    with their form fields. Relations, e.g. tags, aren't included.
+    """
+    form_class = get_edit_handler(model_class).get_form_class()
+    fields = []
+    for name, form_field in form_class.base_fields.items():
+        try:
+            field = model_class._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete and not field.is_relation:
+            fields.append((field, form_field))
+    return fields
+
+
+def raise_validation_errors(
+    errs: dict[str, list[ValidationError]], row_num: int
+) -> None:
+    if "slug" in errs:
+        errs["slug"] = [err for err in errs["slug"] if err.code != "slug-in-use"]
+        if not errs["slug"]:
+            del errs["slug"]
+    # TODO: better error stuff
+    if errs:
+        errors = []
+        error_message = errors_to_list(errs)
+        for err in error_message:
+            errors.append(f"Validation error: {err}")
+        raise ImportException(errors, row_num)
 
 
 def errors_to_list(errs: Any) -> Any:
@@ -190,11 +259,11 @@ def errors_to_list(errs: Any) -> Any:
     return error_message
 
 
-def check_empty_rows(rows: list[dict[str, Any]], row_num: int) -> None:
+def check_empty_rows(first_row: dict[str, Any] | None, row_num: int) -> None:
     """
-    Checks if the list of rows is empty and raises an exception if true.
+    Checks if the file has no rows and raises an exception if true.
     """
-    if not rows:
+    if first_row is None:
         raise ImportException(
             "The import file is empty or contains no valid rows.", row_num=row_num
         )
@@ -258,31 +327,54 @@ def _normalise_value(value: str | None) -> str | None:
     return value.strip()
 
 
+# Uploaded files are kept in memory up to this size while they're imported, and
+# moved to a temporary file on disk if they're bigger
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def spool_file(file: IO[bytes]) -> IO[bytes]:
+    """
+    Copies an uploaded file to a temporary file, in chunks, so that large files
+    don't have to be read into memory
+    """
+    spooled = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    shutil.copyfileobj(file, spooled)
+    spooled.seek(0)
+    return spooled  # type: ignore
+
+
 def parse_file(
-    file_content: bytes, file_type: str
+    file: bytes | IO[bytes], file_type: str
 ) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Reads the rows of the file as they're needed, so that only the current row is
+    in memory. Headers and empty files are checked before the first row is returned.
+    """
+    if isinstance(file, bytes):
+        file = BytesIO(file)
     read_rows = read_xlsx if file_type == "XLSX" else read_csv
-    rows = list(fix_rows(read_rows(file_content)))
+    rows = fix_rows(read_rows(file))
 
-    check_empty_rows(rows, row_num=1)
+    first_row = next(rows, None)
+    check_empty_rows(first_row, row_num=1)
 
-    return enumerate(rows, start=2)
+    return enumerate(chain([first_row], rows), start=2)
 
 
-def read_csv(file_content: bytes) -> Iterator[dict[str, Any]]:
-    content = StringIO(file_content.decode())
-    # Read first line to check for duplicates
-    first_line = content.readline()
-    headers = [h.strip() for h in next(csv.reader([first_line]))]
+def read_csv(file: IO[bytes]) -> Iterator[dict[str, Any]]:
+    # UTF-8 never uses newline bytes in multibyte characters, so the file can be
+    # split into lines before they're decoded
+    content = (line.decode() for line in file)
+    # Read the header row to check for duplicates
+    fieldnames = next(csv.reader(content), [])
+    headers = [h.strip() for h in fieldnames]
     # Filter out empty headers before checking for duplicates
     non_empty_headers = [h for h in headers if h]
     if len(non_empty_headers) != len(set(non_empty_headers)):
         raise ImportException(
             "Invalid format. Please check that there are no duplicate headers."
         )
-    # Reset to beginning and create DictReader
-    content.seek(0)
-    return csv.DictReader(content)
+    return csv.DictReader(content, fieldnames)
 
 
 def remove_trailing_nones(row: Sequence[Any]) -> list[Any]:
@@ -296,8 +388,8 @@ def clean_excel_cell(cell_value: str | float | datetime | None) -> str:
     return "" if cell_value is None else str(cell_value).replace("_x000D", "").strip()
 
 
-def read_xlsx(file_content: bytes) -> Iterator[dict[str, Any]]:
-    workbook = load_workbook(BytesIO(file_content), read_only=True, data_only=True)
+def read_xlsx(file: IO[bytes]) -> Iterator[dict[str, Any]]:
+    workbook = load_workbook(file, read_only=True, data_only=True)
     worksheet = get_active_sheet(workbook)
 
     first_row = next(worksheet.iter_rows(max_row=1, values_only=True))
@@ -318,6 +410,21 @@ def read_xlsx(file_content: bytes) -> Iterator[dict[str, Any]]:
             yield r
 
 
+def chunked(values: Iterable[Any], size: int = 500) -> Iterator[list[Any]]:
+    """
+    Splits values into lists of at most `size`, to keep `__in` lookups under the
+    database's query parameter limit
+    """
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def JSON_loader(row_num: int, value: str) -> list[dict[str, Any]]:
     if not value:
         return []
@@ -0,0 +1,391 @@
+"""
+Imports can take minutes, so they're run in the background. The upload views save
+the uploaded file as an ImportJob, and then poll the job by its id for progress and
+the result, so any web process can serve the polling requests.
+
+IMPORT_JOB_RUNNER selects where jobs are run:
+
+thread
+    Each job is run in a background thread in the web process that it was uploaded
+    to. This is the default. If the process stops while the job is running, the job
+    fails.
+worker
+    Jobs are run one at a time, in the order they were uploaded, by the
+    `run_import_jobs` management command, which should be run as a separate worker.
+    If a worker stops while a job is running, the job is run again by the next
+    worker.
+
+With IMPORT_PARTITION_BY_LOCALE, content imports for every locale that don't purge
+existing content are split into a job for each locale in the file, which are run at
+the same time by the threads or workers, see `split_job`.
+
+A running job is leased to whatever is running it, until its `locked_until`. The
+lease is renewed by a background thread while the job runs, see `JobLease`, so a
+running job whose lease has expired has been stopped, however long any step of the
+import takes.
+
+Progress is saved in the default cache, which needs to be shared between the web
+processes and workers (e.g. Redis) for the progress bar to work.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from logging import getLogger
+from queue import Queue
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.files.base import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .assessment_import_export import import_assessment
+from .content_import_export import import_content
+from .import_content_pages import ContentImporter
+from .import_helpers import (
+    ImportAssessmentException,
+    ImportException,
+    ImportWarning,
+    spool_file,
+)
+from .models import ImportJob, OrderedContentSet
+from .ordered_content_import_export import import_ordered_sets
+from .whatsapp_template_import_export import import_whatsapptemplate
+
+logger = getLogger(__name__)
+
+# The shortest time between saving progress that hasn't changed, so that the
+# progress bar doesn't disappear during long rows
+HEARTBEAT_INTERVAL = 10
+
+
+def get_progress_key(job_id: int) -> str:
+    return f"import-job:{job_id}:progress"
+
+
+def get_progress(job_id: int) -> int | None:
+    """
+    The latest progress of a running job, as a percentage, or None if it hasn't
+    been updated for IMPORT_JOB_TIMEOUT seconds
+    """
+    return cache.get(get_progress_key(job_id))
+
+
+class JobProgress(Queue[int]):
+    """
+    Takes the place of the progress queue that importers put their progress on, and
+    saves the progress to the cache instead
+    """
+
+    def __init__(self, job_id: int) -> None:
+        super().__init__()
+        self.job_id = job_id
+        self.progress: int | None = None
+        self.saved_at = 0.0
+
+    def put_nowait(self, item: int) -> None:
+        now = time.monotonic()
+        if item != self.progress or now - self.saved_at >= HEARTBEAT_INTERVAL:
+            cache.set(
+                get_progress_key(self.job_id), item, timeout=settings.IMPORT_JOB_TIMEOUT
+            )
+            self.progress = item
+            self.saved_at = now
+
+
+def get_lease_end():
+    return timezone.now() + timedelta(seconds=settings.IMPORT_JOB_TIMEOUT)
+
+
+class JobLease:
+    """
+    Renews a running job's lease from a background thread until the job's finished,
+    so that nothing else runs it again while it's in a long step that doesn't report
+    any progress, e.g. purging content or reading a large file
+    """
+
+    def __init__(self, job: ImportJob) -> None:
+        self.job = job
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self._renew, name=f"ImportJobLease-{job.pk}", daemon=True
+        )
+
+    def __enter__(self) -> "JobLease":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopping.set()
+        self.thread.join()
+
+    def _renew(self) -> None:
+        try:
+            while not self.stopping.wait(settings.IMPORT_JOB_TIMEOUT / 3):
+                ImportJob.objects.filter(
+                    pk=self.job.pk,
+                    status=ImportJob.Status.RUNNING,
+                    attempts=self.job.attempts,
+                ).update(locked_until=get_lease_end())
+        finally:
+            # This thread's connection would otherwise stay open
+            connection.close()
+
+
+def create_job(
+    kind: str,
+    file: File | None,
+    file_type: str,
+    purge: bool,
+    locale=None,
+    partition_of=None,
+) -> ImportJob:
+    """
+    Saves an import job, and starts it if jobs are run in threads. The file is
+    copied to storage in chunks, so it's never all in memory.
+    """
+    job = ImportJob(
+        kind=kind,
+        file_type=file_type,
+        purge=purge,
+        locale=locale,
+        partition_of=partition_of,
+    )
+    if file is not None:
+        job.file.save(file.name or "import", file, save=False)
+    job.save()
+    if settings.IMPORT_JOB_RUNNER == "thread":
+        transaction.on_commit(lambda: start_thread(job.pk))
+    return job
+
+
+def start_thread(job_id: int) -> None:
+    threading.Thread(
+        target=_run_in_thread, args=(job_id,), name=f"ImportJob-{job_id}"
+    ).start()
+
+
+def _run_in_thread(job_id: int) -> None:
+    try:
+        job = claim_job(job_id)
+        if job is not None:
+            run_job(job)
+    finally:
+        # This thread's connection would otherwise stay open
+        connection.close()
+
+
+def claim_job(job_id: int) -> ImportJob | None:
+    """
+    Marks a queued job as running, unless something else has already started it
+    """
+    claimed = ImportJob.objects.filter(
+        pk=job_id, status=ImportJob.Status.QUEUED
+    ).update(status=ImportJob.Status.RUNNING)
+    if not claimed:
+        return None
+    return _start(ImportJob.objects.get(pk=job_id))
+
+
+def claim_next_job() -> ImportJob | None:
+    """
+    Marks the oldest queued job, or a running job whose lease has expired, as
+    running and returns it. Returns None if there aren't any jobs to run.
+    """
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=ImportJob.Status.QUEUED)
+                | Q(status=ImportJob.Status.RUNNING, locked_until__lt=timezone.now())
+                | Q(status=ImportJob.Status.RUNNING, locked_until=None)
+            )
+            .order_by("created_at", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ImportJob.Status.RUNNING
+        return _start(job)
+
+
+def _start(job: ImportJob) -> ImportJob:
+    job.started_at = timezone.now()
+    job.locked_until = get_lease_end()
+    job.attempts += 1
+    job.save(update_fields=["status", "started_at", "locked_until", "attempts"])
+    JobProgress(job.pk).put_nowait(0)
+    return job
+
+
+def is_stopped(job: ImportJob) -> bool:
+    """
+    Whether a running job has stopped without finishing
+    """
+    return job.status == ImportJob.Status.RUNNING and (
+        job.locked_until is None or job.locked_until < timezone.now()
+    )
+
+
+def fail_stopped_job(job: ImportJob) -> None:
+    """
+    Jobs run in threads aren't run again if their process stops, so they fail
+    instead
+    """
+    label = ImportJob.Kind(job.kind).label
+    finish_job(job, messages.ERROR, [f"{label} import failed"])
+
+
+def get_partition_progress(job: ImportJob) -> dict[str, int]:
+    """
+    The progress of each locale of a job that has been split by locale, by language
+    code
+    """
+    progress = {}
+    for partition in job.partitions.select_related("locale").order_by("pk"):
+        if partition.status == ImportJob.Status.FINISHED:
+            progress[partition.locale.language_code] = 100
+        else:
+            progress[partition.locale.language_code] = get_progress(partition.pk) or 0
+    return progress
+
+
+def split_job(job: ImportJob) -> bool:
+    """
+    With IMPORT_PARTITION_BY_LOCALE, splits a content import for every locale into a
+    job for each locale in the file, and returns whether it was split. The
+    tags, quick replies and triggers are created before the locale jobs are queued.
+
+    Each locale's pages are added under that locale's home page, so the locale jobs
+    never add children to the same page, which is what treebeard needs to allocate
+    paths safely. Each locale job is imported in its own transaction, so if one
+    fails, the others are still imported.
+
+    Imports that purge existing content aren't split, so that the content is only
+    purged in the same transaction that imports its replacement.
+    """
+    if not (
+        settings.IMPORT_PARTITION_BY_LOCALE
+        and job.kind == ImportJob.Kind.CONTENT
+        and job.locale is None
+        and job.partition_of is None
+        and not job.purge
+    ):
+        return False
+    with job.file.open("rb") as file:
+        importer = ContentImporter(
+            spool_file(file), job.file_type, JobProgress(job.pk), purge=False
+        )
+    with transaction.atomic():
+        locales = importer.prepare_locale_partitions()
+        if len(locales) < 2:
+            return False
+        job.status = ImportJob.Status.SPLIT
+        job.save(update_fields=["status"])
+        for locale in locales:
+            # The locale jobs read the file from this job
+            create_job(
+                job.kind, None, job.file_type, False, locale=locale, partition_of=job
+            )
+    return True
+
+
+def run_job(job: ImportJob) -> None:
+    """
+    Imports the job's file, and saves the result
+    """
+    with JobLease(job):
+        _run_job(job)
+
+
+def _run_job(job: ImportJob) -> None:
+    label = ImportJob.Kind(job.kind).label
+    try:
+        if split_job(job):
+            return
+        summary, warnings = _import(job)
+    except ImportAssessmentException as e:
+        result = [f"{label} import failed on row {e.row_num}: {e.message}"]
+        finish_job(job, messages.ERROR, result)
+    except ImportException as e:
+        result = [
+            f"{label} import failed on row {e.row_num}: {msg}" for msg in e.message
+        ]
+        finish_job(job, messages.ERROR, result)
+    except Exception:
+        logger.exception(f"{label} import failed")
+        finish_job(job, messages.ERROR, [f"{label} import failed"])
+    else:
+        result = [f"{label} import successful", *summary]
+        if warnings:
+            result += [
+                f"row {warning.row_num}: {warning.message}" for warning in warnings
+            ]
+            finish_job(job, messages.WARNING, result)
+        else:
+            finish_job(job, messages.SUCCESS, result)
+
+
+def _import(job: ImportJob) -> tuple[list[str], list[ImportWarning]]:
+    """
+    Imports the job's file, and returns a summary of what was imported, and any
+    warnings
+    """
+    with (job.partition_of or job).file.open("rb") as file:
+        return _import_file(job, file)
+
+
+def _import_file(job: ImportJob, file: File) -> tuple[list[str], list[ImportWarning]]:
+    progress_queue = JobProgress(job.pk)
+    if job.kind == ImportJob.Kind.CONTENT:
+        importer = import_content(
+            file, job.file_type, progress_queue, job.purge, job.locale
+        )
+        return [importer.summary()], importer.import_warnings
+    if job.kind == ImportJob.Kind.ASSESSMENT:
+        import_assessment(file, job.file_type, progress_queue, job.purge, job.locale)
+    elif job.kind == ImportJob.Kind.WHATSAPP_TEMPLATE:
+        import_whatsapptemplate(
+            file, job.file_type, progress_queue, job.purge, job.locale
+        )
+    elif job.kind == ImportJob.Kind.ORDERED_CONTENT_SET:
+        if job.purge:
+            OrderedContentSet.objects.all().delete()
+        import_ordered_sets(file, job.file_type, progress_queue)
+    return [], []
+
+
+def finish_job(job: ImportJob, level: int, result: list[str]) -> None:
+    job.status = ImportJob.Status.FINISHED
+    job.finished_at = timezone.now()
+    job.result_level = level
+    job.result_messages = result
+    job.locked_until = None
+    job.file.delete(save=False)
+    job.save()
+    cache.delete(get_progress_key(job.pk))
+    if job.partition_of_id is not None:
+        finish_split_job(job.partition_of_id)
+
+
+def finish_split_job(job_id: int) -> None:
+    """
+    Once every locale of a job that was split by locale has been imported, finishes
+    the job with the results of each locale
+    """
+    with transaction.atomic():
+        job = ImportJob.objects.select_for_update().get(pk=job_id)
+        if job.status != ImportJob.Status.SPLIT:
+            return
+        partitions = list(job.partitions.select_related("locale").order_by("pk"))
+        if any(p.status != ImportJob.Status.FINISHED for p in partitions):
+            return
+        result = [
+            f"{p.locale.language_code}: {text}"
+            for p in partitions
+            for text in p.result_messages
+        ]
+        finish_job(job, max(p.result_level for p in partitions), result)
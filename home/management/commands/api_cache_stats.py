@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from home import api_cache
+
+
+class Command(BaseCommand):
+    help = "Show the hit and miss counts for the API page response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counts after showing them",
+        )
+
+    def handle(self, *args, **options):
+        stats = api_cache.get_stats()
+        total = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / total if total else 0
+        self.stdout.write(
+            f"Hits: {stats['hits']}, misses: {stats['misses']}, "
+            f"hit rate: {hit_rate:.1%}"
+        )
+        if options["reset"]:
+            api_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Reset API cache counts"))
@@ -0,0 +1,66 @@
+from pathlib import Path
+from queue import Queue
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.content_import_export import import_content
+from home.import_helpers import ImportException
+
+
+class Command(BaseCommand):
+    help = (
+        "Import content pages from a CSV or XLSX file. Pages that haven't changed "
+        "since they were last imported are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Delete the existing content before importing",
+        )
+        parser.add_argument(
+            "--locale",
+            help="Only import the pages for this language code",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Check the file and show what would change, without saving it",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        file_type = path.suffix.lstrip(".").upper()
+        if file_type not in ["CSV", "XLSX"]:
+            raise CommandError(f"Unsupported file type: {path.suffix}")
+
+        try:
+            with path.open("rb") as file:
+                importer = import_content(
+                    file,
+                    file_type,
+                    Queue(),
+                    options["purge"],
+                    options["locale"],
+                    options["dry_run"],
+                )
+        except ImportException as e:
+            messages = "; ".join(e.message)
+            raise CommandError(f"Import failed on row {e.row_num}: {messages}")
+
+        for label, pages in [
+            ("Created", importer.created_pages),
+            ("Updated", importer.updated_pages),
+        ]:
+            for slug, locale in pages:
+                self.stdout.write(f"{label} {slug} ({locale.language_code})")
+        for warning in importer.import_warnings:
+            self.stdout.write(
+                self.style.WARNING(f"row {warning.row_num}: {warning.message}")
+            )
+        summary = importer.summary()
+        if options["dry_run"]:
+            summary = f"Dry run, nothing was saved: {summary}"
+        self.stdout.write(self.style.SUCCESS(summary))
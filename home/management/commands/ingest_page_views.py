@@ -0,0 +1,55 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from home.page_view_ingestion import flush_page_views, get_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Save buffered page views to the database. Runs until stopped, saving "
+        "everything left in the buffer before exiting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Save everything currently in the buffer, then exit",
+        )
+        parser.add_argument(
+            "--backlog",
+            action="store_true",
+            help="Show how many page views are waiting to be saved, then exit",
+        )
+
+    def handle(self, *args, **options):
+        buffer = get_buffer()
+        if buffer is None:
+            raise CommandError(
+                "Page views aren't buffered, set PAGE_VIEW_INGESTION to 'redis' to "
+                "use this command"
+            )
+
+        if options["backlog"]:
+            self.stdout.write(f"Backlog: {buffer.depth()}")
+            return
+
+        stopping = threading.Event()
+        if not options["once"]:
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                signal.signal(signum, lambda *_: stopping.set())
+
+        while True:
+            saved = flush_page_views(buffer, settings.PAGE_VIEW_BATCH_SIZE)
+            if saved:
+                self.stdout.write(
+                    f"Saved {saved} page views, backlog: {buffer.depth()}"
+                )
+            if options["once"] or stopping.is_set():
+                break
+            stopping.wait(settings.PAGE_VIEW_FLUSH_INTERVAL)
+
+        self.stdout.write(self.style.SUCCESS("Stopped saving page views"))
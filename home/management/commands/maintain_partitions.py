@@ -0,0 +1,54 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from home.partitions import (
+    PARTITIONED_TABLES,
+    archive_partitions,
+    create_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the page view and rating partitions for the coming months, and "
+        "archive the partitions older than the retention period. This should be run "
+        "regularly, e.g. daily. Postgres only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=settings.PARTITION_MONTHS_AHEAD,
+            help="How many months after this one to create partitions for",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.PARTITION_RETENTION_MONTHS,
+            help="Archive partitions from before this many months ago",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            type=Path,
+            default=settings.PARTITION_ARCHIVE_DIR,
+            help="The directory to save archived partitions to",
+        )
+
+    def handle(self, *args, **options):
+        if not all(is_partitioned(table) for table in PARTITIONED_TABLES):
+            raise CommandError("Partitioning is only supported on Postgres")
+
+        today = timezone.now().date()
+        for name in create_partitions(options["months_ahead"], today):
+            self.stdout.write(f"Created {name}")
+        if options["retention_months"] is not None:
+            for path in archive_partitions(
+                options["retention_months"], options["archive_dir"], today
+            ):
+                self.stdout.write(f"Archived {path}")
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from home.models import ContentPage, ContentPageDraft
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the saved drafts of content pages whose latest revision was saved "
+        "without updating them, e.g. before drafts were saved. The v3 pages API uses "
+        "these drafts to filter and look up pages with return_drafts=true."
+    )
+
+    def handle(self, *args, **options):
+        updated = ContentPageDraft.refresh_stale(ContentPage.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} page drafts"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from home import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index of the live content pages, e.g. after "
+        "changing SEARCH_LANGUAGE_CONFIGS. Postgres only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="How many pages to index in each transaction",
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            raise CommandError("Full-text search is only supported on Postgres")
+
+        indexed = 0
+        for indexed in search.reindex(options["batch_size"]):
+            self.stdout.write(f"Indexed {indexed} pages")
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {indexed} pages"))
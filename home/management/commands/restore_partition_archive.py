@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.partitions import PARTITIONED_TABLES, is_partitioned, restore_archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an archived page view or rating partition into a new table, for "
+        "historical analysis. The restored rows aren't visible to the API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path, help="The archive file to restore")
+
+    def handle(self, *args, **options):
+        if not all(is_partitioned(table) for table in PARTITIONED_TABLES):
+            raise CommandError("Partitioning is only supported on Postgres")
+
+        try:
+            table = restore_archive(options["path"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Restored {options['path']} to {table}"))
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from home.page_view_rollups import refresh_page_view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the daily page view counts used by the page view and content page "
+        "reports. This should be run regularly, e.g. every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Recount page views from this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recount all page views, e.g. to backfill the counts",
+        )
+
+    def handle(self, *args, **options):
+        saved = refresh_page_view_counts(options["since"], recount_all=options["all"])
+        self.stdout.write(self.style.SUCCESS(f"Saved {saved} page view counts"))
@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.import_jobs import claim_next_job, run_job
+from home.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Run uploaded imports, one at a time. Runs until stopped, finishing the "
+        "current import before exiting. Run more than one worker to import "
+        "locales at the same time, see IMPORT_PARTITION_BY_LOCALE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every import that's waiting, then exit",
+        )
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        if not options["once"]:
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                signal.signal(signum, lambda *_: stopping.set())
+
+        while not stopping.is_set():
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    break
+                stopping.wait(settings.IMPORT_JOB_POLL_INTERVAL)
+                continue
+            self.stdout.write(f"Running {job.get_kind_display()} import {job.pk}")
+            run_job(job)
+            if job.status == ImportJob.Status.SPLIT:
+                locales = job.partitions.count()
+                self.stdout.write(f"Split import {job.pk} into {locales} locales")
+                continue
+            self.stdout.write(f"Finished import {job.pk}: {job.result_messages[0]}")
+
+        self.stdout.write(self.style.SUCCESS("Stopped running imports"))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0106_pageview_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageViewCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('platform', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField()),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_counts', to='home.contentpage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pageviewcount',
+            constraint=models.UniqueConstraint(fields=('date', 'page', 'platform'), name='unique_date_page_platform'),
+        ),
+    ]
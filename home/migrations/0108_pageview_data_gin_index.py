@@ -0,0 +1,41 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+# The page view table is large, so we create the index concurrently. GIN indexes
+# are Postgres only, so we skip them on other databases.
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS pageview_data_gin "
+            "ON home_pageview USING gin (data jsonb_path_ops)"
+        )
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS pageview_data_gin")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+    dependencies = [
+        ("home", "0107_pageviewcount"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="pageview",
+                    index=GinIndex(
+                        fields=["data"],
+                        name="pageview_data_gin",
+                        opclasses=["jsonb_path_ops"],
+                    ),
+                ),
+            ],
+            database_operations=[migrations.RunPython(forwards, backwards)],
+        ),
+    ]
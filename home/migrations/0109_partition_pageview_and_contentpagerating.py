@@ -0,0 +1,133 @@
+from datetime import date
+
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+from django.utils import timezone
+
+# See home/partitions.py. The existing table becomes the first partition, holding
+# everything from before this month, so we don't have to copy any rows. Postgres
+# only, other databases keep the normal tables.
+#
+# The helpers from home/partitions.py are copied here, as they were when this
+# migration was written, so that later changes to them don't change this migration.
+
+FOREIGN_KEYS = {
+    "page_id": "home_contentpage (page_ptr_id)",
+    "revision_id": "wagtailcore_revision (id)",
+}
+INDEXES = {
+    "home_pageview": {
+        "pageview_data_gin": "USING gin (data jsonb_path_ops)",
+    },
+    "home_contentpagerating": {},
+}
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(cursor, months_ahead: int, month: date) -> None:
+    for table in INDEXES:
+        for months in range(months_ahead + 1):
+            start = add_months(month, months)
+            end = add_months(start, 1)
+            name = f"{table}_p{start:%Y_%m}"
+            cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{start.isoformat()} 00:00+00') "
+                f"TO ('{end.isoformat()} 00:00+00')"
+            )
+
+
+def partition_table(cursor, table: str, month: date) -> None:
+    legacy = f"{table}_before_{month:%Y_%m}"
+    start = f"{month.isoformat()} 00:00+00"
+
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    [next_id] = cursor.fetchone()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    [sequence] = cursor.fetchone()
+
+    # The new table gets its own id sequence, which carries on from the old one
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT")
+    if sequence is not None:
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {sequence}")
+    for name in INDEXES[table]:
+        cursor.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {legacy}_{name}")
+    # A partition can only have the parent's primary key, which has to include the
+    # partition key, and the old primary key's name is needed for the new table's
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass "
+        "AND contype = 'p'",
+        [legacy],
+    )
+    for (constraint,) in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {constraint}")
+    cursor.execute(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, timestamp)"
+    )
+
+    cursor.execute(
+        f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (timestamp)"
+    )
+    cursor.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    cursor.execute("SELECT setval(%s, %s, false)", [f"{table}_id_seq", next_id])
+    cursor.execute(
+        f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')"
+    )
+    # Unique constraints on partitioned tables must include the partition key
+    cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)")
+    for column, target in FOREIGN_KEYS.items():
+        cursor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fk "
+            f"FOREIGN KEY ({column}) REFERENCES {target} DEFERRABLE INITIALLY DEFERRED"
+        )
+    for column in ["timestamp", *FOREIGN_KEYS]:
+        cursor.execute(f"CREATE INDEX {table}_{column}_idx ON {table} ({column})")
+    for name, definition in INDEXES[table].items():
+        cursor.execute(f"CREATE INDEX {name} ON {table} {definition}")
+
+    # With a matching check constraint, attaching doesn't have to scan the old table
+    # while holding the lock on the new one
+    cursor.execute(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_range "
+        f"CHECK (timestamp IS NOT NULL AND timestamp < '{start}')"
+    )
+    cursor.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {legacy} "
+        f"FOR VALUES FROM (MINVALUE) TO ('{start}')"
+    )
+    cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_range")
+    cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    month = timezone.now().date().replace(day=1)
+    with schema_editor.connection.cursor() as cursor:
+        for table in INDEXES:
+            partition_table(cursor, table, month)
+        create_partitions(cursor, months_ahead=3, month=month)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        raise IrreversibleError(
+            "Partitioned page view and rating tables can't be unpartitioned"
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("home", "0108_pageview_data_gin_index"),
+    ]
+
+    operations = [migrations.RunPython(forwards, backwards)]
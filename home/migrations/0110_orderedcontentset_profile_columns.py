@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:54
+
+from typing import Any
+
+from django.db import migrations, models
+
+PROFILE_FIELD_COLUMNS = {
+    "gender": "profile_gender",
+    "age": "profile_age",
+    "relationship": "profile_relationship",
+}
+
+
+def set_profile_field_values(apps: Any, schema_editor: Any) -> None:
+    OrderedContentSet = apps.get_model("home", "OrderedContentSet")
+    for ordered_set in OrderedContentSet.objects.all().iterator():
+        values = {}
+        for block in ordered_set.profile_fields.raw_data:
+            values.setdefault(block["type"], block["value"] or "")
+        OrderedContentSet.objects.filter(id=ordered_set.id).update(
+            **{
+                column: values.get(field_name, "")
+                for field_name, column in PROFILE_FIELD_COLUMNS.items()
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0109_partition_pageview_and_contentpagerating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderedcontentset',
+            name='profile_age',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderedcontentset',
+            name='profile_gender',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='orderedcontentset',
+            name='profile_relationship',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(
+            code=set_profile_field_values, reverse_code=migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0089_log_entry_data_json_null_to_object'),
+        ('home', '0110_orderedcontentset_profile_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPageDraft',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='draft', serialize=False, to='home.contentpage')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=255)),
+                ('title', models.CharField(max_length=255)),
+                ('revision', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wagtailcore.revision')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContentPageDraftTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tag', 'tag'), ('trigger', 'trigger')], max_length=10)),
+                ('name', models.CharField(max_length=100)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='home.contentpagedraft')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'name'], name='contentpagedrafttag_name')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0089_log_entry_data_json_null_to_object'),
+        ('home', '0111_contentpagedraft'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('content', 'Content'), ('assessment', 'CMS Forms'), ('whatsapptemplate', 'WhatsAppTemplate'), ('orderedcontentset', 'Ordered content set')], max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('finished', 'Finished')], default='queued', max_length=10)),
+                ('file', models.BinaryField()),
+                ('file_type', models.CharField(max_length=4)),
+                ('purge', models.BooleanField(default=False)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+                ('result_level', models.PositiveSmallIntegerField(null=True)),
+                ('result_messages', models.JSONField(default=list)),
+                ('result_shown', models.BooleanField(default=False)),
+                ('locale', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='wagtailcore.locale')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='home_import_status_b535cd_idx')],
+            },
+        ),
+    ]
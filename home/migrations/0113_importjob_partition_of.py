@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0112_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='partition_of',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='partitions', to='home.importjob'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('split', 'Split by locale'), ('finished', 'Finished')], default='queued', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0089_log_entry_data_json_null_to_object'),
+        ('home', '0113_importjob_partition_of'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPageImportHash',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='import_hash', serialize=False, to='home.contentpage')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('revision', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.revision')),
+            ],
+        ),
+    ]
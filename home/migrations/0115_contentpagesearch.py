@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+# GIN indexes are Postgres only, so we skip them on other databases.
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS contentpagesearch_vector_gin "
+            "ON home_contentpagesearch USING gin (vector)"
+        )
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS contentpagesearch_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0114_contentpageimporthash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentPageSearch',
+            fields=[
+                ('page', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='home.contentpage')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='contentpagesearch',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='contentpagesearch_vector_gin'),
+                ),
+            ],
+            database_operations=[migrations.RunPython(forwards, backwards)],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0115_contentpagesearch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('contentpage', 'Content page'), ('contentpageindex', 'Content page index'), ('whatsapptemplate', 'WhatsApp template'), ('assessment', 'CMS Form'), ('orderedcontentset', 'Ordered content set')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('publish', 'Published'), ('unpublish', 'Unpublished'), ('move', 'Moved'), ('delete', 'Deleted')], max_length=10)),
+                ('slug', models.CharField(blank=True, max_length=255)),
+                ('language_code', models.CharField(blank=True, max_length=100)),
+                ('revision_id', models.PositiveIntegerField(null=True)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
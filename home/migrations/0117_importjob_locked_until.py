@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0116_contentchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='locked_until',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+# Uploaded files move from the database to the default storage. The files of jobs
+# that haven't finished yet are copied, so that they can still be run.
+
+
+def forwards(apps, schema_editor):
+    ImportJob = apps.get_model("home", "ImportJob")
+    jobs = ImportJob.objects.exclude(status="finished").filter(partition_of=None)
+    for job in jobs.iterator():
+        data = bytes(job.file)
+        if data:
+            job.upload.save(f"job-{job.pk}", ContentFile(data), save=False)
+            job.save(update_fields=["upload"])
+
+
+def backwards(apps, schema_editor):
+    ImportJob = apps.get_model("home", "ImportJob")
+    jobs = ImportJob.objects.exclude(status="finished").exclude(upload="")
+    for job in jobs.iterator():
+        with job.upload.open("rb") as f:
+            job.file = f.read()
+        job.upload.delete(save=False)
+        job.save(update_fields=["file", "upload"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("home", "0117_importjob_locked_until"),
+    ]
+
+    operations = [
+        # So that the field can be added back when this is reversed
+        migrations.AlterField(
+            model_name="importjob",
+            name="file",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="upload",
+            field=models.FileField(blank=True, upload_to="import_jobs/"),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name="importjob",
+            name="file",
+        ),
+        migrations.RenameField(
+            model_name="importjob",
+            old_name="upload",
+            new_name="file",
+        ),
+    ]
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import migrations
+
+# Indexes the pages that were published before the search index was added, the same
+# way home/search.py does, so that search works as soon as this is deployed. Postgres
+# only, other databases don't keep the index.
+
+# home.search.LANGUAGE_CONFIGS, as it was when this migration was written
+LANGUAGE_CONFIGS = {
+    "ar": "arabic",
+    "da": "danish",
+    "de": "german",
+    "en": "english",
+    "es": "spanish",
+    "fi": "finnish",
+    "fr": "french",
+    "hu": "hungarian",
+    "id": "indonesian",
+    "it": "italian",
+    "ne": "nepali",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pt": "portuguese",
+    "ro": "romanian",
+    "ru": "russian",
+    "sv": "swedish",
+    "ta": "tamil",
+    "tr": "turkish",
+}
+
+CHANNELS = ["whatsapp", "sms", "ussd", "messenger", "viber"]
+
+
+def messages(column: str) -> str:
+    return (
+        "(SELECT string_agg(message #>> '{}', ' ') FROM jsonb_path_query("
+        f"cp.{column}, '$[*].value.message ? (@.type() == \"string\")') message)"
+    )
+
+
+TITLES = ", ".join(["p.title", *(f"cp.{channel}_title" for channel in CHANNELS)])
+MESSAGES = ", ".join(["cp.subtitle", *(messages(f"{c}_body") for c in CHANNELS)])
+WEB_BODY = (
+    "(SELECT string_agg(regexp_replace(paragraph #>> '{}', '<[^>]*>', '', 'g'), ' ') "
+    "FROM jsonb_path_query(cp.body, '$[*] ? (@.type == \"paragraph\").value') "
+    "paragraph)"
+)
+
+BACKFILL = f"""
+    INSERT INTO home_contentpagesearch (page_id, vector)
+    SELECT
+        p.id,
+        setweight(to_tsvector(%(config)s::regconfig, concat_ws(' ', {TITLES})), 'A')
+        || setweight(
+            to_tsvector(%(config)s::regconfig, concat_ws(' ', {MESSAGES})), 'B'
+        )
+        || setweight(
+            to_tsvector(%(config)s::regconfig, coalesce({WEB_BODY}, '')), 'C'
+        )
+    FROM home_contentpage cp
+    JOIN wagtailcore_page p ON p.id = cp.page_ptr_id
+    WHERE p.live AND p.locale_id = %(locale)s
+    ON CONFLICT (page_id) DO NOTHING
+"""
+
+
+def search_config(language_code: str) -> str:
+    configs = {**LANGUAGE_CONFIGS, **getattr(settings, "SEARCH_LANGUAGE_CONFIGS", {})}
+    code = language_code.casefold()
+    return configs.get(code) or configs.get(code.split("-")[0], "simple")
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Locale = apps.get_model("wagtailcore", "Locale")
+    with schema_editor.connection.cursor() as cursor:
+        for locale in Locale.objects.all():
+            cursor.execute(
+                BACKFILL,
+                {"config": search_config(locale.language_code), "locale": locale.pk},
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("home", "0118_importjob_file_storage"),
+        ("wagtailcore", "0089_log_entry_data_json_null_to_object"),
+    ]
+
+    operations = [migrations.RunPython(forwards, migrations.RunPython.noop)]
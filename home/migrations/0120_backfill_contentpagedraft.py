@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    # Drafts are built from each page's latest revision, which needs the real page
+    # models rather than the historical ones, so this uses the same code as the
+    # `refresh_page_drafts` command
+    from home.models import ContentPage, ContentPageDraft
+
+    ContentPageDraft.refresh_stale(ContentPage.objects.all())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("home", "0119_backfill_contentpagesearch"),
+    ]
+
+    operations = [migrations.RunPython(forwards, migrations.RunPython.noop)]
@@ -1,9 +1,10 @@
 from datetime import datetime
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 from .assessment_import_export import export_csv_assessment, export_xlsx_assessment
 from .content_import_export import export_csv_content, export_xlsx_content
+from .export_helpers import XLSX_CONTENT_TYPE
 from .ordered_content_import_export import (
     export_csv_ordered_content,
     export_xlsx_ordered_content,
@@ -26,18 +27,19 @@ class SpreadsheetExportMixin:
         return f'exported_pages_{datetime.now().strftime("%Y%m%d")}'
 
     def write_xlsx_response(self, queryset):
-        ctype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        response = HttpResponse(content_type=ctype)
+        response = StreamingHttpResponse(
+            export_xlsx_content(queryset), content_type=XLSX_CONTENT_TYPE
+        )
         filename = f"{self.get_filename()}.xlsx"
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        export_xlsx_content(queryset, response)
         return response
 
     def write_csv_response(self, queryset):
-        response = HttpResponse(content_type="application/CSV")
+        response = StreamingHttpResponse(
+            export_csv_content(queryset), content_type="application/CSV"
+        )
         filename = f"{self.get_filename()}.csv"
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
-        export_csv_content(queryset, response)
         return response
 
     def as_spreadsheet(self, queryset, spreadsheet_format):
@@ -73,22 +75,21 @@ class SpreadsheetExportMixinAssessment:
         return f'exported_assessments_{datetime.now().strftime("%Y%m%d")}'
 
     def write_xlsx_response(self, queryset):
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        response = StreamingHttpResponse(
+            export_xlsx_assessment(queryset), content_type=XLSX_CONTENT_TYPE
         )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.xlsx"'
         )
-        export_xlsx_assessment(queryset, response)
         return response
 
     def write_csv_response(self, queryset):
-        response = HttpResponse(content_type="application/CSV")
+        response = StreamingHttpResponse(
+            export_csv_assessment(queryset), content_type="application/CSV"
+        )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.csv"'
         )
-        export_csv_assessment(queryset, response)
-
         return response
 
     def as_spreadsheet(self, queryset, spreadsheet_format):
@@ -124,22 +125,21 @@ class SpreadsheetExportMixinWhatsAppTemplate:
         return f'exported_templates_{datetime.now().strftime("%Y%m%d")}'
 
     def write_xlsx_response(self, queryset):
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        response = StreamingHttpResponse(
+            export_xlsx_whatsapp_template(queryset), content_type=XLSX_CONTENT_TYPE
         )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.xlsx"'
         )
-        export_xlsx_whatsapp_template(queryset, response)
         return response
 
     def write_csv_response(self, queryset):
-        response = HttpResponse(content_type="application/CSV")
+        response = StreamingHttpResponse(
+            export_csv_whatsapp_template(queryset), content_type="application/CSV"
+        )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.csv"'
         )
-        export_csv_whatsapp_template(queryset, response)
-
         return response
 
     def as_spreadsheet(self, queryset, spreadsheet_format):
@@ -175,22 +175,21 @@ class SpreadsheetExportMixinOrdered:
         return f'exported_ordered_content_sets_{datetime.now().strftime("%Y%m%d")}'
 
     def write_xlsx_response(self, queryset):
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        response = StreamingHttpResponse(
+            export_xlsx_ordered_content(queryset), content_type=XLSX_CONTENT_TYPE
         )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.xlsx"'
         )
-        export_xlsx_ordered_content(queryset, response)
         return response
 
     def write_csv_response(self, queryset):
-        response = HttpResponse(content_type="application/CSV")
+        response = StreamingHttpResponse(
+            export_csv_ordered_content(queryset), content_type="application/CSV"
+        )
         response["Content-Disposition"] = (
             f'attachment; filename="{self.get_filename()}.csv"'
         )
-        export_csv_ordered_content(queryset, response)
-
         return response
 
     def as_spreadsheet(self, queryset, spreadsheet_format):
@@ -4,12 +4,15 @@ from collections.abc import Callable
 from typing import Any, Optional, TypeVar
 
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxLengthValidator
 from django.db import models
 from django.forms import CheckboxSelectMultiple
 from django.template.defaultfilters import truncatechars
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
@@ -48,6 +51,7 @@ from wagtail.snippets.blocks import SnippetChooserBlock
 from wagtail_content_import.models import ContentImportMixin
 from wagtailmedia.blocks import AbstractMediaChooserBlock
 
+from .page_view_ingestion import record_page_view
 from .panels import PageRatingPanel
 from .whatsapp import (
     TemplateVariableError,
@@ -754,6 +758,11 @@ class ContentPage(UniqueSlugMixin, Page, ContentImportMixin):
     def get_live_revision_or_latest(self) -> Revision | None:
         return self.live_revision or self.get_latest_revision()
 
+    def save_revision(self, *args: Any, **kwargs: Any) -> Revision:
+        revision = super().save_revision(*args, **kwargs)
+        ContentPageDraft.update_for_page(self)
+        return revision
+
     @property
     def has_whatsapp_template(self) -> bool:
         """
@@ -793,6 +802,14 @@ class ContentPage(UniqueSlugMixin, Page, ContentImportMixin):
     def save_page_view(
         self, query_params: dict[str, Any], platform: str | None = None
     ) -> None:
+        record_page_view(self.page_view_data(query_params, platform))
+
+    def page_view_data(
+        self, query_params: dict[str, Any], platform: str | None = None
+    ) -> dict[str, Any]:
+        """
+        The PageView field values for viewing this page, see `record_page_view`
+        """
         if not platform and query_params:
             if "whatsapp" in query_params:
                 platform = "whatsapp"
@@ -814,15 +831,18 @@ class ContentPage(UniqueSlugMixin, Page, ContentImportMixin):
                 data[key] = value
 
         page_view = {
-            "revision": self.get_live_revision_or_latest(),
+            "page_id": self.id,
+            # The same as get_live_revision_or_latest, without fetching the revision
+            "revision_id": self.live_revision_id or self.latest_revision_id,
             "data": data,
             "platform": f"{platform}",
+            "timestamp": timezone.now(),
         }
 
         if "message" in query_params and query_params["message"].isdigit():
-            page_view["message"] = query_params["message"]
+            page_view["message"] = int(query_params["message"])
 
-        self.views.create(**page_view)
+        return page_view
 
     @property
     def quick_reply_buttons(self) -> list[str]:
@@ -974,6 +994,14 @@ def _get_default_locale() -> int:
     return site.root_page.locale.id
 
 
+# The OrderedContentSet columns that hold the value of each profile field
+PROFILE_FIELD_COLUMNS = {
+    "gender": "profile_gender",
+    "age": "profile_age",
+    "relationship": "profile_relationship",
+}
+
+
 class OrderedContentSet(
     UniqueSlugMixin,
     WorkflowMixin,
@@ -1101,6 +1129,17 @@ class OrderedContentSet(
         default=[],
         blank=True,
     )
+    # The value of each profile field, copied from profile_fields when the set is
+    # saved, so that the API can filter on them in the database
+    profile_gender = models.CharField(
+        max_length=255, blank=True, default="", editable=False, db_index=True
+    )
+    profile_age = models.CharField(
+        max_length=255, blank=True, default="", editable=False, db_index=True
+    )
+    profile_relationship = models.CharField(
+        max_length=255, blank=True, default="", editable=False, db_index=True
+    )
     search_fields = [
         index.SearchField("name"),
         index.AutocompleteField("name"),
@@ -1213,6 +1252,28 @@ class OrderedContentSet(
     def clean(self):
         return super().clean(OrderedContentSet)
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "profile_fields" in update_fields:
+            self.set_profile_field_values()
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    *PROFILE_FIELD_COLUMNS.values(),
+                }
+        super().save(*args, **kwargs)
+
+    def set_profile_field_values(self):
+        """
+        Copies the profile field values into their columns. There's at most one of
+        each profile field, but if there are more, the first is used.
+        """
+        values = {}
+        for block in self.profile_fields:
+            values.setdefault(block.block_type, block.value or "")
+        for field_name, column in PROFILE_FIELD_COLUMNS.items():
+            setattr(self, column, values.get(field_name, ""))
+
     def language_code(self):
         return self.locale.language_code
 
@@ -1231,6 +1292,15 @@ class ContentPageRating(models.Model):
 
 
 class PageView(models.Model):
+    class Meta:
+        indexes = [
+            # For filtering on data keys, see PageViewFilter. Postgres only, so this
+            # is only created on Postgres by the migration
+            GinIndex(
+                fields=["data"], name="pageview_data_gin", opclasses=["jsonb_path_ops"]
+            )
+        ]
+
     platform = models.CharField(
         choices=[
             ("WHATSAPP", "whatsapp"),
@@ -1244,7 +1314,11 @@ class PageView(models.Model):
         default="web",
         max_length=20,
     )
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Buffered page views are saved some time after they happen, so this can't be
+    # auto_now_add
+    timestamp = models.DateTimeField(
+        default=timezone.now, editable=False, db_index=True
+    )
     page = models.ForeignKey(
         ContentPage, related_name="views", null=False, on_delete=models.CASCADE
     )
@@ -1255,6 +1329,234 @@ class PageView(models.Model):
     data = models.JSONField(default=dict, blank=True, null=True)
 
 
+class PageViewCount(models.Model):
+    """
+    The number of page views per page, platform and day, so that reports don't need
+    to count the whole PageView table. Kept up to date by the `rollup_page_views`
+    management command.
+    """
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "page", "platform"], name="unique_date_page_platform"
+            )
+        ]
+
+    date = models.DateField()
+    page = models.ForeignKey(
+        ContentPage, related_name="view_counts", on_delete=models.CASCADE
+    )
+    platform = models.CharField(max_length=20)
+    count = models.PositiveIntegerField()
+
+
+class ContentPageDraft(models.Model):
+    """
+    The searchable fields of the latest revision of each page, so that the API can
+    filter and look up drafts without building each page from its latest revision.
+    Updated whenever a revision is saved, see `ContentPage.save_revision`.
+
+    The locale and parent of a draft are always the same as the page's, so they're
+    filtered on the page instead.
+    """
+
+    page = models.OneToOneField(
+        ContentPage, primary_key=True, related_name="draft", on_delete=models.CASCADE
+    )
+    revision = models.ForeignKey(
+        Revision, related_name="+", null=True, on_delete=models.SET_NULL
+    )
+    slug = models.SlugField(max_length=255, allow_unicode=True)
+    title = models.CharField(max_length=255)
+
+    @classmethod
+    def update_for_page(cls, page: ContentPage) -> "ContentPageDraft":
+        """
+        Saves the fields of `page`, which should be the page as of its latest
+        revision
+        """
+        draft, _ = cls.objects.update_or_create(
+            page_id=page.pk,
+            defaults={
+                "revision_id": page.latest_revision_id,
+                "slug": page.slug,
+                "title": page.title,
+            },
+        )
+        draft.tags.all().delete()
+        ContentPageDraftTag.objects.bulk_create(
+            [
+                ContentPageDraftTag(draft=draft, kind=kind, name=tag.name.casefold())
+                for kind, tags in [
+                    (ContentPageDraftTag.TAG, page.tags.all()),
+                    (ContentPageDraftTag.TRIGGER, page.triggers.all()),
+                ]
+                for tag in tags
+                if tag
+            ]
+        )
+        return draft
+
+    @classmethod
+    def refresh_stale(cls, pages: models.QuerySet) -> int:
+        """
+        Updates the drafts of any of the pages with unpublished changes whose latest
+        revision was saved without updating its draft, e.g. before this model
+        existed. Returns the number of drafts updated. This writes to the database,
+        so it's run by a migration, and the `refresh_page_drafts` command, rather than
+        by the API.
+        """
+        stale = pages.filter(has_unpublished_changes=True).exclude(
+            draft__revision_id=models.F("latest_revision_id")
+        )
+        updated = 0
+        for page in stale.select_related("latest_revision"):
+            cls.update_for_page(page.get_latest_revision_as_object())
+            updated += 1
+        return updated
+
+
+class ContentPageDraftTag(models.Model):
+    """
+    A tag or trigger of a page's latest revision, casefolded for matching
+    """
+
+    TAG = "tag"
+    TRIGGER = "trigger"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "name"], name="contentpagedrafttag_name")
+        ]
+
+    draft = models.ForeignKey(
+        ContentPageDraft, related_name="tags", on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=10, choices=[(TAG, "tag"), (TRIGGER, "trigger")])
+    name = models.CharField(max_length=100)
+
+
+class ContentPageImportHash(models.Model):
+    """
+    A hash of the imported content of a page, and the revision that the import
+    published, so that later imports can skip the page if it hasn't changed. The
+    hash is only used while that revision is the live and latest revision, so pages
+    that have been edited since they were imported are always imported again.
+    """
+
+    page = models.OneToOneField(
+        ContentPage,
+        primary_key=True,
+        related_name="import_hash",
+        on_delete=models.CASCADE,
+    )
+    revision = models.ForeignKey(Revision, related_name="+", on_delete=models.CASCADE)
+    content_hash = models.CharField(max_length=64)
+
+
+class ContentPageSearch(models.Model):
+    """
+    The full-text search document of a live content page, in the text search
+    configuration of the page's locale. Only kept up to date on Postgres, see
+    home/search.py
+    """
+
+    page = models.OneToOneField(
+        ContentPage,
+        primary_key=True,
+        related_name="search",
+        on_delete=models.CASCADE,
+    )
+    vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["vector"], name="contentpagesearch_vector_gin")]
+
+
+class ImportJob(models.Model):
+    """
+    An uploaded file to import in the background, and the result of importing it.
+    See home/import_jobs.py
+    """
+
+    class Kind(models.TextChoices):
+        CONTENT = "content", "Content"
+        ASSESSMENT = "assessment", "CMS Forms"
+        WHATSAPP_TEMPLATE = "whatsapptemplate", "WhatsAppTemplate"
+        ORDERED_CONTENT_SET = "orderedcontentset", "Ordered content set"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        # Split into a job for each locale, which haven't all finished yet
+        SPLIT = "split", "Split by locale"
+        FINISHED = "finished", "Finished"
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.QUEUED
+    )
+    # The uploaded file is kept in the default storage so that any process can run
+    # the job. It's deleted once the job is finished. Jobs for one locale of a job
+    # that was split by locale read their file from that job.
+    file = models.FileField(upload_to="import_jobs/", blank=True)
+    file_type = models.CharField(max_length=4)
+    purge = models.BooleanField(default=False)
+    locale = models.ForeignKey(Locale, null=True, on_delete=models.CASCADE)
+    # The uploaded job that this job imports one locale of, see
+    # IMPORT_PARTITION_BY_LOCALE
+    partition_of = models.ForeignKey(
+        "self", null=True, on_delete=models.CASCADE, related_name="partitions"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    # A running job belongs to whatever is running it until this time, which is
+    # pushed back while it's running, see `JobLease`
+    locked_until = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    # A django.contrib.messages level, and the messages to show the user
+    result_level = models.PositiveSmallIntegerField(null=True)
+    result_messages = models.JSONField(default=list)
+    result_shown = models.BooleanField(default=False)
+
+
+class ContentChange(models.Model):
+    """
+    An append-only log of content being published, unpublished, moved or deleted,
+    so that API clients can keep their copies in sync by fetching only what changed.
+    See home/changes.py
+    """
+
+    class Kind(models.TextChoices):
+        CONTENT_PAGE = "contentpage", "Content page"
+        CONTENT_PAGE_INDEX = "contentpageindex", "Content page index"
+        WHATSAPP_TEMPLATE = "whatsapptemplate", "WhatsApp template"
+        ASSESSMENT = "assessment", "CMS Form"
+        ORDERED_CONTENT_SET = "orderedcontentset", "Ordered content set"
+
+    class Action(models.TextChoices):
+        PUBLISH = "publish", "Published"
+        UNPUBLISH = "unpublish", "Unpublished"
+        MOVE = "move", "Moved"
+        DELETE = "delete", "Deleted"
+
+    # The cursor that clients fetch changes after
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=10, choices=Action.choices)
+    # Copied rather than linked, so that they're kept when the object is deleted
+    slug = models.CharField(max_length=255, blank=True)
+    language_code = models.CharField(max_length=100, blank=True)
+    revision_id = models.PositiveIntegerField(null=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+
 class AnswerBlock(blocks.StructBlock):
     answer = blocks.TextBlock(help_text="The choice shown to the user for this option")
     score = blocks.FloatBlock(
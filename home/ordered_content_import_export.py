@@ -1,6 +1,6 @@
+from collections.abc import Iterator
 from logging import getLogger
 
-from django.http import HttpResponse  # type: ignore
 from wagtail.query import PageQuerySet  # type: ignore
 
 from .export_ordered_sets import OrderedSetExporter, OrderedSetsExportWriter
@@ -9,16 +9,16 @@ from .import_ordered_content_sets import OrderedContentSetImporter
 logger = getLogger(__name__)
 
 
-def export_xlsx_ordered_content(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_xlsx_ordered_content(queryset: PageQuerySet) -> Iterator[bytes]:
     exporter = OrderedSetExporter(queryset)
     export_rows = exporter.perform_export()
-    OrderedSetsExportWriter(export_rows).write_xlsx(response)
+    return OrderedSetsExportWriter(export_rows).write_xlsx()
 
 
-def export_csv_ordered_content(queryset: PageQuerySet, response: HttpResponse) -> None:
+def export_csv_ordered_content(queryset: PageQuerySet) -> Iterator[str]:
     exporter = OrderedSetExporter(queryset)
     export_rows = exporter.perform_export()
-    OrderedSetsExportWriter(export_rows).write_csv(response)
+    return OrderedSetsExportWriter(export_rows).write_csv()
 
 
 def import_ordered_sets(file, filetype, progress_queue) -> None:  # type: ignore
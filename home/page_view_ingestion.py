@@ -0,0 +1,238 @@
+"""
+Page views are recorded on every API read, so inserting them one at a time can be
+the biggest write load on the database. Instead of inserting each page view while
+the request waits, they can be buffered and saved in batches.
+
+PAGE_VIEW_INGESTION selects how page views are saved:
+
+sync
+    Each page view is inserted during the request. This is the default.
+memory
+    Page views are buffered in the web process, and saved by a background thread
+    when the buffer reaches PAGE_VIEW_BATCH_SIZE, or every PAGE_VIEW_FLUSH_INTERVAL
+    seconds. Anything left in the buffer is saved when the process exits.
+redis
+    Page views are pushed onto a Redis list in the default cache, and saved by the
+    `ingest_page_views` management command. Nothing is lost if a web process
+    restarts, but the command needs to be run as a separate worker.
+"""
+
+import atexit
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from logging import getLogger
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+logger = getLogger(__name__)
+
+REDIS_KEY = "page-views:backlog"
+
+
+class PageViewBuffer(ABC):
+    """
+    Page views waiting to be saved, oldest first.
+
+    Only one process should save from a buffer at a time. Page views are only removed
+    once they have been saved, so that they aren't lost if saving fails.
+    """
+
+    @abstractmethod
+    def push(self, page_view: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def peek(self, count: int) -> list[dict[str, Any]]: ...
+
+    @abstractmethod
+    def remove(self, count: int) -> None: ...
+
+    @abstractmethod
+    def depth(self) -> int: ...
+
+
+class MemoryBuffer(PageViewBuffer):
+    def __init__(self, batch_size: int, flush_interval: float | None = None) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._page_views: deque[dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def push(self, page_view: dict[str, Any]) -> None:
+        with self._lock:
+            self._page_views.append(page_view)
+            if self.flush_interval is not None and self._flusher is None:
+                self._start_flusher()
+        if len(self._page_views) >= self.batch_size:
+            self._wake.set()
+
+    def peek(self, count: int) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(islice(self._page_views, count))
+
+    def remove(self, count: int) -> None:
+        with self._lock:
+            for _ in range(count):
+                self._page_views.popleft()
+
+    def depth(self) -> int:
+        return len(self._page_views)
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            return flush_page_views(self, self.batch_size)
+
+    def _start_flusher(self) -> None:
+        self._flusher = threading.Thread(
+            target=self._run_flusher, name="page-view-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run_flusher(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error saving page views")
+            finally:
+                # This thread's connection would otherwise stay open forever
+                connection.close()
+
+
+class RedisBuffer(PageViewBuffer):
+    def __init__(self) -> None:
+        from django_redis import get_redis_connection
+
+        self.redis = get_redis_connection("default")
+
+    def push(self, page_view: dict[str, Any]) -> None:
+        self.redis.rpush(REDIS_KEY, json.dumps(page_view))
+
+    def peek(self, count: int) -> list[dict[str, Any]]:
+        return [json.loads(item) for item in self.redis.lrange(REDIS_KEY, 0, count - 1)]
+
+    def remove(self, count: int) -> None:
+        self.redis.ltrim(REDIS_KEY, count, -1)
+
+    def depth(self) -> int:
+        return self.redis.llen(REDIS_KEY)
+
+
+_buffer: PageViewBuffer | None = None
+
+
+def get_buffer() -> PageViewBuffer | None:
+    """
+    Returns the buffer for the configured ingestion mode, or None if page views
+    should be saved immediately.
+    """
+    global _buffer
+    mode = settings.PAGE_VIEW_INGESTION
+    if mode == "sync":
+        return None
+    if _buffer is None:
+        if mode == "memory":
+            _buffer = MemoryBuffer(
+                settings.PAGE_VIEW_BATCH_SIZE, settings.PAGE_VIEW_FLUSH_INTERVAL
+            )
+        elif mode == "redis":
+            _buffer = RedisBuffer()
+        else:
+            raise ImproperlyConfigured(
+                f"Unknown PAGE_VIEW_INGESTION {mode!r}, must be one of "
+                "'sync', 'memory' or 'redis'"
+            )
+    return _buffer
+
+
+def record_page_view(page_view: dict[str, Any]) -> None:
+    """
+    Saves a page view, or adds it to the buffer so that it's saved later.
+
+    `page_view` is a dict of PageView field values, using `page_id` and
+    `revision_id` for the foreign keys.
+    """
+    from .models import PageView
+
+    buffer = get_buffer()
+    if buffer is None:
+        PageView.objects.create(**page_view)
+    else:
+        page_view["timestamp"] = page_view["timestamp"].isoformat()
+        buffer.push(page_view)
+
+
+def record_page_views(page_views: list[dict[str, Any]]) -> None:
+    """
+    Saves several page views with a single insert, or adds them to the buffer
+    """
+    from .models import PageView
+
+    buffer = get_buffer()
+    if buffer is None:
+        PageView.objects.bulk_create([PageView(**pv) for pv in page_views])
+    else:
+        for page_view in page_views:
+            record_page_view(page_view)
+
+
+def save_page_views(page_views: list[dict[str, Any]]) -> int:
+    """
+    Saves a batch of buffered page views with a single insert.
+
+    Page views for pages or revisions that have since been deleted are dropped,
+    rather than failing the whole batch.
+    """
+    from wagtail.models import Revision
+
+    from .models import ContentPage, PageView
+
+    page_ids = ContentPage.objects.filter(
+        id__in={pv["page_id"] for pv in page_views}
+    ).values_list("id", flat=True)
+    revision_ids = Revision.objects.filter(
+        id__in={pv["revision_id"] for pv in page_views}
+    ).values_list("id", flat=True)
+    page_ids, revision_ids = set(page_ids), set(revision_ids)
+
+    views = [
+        PageView(**{**pv, "timestamp": datetime.fromisoformat(pv["timestamp"])})
+        for pv in page_views
+        if pv["page_id"] in page_ids and pv["revision_id"] in revision_ids
+    ]
+    if len(views) < len(page_views):
+        logger.warning(
+            "Dropped %s page views whose page or revision was deleted",
+            len(page_views) - len(views),
+        )
+    PageView.objects.bulk_create(views)
+    return len(views)
+
+
+def flush_page_views(buffer: PageViewBuffer, batch_size: int) -> int:
+    """
+    Saves everything in the buffer, in batches of `batch_size`. Returns the number
+    of page views saved.
+    """
+    saved = 0
+    while True:
+        page_views = buffer.peek(batch_size)
+        if not page_views:
+            break
+        saved += save_page_views(page_views)
+        buffer.remove(len(page_views))
+        if len(page_views) < batch_size:
+            break
+    return saved
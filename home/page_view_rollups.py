@@ -0,0 +1,56 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PageView, PageViewCount
+
+BATCH_SIZE = 5000
+
+
+def refresh_page_view_counts(
+    since: date | None = None, recount_all: bool = False
+) -> int:
+    """
+    Recounts the page views for every day from `since` onwards, replacing any
+    existing counts for those days. Returns the number of counts saved.
+
+    By default, this starts PAGE_VIEW_ROLLUP_LOOKBACK_DAYS before the latest day
+    that's already been counted, so that page views that are saved late (e.g. if
+    they're buffered) are still counted. If nothing has been counted yet, or
+    `recount_all` is set, every page view is counted.
+    """
+    if since is None and not recount_all:
+        latest = PageViewCount.objects.aggregate(latest=Max("date"))["latest"]
+        if latest is not None:
+            since = latest - timedelta(days=settings.PAGE_VIEW_ROLLUP_LOOKBACK_DAYS)
+
+    page_views = PageView.objects.all()
+    counts = PageViewCount.objects.all()
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+        page_views = page_views.filter(timestamp__gte=start)
+        counts = counts.filter(date__gte=since)
+
+    daily_counts = (
+        page_views.annotate(date=TruncDate("timestamp"))
+        .values("date", "page_id", "platform")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    saved = 0
+    with transaction.atomic():
+        counts.delete()
+        batch = []
+        for row in daily_counts.iterator(chunk_size=BATCH_SIZE):
+            batch.append(PageViewCount(**row))
+            if len(batch) >= BATCH_SIZE:
+                PageViewCount.objects.bulk_create(batch)
+                saved += len(batch)
+                batch = []
+        PageViewCount.objects.bulk_create(batch)
+        saved += len(batch)
+    return saved
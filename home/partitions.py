@@ -0,0 +1,202 @@
+"""
+On Postgres, the page view and rating tables are partitioned by month on their
+timestamp, so that old months can be archived and dropped without deleting rows one
+at a time, and so that vacuum and indexes only have to deal with recent months.
+
+Each table has:
+
+- `<table>_before_YYYY_MM` for everything from before the tables were partitioned
+- `<table>_pYYYY_MM` for each month since
+- `<table>_default` for anything without a monthly partition, which should be empty
+  as long as the `maintain_partitions` command is run regularly
+
+Archived partitions are gzipped CSV files, named after the partition, which can be
+restored into a separate table for analysis. The models and API don't know about
+any of this, other databases just have the normal tables.
+"""
+
+import gzip
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from django.db import connection, transaction
+
+PARTITIONED_TABLES = ["home_pageview", "home_contentpagerating"]
+
+PARTITION_RE = re.compile(
+    r"^(?P<table>\w+?)_(?P<kind>p|before_)(?P<y>\d{4})_(?P<m>\d{2})$"
+)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    table: str
+    # The first day after the partition
+    end: date
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def parse_partition(name: str) -> Partition | None:
+    """
+    Returns the partition with this table name, or None for the default partition
+    """
+    match = PARTITION_RE.match(name)
+    if match is None:
+        return None
+    month = date(int(match["y"]), int(match["m"]), 1)
+    end = add_months(month, 1) if match["kind"] == "p" else month
+    return Partition(name=name, table=match["table"], end=end)
+
+
+def is_partitioned(table: str) -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def get_partitions(table: str) -> list[Partition]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+    partitions = [parse_partition(name) for name in names]
+    return sorted((p for p in partitions if p is not None), key=lambda p: p.end)
+
+
+def partitions_to_archive(
+    partitions: list[Partition], retention_months: int, today: date
+) -> list[Partition]:
+    """
+    The partitions that only have rows from before the retention period, which
+    starts at the beginning of the month `retention_months` months ago
+    """
+    cutoff = add_months(month_start(today), -retention_months)
+    return [p for p in partitions if p.end <= cutoff]
+
+
+def create_partition(table: str, month: date) -> bool:
+    """
+    Creates the partition for the month, if it doesn't exist yet. Returns whether
+    the partition was created.
+
+    Any rows for the month that have already been saved in the default partition are
+    moved into the new partition.
+    """
+    name = partition_name(table, month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {table}_default
+                WHERE timestamp >= %s::timestamptz AND timestamp < %s::timestamptz
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,  # noqa: S608
+            [f"{start} 00:00+00", f"{end} 00:00+00"],
+        )
+        cursor.execute(
+            f"ALTER TABLE {table} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start} 00:00+00') TO ('{end} 00:00+00')"
+        )
+    return True
+
+
+def create_partitions(months_ahead: int, today: date) -> list[str]:
+    """
+    Makes sure every partitioned table has a partition for this month and the next
+    `months_ahead` months. Returns the names of the partitions that were created.
+    """
+    created = []
+    for table in PARTITIONED_TABLES:
+        for months in range(months_ahead + 1):
+            month = add_months(month_start(today), months)
+            if create_partition(table, month):
+                created.append(partition_name(table, month))
+    return created
+
+
+def archive_partition(partition: Partition, directory: Path) -> Path:
+    """
+    Saves the partition's rows to a gzipped CSV file in `directory`, then detaches
+    and drops the partition. Nothing is dropped if the file can't be written.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{partition.name}.csv.gz"
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Nothing should be saving to old partitions, but make sure we don't drop
+        # anything that isn't in the archive
+        cursor.execute(f"LOCK TABLE {partition.name} IN SHARE MODE")
+        with gzip.open(path, "wb") as f:
+            cursor.copy_expert(f"COPY {partition.name} TO STDOUT WITH CSV HEADER", f)
+        cursor.execute(
+            f"ALTER TABLE {partition.table} DETACH PARTITION {partition.name}"
+        )
+        cursor.execute(f"DROP TABLE {partition.name}")
+    return path
+
+
+def archive_partitions(
+    retention_months: int, directory: Path, today: date
+) -> list[Path]:
+    """
+    Archives every partition that's older than the retention period. Returns the
+    paths of the archive files.
+    """
+    paths = []
+    for table in PARTITIONED_TABLES:
+        for partition in partitions_to_archive(
+            get_partitions(table), retention_months, today
+        ):
+            paths.append(archive_partition(partition, directory))
+    return paths
+
+
+def restore_archive(path: Path) -> str:
+    """
+    Loads an archive file into a new table, named after the archived partition with
+    a `_restored` suffix. Returns the name of the table.
+
+    The table isn't attached to the partitioned table, so the restored rows aren't
+    visible to the API, and it has no foreign keys, so rows for pages that have
+    since been deleted can still be restored.
+    """
+    partition = parse_partition(path.name.removesuffix(".csv.gz"))
+    if partition is None or partition.table not in PARTITIONED_TABLES:
+        raise ValueError(f"{path.name} isn't a partition archive")
+    name = f"{partition.name}_restored"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {partition.table})")
+        with gzip.open(path, "rb") as f:
+            cursor.copy_expert(f"COPY {name} FROM STDIN WITH CSV HEADER", f)
+    return name
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+from django.db.models import Model, OuterRef, QuerySet, Subquery
+from wagtail.models import Page, Revision
+
+from .models import (
+    Assessment,
+    ContentPage,
+    ContentPageTag,
+    TriggeredContent,
+    WhatsappBlock,
+    WhatsAppTemplate,
+)
+
+MEDIA_FIELDS = {
+    field: WhatsappBlock.base_blocks[field].model_class
+    for field in ["image", "media", "document"]
+}
+
+
+class ReferenceResolver:
+    """
+    Resolves the pages, forms, templates, media, parents, tags and triggers
+    referenced by a batch of objects that are about to be serialized.
+
+    All the objects are scanned up front, and the first lookup of each model
+    loads everything the batch refers to with a single bulk query, so that
+    serializing a listing costs a fixed number of queries no matter how many rows
+    are in it. Lookups for anything that wasn't part of the scan (e.g. a draft
+    revision) fall back to querying the database.
+    """
+
+    def __init__(
+        self,
+        pages: Iterable[ContentPage] = (),
+        templates: Iterable[WhatsAppTemplate] = (),
+    ) -> None:
+        self._scanned: dict[int, ContentPage] = {page.pk: page for page in pages}
+        self._ids: dict[type[Model], set[Any]] = defaultdict(set)
+        self._objects: dict[type[Model], dict[Any, Any]] = {}
+        self._names: dict[type[Model], dict[int, list[str]]] = {}
+        self._revisions: dict[str, Revision] | None = None
+
+        for page in self._scanned.values():
+            if page.depth > 1:
+                self._ids[Page].add(self._parent_path(page))
+            for related in page.related_pages.raw_data if page.related_pages else []:
+                if related["value"] is not None:
+                    self._ids[ContentPage].add(related["value"])
+            for block in page.whatsapp_body.raw_data if page.whatsapp_body else []:
+                if block["type"] == "Whatsapp_Template":
+                    self._ids[WhatsAppTemplate].add(block["value"])
+                if block["type"] != "Whatsapp_Message":
+                    continue
+                for field, model in MEDIA_FIELDS.items():
+                    if block["value"].get(field):
+                        self._ids[model].add(block["value"][field])
+                for item in [
+                    *(block["value"].get("buttons") or []),
+                    *(block["value"].get("list_items") or []),
+                ]:
+                    self._collect_item(item)
+        for template in templates:
+            for item in template.buttons.raw_data if template.buttons else []:
+                self._collect_item(item)
+
+    def _collect_item(self, item: dict[str, Any]) -> None:
+        if item["type"] == "go_to_page" and item["value"].get("page") is not None:
+            self._ids[ContentPage].add(item["value"]["page"])
+        if item["type"] == "go_to_form" and item["value"].get("form") is not None:
+            self._ids[Assessment].add(item["value"]["form"])
+
+    @staticmethod
+    def _parent_path(page: Page) -> str:
+        return page.path[: -page.steplen]
+
+    @staticmethod
+    def _queryset(model: type[Model]) -> QuerySet:
+        if model is WhatsAppTemplate:
+            return model.objects.select_related("image")
+        return model.objects.all()
+
+    def _is_scanned(self, page: ContentPage) -> bool:
+        # Draft revisions share a pk with the live page, so we check identity
+        return self._scanned.get(page.pk) is page
+
+    def _load(self, model: type[Model], field_name: str = "pk") -> dict[Any, Any]:
+        if model not in self._objects:
+            ids = self._ids.get(model, set())
+            self._objects[model] = dict.fromkeys(ids)
+            self._objects[model].update(
+                self._queryset(model).in_bulk(ids, field_name=field_name)
+            )
+        return self._objects[model]
+
+    def get(self, model: type[Model], pk: Any) -> Any:
+        objects = self._load(model)
+        if pk not in objects:
+            objects[pk] = self._queryset(model).filter(pk=pk).first()
+        return objects[pk]
+
+    def get_parent(self, page: ContentPage) -> Page | None:
+        if not self._is_scanned(page):
+            return page.get_parent()
+        if page.depth <= 1:
+            return None
+        return self._load(Page, field_name="path")[self._parent_path(page)]
+
+    def get_latest_revision(self, page: ContentPage) -> Revision | None:
+        # Revisions are looked up by pk, so this is also right for draft objects
+        if page.pk not in self._scanned:
+            return page.revisions.order_by("-created_at").first()
+        if self._revisions is None:
+            latest = (
+                Revision.page_revisions.filter(object_id=OuterRef("object_id"))
+                .order_by("-created_at")
+                .values("pk")[:1]
+            )
+            self._revisions = {
+                revision.object_id: revision
+                for revision in Revision.page_revisions.filter(
+                    object_id__in=[str(pk) for pk in self._scanned],
+                    pk=Subquery(latest),
+                )
+            }
+        return self._revisions.get(str(page.pk))
+
+    def _get_names(self, through: type[Model], page: ContentPage) -> list[str]:
+        if through not in self._names:
+            names: dict[int, list[str]] = defaultdict(list)
+            for object_id, name in (
+                through.objects.filter(content_object_id__in=self._scanned.keys())
+                .order_by("tag__name")
+                .values_list("content_object_id", "tag__name")
+            ):
+                names[object_id].append(name)
+            self._names[through] = names
+        return self._names[through][page.pk]
+
+    def get_tags(self, page: ContentPage) -> list[str]:
+        if self._is_scanned(page):
+            return self._get_names(ContentPageTag, page)
+        return list(page.tags.all().order_by("name").values_list("name", flat=True))
+
+    def get_triggers(self, page: ContentPage) -> list[str]:
+        if self._is_scanned(page):
+            return self._get_names(TriggeredContent, page)
+        return list(page.triggers.all().order_by("name").values_list("name", flat=True))
@@ -0,0 +1,173 @@
+"""
+Full-text search of content pages.
+
+On Postgres, every live content page has a ContentPageSearch row with a tsvector of
+its text, weighted so that matches in titles rank above matches in bodies:
+
+- A: the page title and each channel's title
+- B: the web subtitle and the messages in each channel's body
+- C: the web body
+
+Pages are indexed with the text search configuration of their locale's language,
+so that words are stemmed the way that language stems them, and searches use the
+configuration of the locale being searched. Pages are indexed when they're
+published and removed when they're unpublished (see home/signals.py), and the
+`reindex_search` command rebuilds the whole index.
+
+Other databases don't keep the index, so searches match titles with icontains
+instead, without ranking.
+"""
+
+import operator
+from collections.abc import Iterable, Iterator
+from functools import reduce
+from typing import Any
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import F, Q, QuerySet, TextField, Value
+from django.utils.html import strip_tags
+
+from .models import ContentPage, ContentPageSearch
+
+# Postgres' built in text search configurations, by language code. Languages that
+# aren't here use "simple", which lowercases words but doesn't stem them. These can
+# be overridden, or added to, with SEARCH_LANGUAGE_CONFIGS.
+LANGUAGE_CONFIGS = {
+    "ar": "arabic",
+    "da": "danish",
+    "de": "german",
+    "en": "english",
+    "es": "spanish",
+    "fi": "finnish",
+    "fr": "french",
+    "hu": "hungarian",
+    "id": "indonesian",
+    "it": "italian",
+    "ne": "nepali",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pt": "portuguese",
+    "ro": "romanian",
+    "ru": "russian",
+    "sv": "swedish",
+    "ta": "tamil",
+    "tr": "turkish",
+}
+
+CHANNELS = ["whatsapp", "sms", "ussd", "messenger", "viber"]
+
+
+def is_enabled() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def search_config(language_code: str) -> str:
+    """
+    The text search configuration for this language code. Regional codes like
+    "pt-br" fall back to the configuration of their language.
+    """
+    configs = {**LANGUAGE_CONFIGS, **settings.SEARCH_LANGUAGE_CONFIGS}
+    code = language_code.casefold()
+    return configs.get(code) or configs.get(code.split("-")[0], "simple")
+
+
+def body_messages(body: Iterable[Any]) -> list[str]:
+    return [
+        block.value["message"]
+        for block in body
+        if isinstance(block.value, dict) and block.value.get("message")
+    ]
+
+
+def page_text(page: ContentPage) -> dict[str, list[str]]:
+    """
+    The text of the page to index, by weight
+    """
+    titles = [page.title]
+    messages = [page.subtitle]
+    for channel in CHANNELS:
+        titles.append(getattr(page, f"{channel}_title"))
+        messages.extend(body_messages(getattr(page, f"{channel}_body")))
+    web_body = [
+        strip_tags(block.value.source)
+        for block in page.body
+        if block.block_type == "paragraph"
+    ]
+    return {"A": titles, "B": messages, "C": web_body}
+
+
+def search_vector(page: ContentPage) -> SearchVector:
+    config = search_config(page.locale.language_code)
+    vectors = [
+        SearchVector(
+            Value(" ".join(filter(None, text)), output_field=TextField()),
+            config=config,
+            weight=weight,
+        )
+        for weight, text in page_text(page).items()
+    ]
+    return reduce(operator.add, vectors)
+
+
+def index_pages(pages: Iterable[ContentPage]) -> None:
+    """
+    Saves the search documents of these pages, replacing any existing ones
+    """
+    if not is_enabled():
+        return
+    ContentPageSearch.objects.bulk_create(
+        [ContentPageSearch(page=page, vector=search_vector(page)) for page in pages],
+        update_conflicts=True,
+        unique_fields=["page"],
+        update_fields=["vector"],
+    )
+
+
+def remove_pages(page_ids: Iterable[int]) -> None:
+    if not is_enabled():
+        return
+    ContentPageSearch.objects.filter(page_id__in=page_ids).delete()
+
+
+def reindex(batch_size: int) -> Iterator[int]:
+    """
+    Rebuilds the search documents of all the live pages, a batch at a time so that
+    large sites don't have to be loaded into memory or locked at once. Yields how
+    many pages have been indexed after each batch.
+    """
+    ContentPageSearch.objects.exclude(page__live=True).delete()
+    pages = ContentPage.objects.live().select_related("locale").order_by("pk")
+    indexed = 0
+    last_pk = 0
+    while batch := list(pages.filter(pk__gt=last_pk)[:batch_size]):
+        with transaction.atomic():
+            index_pages(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+        yield indexed
+
+
+def search_pages(
+    queryset: QuerySet[ContentPage], query: str, language_code: str
+) -> QuerySet[ContentPage]:
+    """
+    Filters the pages to the ones that match the query, most relevant first. The
+    query can use web search syntax, e.g. quoted phrases, "or", and "-" to exclude
+    words.
+    """
+    if not is_enabled():
+        titles = Q(title__icontains=query)
+        for channel in CHANNELS:
+            titles |= Q(**{f"{channel}_title__icontains": query})
+        return queryset.filter(titles)
+
+    search_query = SearchQuery(
+        query, config=search_config(language_code), search_type="websearch"
+    )
+    return (
+        queryset.filter(search__vector=search_query)
+        .annotate(rank=SearchRank(F("search__vector"), search_query))
+        .order_by("-rank", "pk")
+    )
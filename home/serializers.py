@@ -11,6 +11,7 @@ from wagtail.api.v2.serializers import (
 from wagtail.api.v2.utils import get_object_detail_url
 
 from home.models import ContentPage, ContentPageRating, PageView, WhatsAppTemplate
+from home.references import ReferenceResolver
 
 
 class TitleField(serializers.Field):
@@ -114,9 +115,11 @@ def has_previous_message(message_index, content_page, platform):
         return message_index
 
 
-def format_whatsapp_template_message(message_index, content_page) -> dict[str, Any]:
+def format_whatsapp_template_message(
+    message_index, content_page, resolver: ReferenceResolver
+) -> dict[str, Any]:
     block = content_page.whatsapp_body._raw_data[message_index]
-    wa_template = WhatsAppTemplate.objects.get(id=block["value"])
+    wa_template = get_whatsapp_template(block["value"], resolver)
 
     text = {
         "id": str(wa_template.id),
@@ -139,6 +142,17 @@ def format_whatsapp_template_message(message_index, content_page) -> dict[str, A
     return text
 
 
+def get_whatsapp_template(
+    template_id: int, resolver: ReferenceResolver
+) -> WhatsAppTemplate:
+    wa_template = resolver.get(WhatsAppTemplate, template_id)
+    if wa_template is None:
+        raise WhatsAppTemplate.DoesNotExist(
+            "WhatsAppTemplate matching query does not exist."
+        )
+    return wa_template
+
+
 def get_content_page_response_revision(page: ContentPage, request) -> int | None:
     if request.GET.get("qa", "").lower() == "true":
         revision = page.get_latest_revision()
@@ -199,10 +213,13 @@ class BodyField(serializers.Field):
         return instance
 
     def to_representation(self, value):
-        return body_field_representation(value, self.context["request"])
+        resolver = self.context.get("resolver") or ReferenceResolver([value])
+        return body_field_representation(value, self.context["request"], resolver)
 
 
-def body_field_representation(page: Any, request: Any) -> Any:
+def body_field_representation(
+    page: Any, request: Any, resolver: ReferenceResolver
+) -> Any:
     if "message" in request.GET:
         try:
             message = int(request.GET["message"]) - 1
@@ -238,13 +255,15 @@ def body_field_representation(page: Any, request: Any) -> Any:
                 block = page.whatsapp_body._raw_data[message]
 
                 if block["type"] == "Whatsapp_Template":
-                    template = WhatsAppTemplate.objects.get(id=block["value"])
+                    template = get_whatsapp_template(block["value"], resolver)
 
                     api_body.update(
                         [
                             (
                                 "text",
-                                format_whatsapp_template_message(message, page),
+                                format_whatsapp_template_message(
+                                    message, page, resolver
+                                ),
                             ),
                             (
                                 "revision",
@@ -267,9 +286,7 @@ def body_field_representation(page: Any, request: Any) -> Any:
 
                     # If in QA mode, modify the message
                     if "qa" in request.GET and request.GET["qa"].lower() == "true":
-                        latest_revision = (
-                            page.revisions.order_by("-created_at").first().as_object()
-                        )
+                        latest_revision = resolver.get_latest_revision(page).as_object()
                         if (
                             isinstance(formatted_message, dict)
                             and "value" in formatted_message
@@ -400,18 +417,22 @@ class RelatedPagesField(serializers.Field):
         return instance
 
     def to_representation(self, value):
-        return related_pages_field_representation(value, self.context["request"])
-
-
-def get_related_page_as_content_page(page):
-    if page.id:
-        return ContentPage.objects.filter(id=page.id).first()
+        resolver = self.context.get("resolver") or ReferenceResolver([value])
+        return related_pages_field_representation(
+            value, self.context["request"], resolver
+        )
 
 
-def related_pages_field_representation(page, request):
+def related_pages_field_representation(page, request, resolver):
     related_pages = []
-    for related in page.related_pages:
-        related_page = get_related_page_as_content_page(related.value)
+    # The raw block data holds the page ids, so we don't need to load each
+    # chooser's page just to look up the matching ContentPage.
+    for related in page.related_pages.raw_data if page.related_pages else []:
+        if related["value"] is None:
+            continue
+        related_page = resolver.get(ContentPage, related["value"])
+        if related_page is None:
+            continue
         title = related_page.title
         if "whatsapp" in request.GET and related_page.enable_whatsapp is True:
             if related_page.whatsapp_title:
@@ -431,7 +452,7 @@ def related_pages_field_representation(page, request):
 
         related_pages.append(
             {
-                "id": related.id,
+                "id": related.get("id"),
                 "value": related_page.id,
                 "title": title,
             }
@@ -450,23 +471,26 @@ class ContentPageSerializer(PageSerializer):
     def to_representation(self, page):
         request = self.context["request"]
         router = self.context["router"]
+        resolver = self.context.get("resolver") or ReferenceResolver([page])
         return {
             "id": page.id,
-            "meta": metadata_field_representation(page, request, router),
+            "meta": metadata_field_representation(page, request, router, resolver),
             "title": title_field_representation(page, request),
             "subtitle": subtitle_field_representation(page),
-            "body": body_field_representation(page, request),
+            "body": body_field_representation(page, request, resolver),
             "tags": [x.name for x in page.tags.all()],
             "triggers": [x.name for x in page.triggers.all()],
             "quick_replies": [x.name for x in page.quick_replies.all()],
             "has_children": has_children_field_representation(page),
-            "related_pages": related_pages_field_representation(page, request),
+            "related_pages": related_pages_field_representation(
+                page, request, resolver
+            ),
         }
 
 
-def metadata_field_representation(page, request, router):
+def metadata_field_representation(page, request, router, resolver):
     parent = {}
-    page_parent = page.get_parent()
+    page_parent = resolver.get_parent(page)
     detail_url = get_object_detail_url(router, request, type(page), page.pk)
     if page_parent:
         parent = {
@@ -6,7 +6,14 @@ from wagtail import blocks
 from wagtail.api.v2.serializers import PageSerializer
 from wagtail.api.v2.utils import get_object_detail_url
 
-from home.models import Assessment, ContentPage, WhatsAppTemplate
+from home.models import (
+    Assessment,
+    ContentChange,
+    ContentPage,
+    WhatsappBlock,
+    WhatsAppTemplate,
+)
+from home.references import MEDIA_FIELDS, ReferenceResolver
 
 
 def format_title(page, request):
@@ -24,16 +31,13 @@ def format_title(page, request):
     return title_to_return
 
 
-def get_related_page_as_content_page(page):
-    if page and page.id:
-        return ContentPage.objects.filter(id=page.id).first()
-
-
-def format_related_pages(page, request):
+def format_related_pages(page, request, resolver):
     related_pages = []
 
-    for related in page.related_pages:
-        related_page = get_related_page_as_content_page(related.value)
+    for related in page.related_pages.raw_data if page.related_pages else []:
+        if related["value"] is None:
+            continue
+        related_page = resolver.get(ContentPage, related["value"])
         if related_page:
             related_pages.append(
                 {
@@ -68,7 +72,7 @@ def format_generic_channel_body(page, channel):
             )
 
 
-def format_messages(page, request):
+def format_messages(page, request, resolver):
     channel = ""
 
     if "channel" in request.query_params:
@@ -77,14 +81,16 @@ def format_messages(page, request):
 
         if getattr(page, f"enable_{channel}") or return_drafts:
             if channel == "whatsapp":
-                return format_whatsapp_body_V3(page)
+                return format_whatsapp_body_V3(page, resolver)
             else:
                 return format_generic_channel_body(page, channel)
 
     return OrderedDict([("text", page.body._raw_data)])
 
 
-def format_buttons_and_list_items(given_list: blocks.StreamValue.StreamChild):
+def format_buttons_and_list_items(
+    given_list: blocks.StreamValue.StreamChild, resolver: ReferenceResolver
+):
     button_dicts = []
 
     for button in given_list:
@@ -92,7 +98,11 @@ def format_buttons_and_list_items(given_list: blocks.StreamValue.StreamChild):
         if button["type"] == "go_to_page":
             if button["value"].get("page") is None:
                 continue
-            content_page = ContentPage.objects.get(id=button["value"].get("page"))
+            content_page = resolver.get(ContentPage, button["value"].get("page"))
+            if content_page is None:
+                raise ContentPage.DoesNotExist(
+                    "ContentPage matching query does not exist."
+                )
 
             button_dict["slug"] = content_page.slug
         if button["type"] == "go_to_form":
@@ -100,7 +110,11 @@ def format_buttons_and_list_items(given_list: blocks.StreamValue.StreamChild):
             if button["value"].get("form") is None:
                 continue
 
-            assessment = Assessment.objects.get(id=button["value"].get("form"))
+            assessment = resolver.get(Assessment, button["value"].get("form"))
+            if assessment is None:
+                raise Assessment.DoesNotExist(
+                    "Assessment matching query does not exist."
+                )
             button_dict["slug"] = assessment.slug
 
         button_dicts.append(button_dict)
@@ -127,54 +141,44 @@ def format_variation_messages(given_list: blocks.list_block.ListValue):
     return variation_messages
 
 
-def format_whatsapp_body_V3(content_page):
+def format_whatsapp_body_V3(content_page, resolver):
     if not content_page.whatsapp_body:
         return []
 
     messages = []
-    for block in content_page.whatsapp_body:
-        if str(block.block_type) == "Whatsapp_Message":
+    # We work with the raw block data, because converting the blocks to python
+    # values looks up every referenced page, form and media item one at a time.
+    for block in content_page.whatsapp_body.raw_data:
+        if block["type"] == "Whatsapp_Message":
+            value = block["value"]
             message = {}
-            message["text"] = block.value["message"]
+            message["text"] = value["message"]
 
             # Get just the ID for images and media
-            if block.value.get("image"):
-                message["image"] = (
-                    block.value["image"].id
-                    if hasattr(block.value["image"], "id")
-                    else block.value["image"]
-                )
-            if block.value.get("media"):
-                message["media"] = (
-                    block.value["media"].id
-                    if hasattr(block.value["media"], "id")
-                    else block.value["media"]
-                )
-            if block.value.get("document"):
-                message["document"] = (
-                    block.value["document"].id
-                    if hasattr(block.value["document"], "id")
-                    else block.value["document"]
-                )
-            if block.value.get("buttons"):
+            for field, model in MEDIA_FIELDS.items():
+                if value.get(field) and resolver.get(model, value[field]):
+                    message[field] = value[field]
+            if value.get("buttons"):
                 message["buttons"] = format_buttons_and_list_items(
-                    block.value.get("buttons").raw_data
+                    value.get("buttons"), resolver
                 )
 
-            if block.value.get("list_title"):
-                message["list_title"] = block.value.get("list_title")
-            if block.value.get("list_items"):
+            if value.get("list_title"):
+                message["list_title"] = value.get("list_title")
+            if value.get("list_items"):
                 message["list_items"] = format_buttons_and_list_items(
-                    block.value.get("list_items").raw_data
+                    value.get("list_items"), resolver
                 )
 
-            if block.value.get("variation_messages"):
+            if value.get("variation_messages"):
                 message["variation_messages"] = format_variation_messages(
-                    block.value.get("variation_messages")
+                    WhatsappBlock.base_blocks["variation_messages"].to_python(
+                        value.get("variation_messages")
+                    )
                 )
 
-            if block.value.get("footer"):
-                message["footer"] = block.value.get("footer")
+            if value.get("footer"):
+                message["footer"] = value.get("footer")
 
             messages.append(message)
 
@@ -204,6 +208,8 @@ class ContentPageSerializerV3(PageSerializer):
     slug = serializers.SlugField(read_only=True)
     messages = serializers.SerializerMethodField()
     detail_url = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
+    triggers = serializers.SerializerMethodField()
     related_pages = serializers.SerializerMethodField()
     revision = serializers.SerializerMethodField()
     meta_fields = []
@@ -233,6 +239,14 @@ class ContentPageSerializerV3(PageSerializer):
 
         return super().to_representation(instance)
 
+    @property
+    def resolver(self):
+        # Views pass a resolver for the whole batch, this is the fallback for
+        # anything else that serializes pages.
+        if "resolver" not in self.context:
+            self.context["resolver"] = ReferenceResolver()
+        return self.context["resolver"]
+
     def get_title(self, obj):
         return format_title(page=obj, request=self.context["request"])
 
@@ -240,10 +254,20 @@ class ContentPageSerializerV3(PageSerializer):
         return format_detail_url(obj=obj, request=self.context["request"])
 
     def get_messages(self, obj):
-        return format_messages(page=obj, request=self.context["request"])
+        return format_messages(
+            page=obj, request=self.context["request"], resolver=self.resolver
+        )
+
+    def get_tags(self, obj):
+        return self.resolver.get_tags(obj)
+
+    def get_triggers(self, obj):
+        return self.resolver.get_triggers(obj)
 
     def get_related_pages(self, obj):
-        return format_related_pages(page=obj, request=self.context["request"])
+        return format_related_pages(
+            page=obj, request=self.context["request"], resolver=self.resolver
+        )
 
     def get_revision(self, obj):
         request = self.context["request"]
@@ -303,10 +327,28 @@ class WhatsAppTemplateSerializer(serializers.ModelSerializer):
         return revision.id if revision else None
 
     def get_buttons(self, obj):
-        return format_buttons_and_list_items(obj.buttons.raw_data)
+        resolver = self.context.get("resolver") or ReferenceResolver()
+        return format_buttons_and_list_items(obj.buttons.raw_data, resolver)
 
     def get_example_values(self, obj):
         return format_example_values(obj.example_values.raw_data)
 
     def get_detail_url(self, obj):
         return format_detail_url(obj=obj, request=self.context["request"])
+
+
+class ContentChangeSerializer(serializers.ModelSerializer):
+    locale = serializers.CharField(source="language_code")
+
+    class Meta:
+        model = ContentChange
+        fields = [
+            "id",
+            "kind",
+            "object_id",
+            "action",
+            "slug",
+            "locale",
+            "revision_id",
+            "timestamp",
+        ]
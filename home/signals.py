@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.models import Page
+from wagtail.signals import (
+    page_published,
+    page_unpublished,
+    post_page_move,
+    published,
+    unpublished,
+)
+
+from . import api_cache, search, trigger_index
+from .changes import record_change
+from .models import (
+    Assessment,
+    ContentChange,
+    ContentPage,
+    ContentPageIndex,
+    ContentQuickReply,
+    ContentTrigger,
+    OrderedContentSet,
+    WhatsAppTemplate,
+)
+
+# Pages include their parent, related pages, templates and forms in API responses,
+# so any of these changing can change any cached response. The cache is invalidated
+# once the changes are committed, so that requests can't cache the data from before
+# the changes under the new version.
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+@receiver(published, sender=WhatsAppTemplate)
+@receiver(unpublished, sender=WhatsAppTemplate)
+@receiver(published, sender=Assessment)
+@receiver(unpublished, sender=Assessment)
+@receiver(post_delete, sender=Page)
+@receiver(post_delete, sender=ContentPage)
+@receiver(post_delete, sender=WhatsAppTemplate)
+@receiver(post_delete, sender=Assessment)
+def invalidate_api_cache(sender, **kwargs):
+    transaction.on_commit(api_cache.invalidate)
+
+
+@receiver(page_published, sender=ContentPage)
+def index_published_page(sender, instance, **kwargs):
+    search.index_pages([instance])
+
+
+@receiver(page_unpublished, sender=ContentPage)
+def remove_unpublished_page(sender, instance, **kwargs):
+    search.remove_pages([instance.pk])
+
+
+# The trigger index is rebuilt once the changes are committed, so that other
+# processes can't rebuild it from the data from before the changes
+
+
+@receiver(page_published, sender=ContentPage)
+@receiver(page_unpublished, sender=ContentPage)
+@receiver(post_delete, sender=ContentPage)
+def invalidate_trigger_index(sender, instance, **kwargs):
+    language_code = instance.locale.language_code
+    transaction.on_commit(lambda: trigger_index.invalidate(language_code))
+
+
+@receiver(post_save, sender=ContentTrigger)
+@receiver(post_save, sender=ContentQuickReply)
+@receiver(post_delete, sender=ContentTrigger)
+@receiver(post_delete, sender=ContentQuickReply)
+def invalidate_trigger_names(sender, created=False, **kwargs):
+    # New triggers aren't on any pages until those pages are published
+    if not created:
+        transaction.on_commit(trigger_index.invalidate_all)
+
+
+# The change feed, see home/changes.py
+
+
+@receiver(page_published, sender=ContentPage)
+@receiver(page_published, sender=ContentPageIndex)
+@receiver(published, sender=WhatsAppTemplate)
+@receiver(published, sender=Assessment)
+@receiver(published, sender=OrderedContentSet)
+def record_published(sender, instance, revision=None, **kwargs):
+    revision_id = revision.pk if revision is not None else None
+    record_change(sender, instance, ContentChange.Action.PUBLISH, revision_id)
+
+
+@receiver(page_unpublished, sender=ContentPage)
+@receiver(page_unpublished, sender=ContentPageIndex)
+@receiver(unpublished, sender=WhatsAppTemplate)
+@receiver(unpublished, sender=Assessment)
+@receiver(unpublished, sender=OrderedContentSet)
+def record_unpublished(sender, instance, **kwargs):
+    record_change(sender, instance, ContentChange.Action.UNPUBLISH)
+
+
+@receiver(post_page_move, sender=ContentPage)
+@receiver(post_page_move, sender=ContentPageIndex)
+def record_moved(sender, instance, **kwargs):
+    record_change(
+        sender, instance, ContentChange.Action.MOVE, instance.live_revision_id
+    )
+
+
+@receiver(post_delete, sender=ContentPage)
+@receiver(post_delete, sender=ContentPageIndex)
+@receiver(post_delete, sender=WhatsAppTemplate)
+@receiver(post_delete, sender=Assessment)
+@receiver(post_delete, sender=OrderedContentSet)
+def record_deleted(sender, instance, **kwargs):
+    record_change(sender, instance, ContentChange.Action.DELETE)
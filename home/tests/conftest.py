@@ -0,0 +1,12 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Cached API responses shouldn't leak between tests
+    """
+    cache.clear()
+    yield
+    cache.clear()
@@ -9,6 +9,8 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError  # type: ignore
 from django.core.files.base import File  # type: ignore
 from django.core.files.images import ImageFile  # type: ignore
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from pytest_django.asserts import assertTemplateUsed
 from taggit.models import Tag  # type: ignore
@@ -20,6 +22,7 @@ from wagtail.models.sites import Site  # type: ignore
 from wagtailmedia.models import Media  # type: ignore
 
 from home.content_import_export import import_content
+from home.drafts import with_content_json
 from home.models import (
     AgeQuestionBlock,
     AnswerBlock,
@@ -409,7 +412,9 @@ class TestContentPageAPI:
         assert l3["body"]["text"]["value"]["message"] == "p3 live 1"
 
     @pytest.mark.parametrize("platform", ALL_PLATFORMS)
-    def test_platform_disabled(self, uclient, platform):
+    def test_platform_disabled(
+        self, uclient, platform, django_capture_on_commit_callbacks
+    ):
         """
         It should not return the body if enable_<platform>=false
         """
@@ -419,7 +424,8 @@ class TestContentPageAPI:
         assert response.content != b""
 
         setattr(page, f"enable_{platform}", False)
-        page.save_revision().publish()
+        with django_capture_on_commit_callbacks(execute=True):
+            page.save_revision().publish()
 
         response = uclient.get(f"/api/v2/pages/{page.id}/?{platform}=True")
         assert response.status_code == 404
@@ -575,9 +581,86 @@ class TestContentPageAPI:
         page = self.create_content_page()
         page = self.create_content_page(page, title="Content Page 1")
         uclient.get("/api/v2/pages/")
-        with django_assert_num_queries(16):
+        # One of these is for the listing's ETag
+        with django_assert_num_queries(13):
             uclient.get("/api/v2/pages/")
 
+    def test_number_of_queries_is_fixed_for_references(self, uclient):
+        """
+        Parents, templates, related pages, tags and triggers referenced by the pages
+        in a listing are loaded in bulk, so the number of queries doesn't grow with
+        the page count.
+        """
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        target_page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="target-page",
+            title="Target Page",
+            bodies=[WABody("Target Page", [WABlk("Target page content")])],
+        )
+        template = WhatsAppTemplate.objects.create(
+            slug="test-template",
+            message="Test WhatsApp Template Message 1",
+            category="UTILITY",
+            locale=Locale.objects.first(),
+            submission_name="test_template",
+        )
+
+        def build_page(i):
+            page = PageBuilder.build_cp(
+                parent=main_menu,
+                slug=f"page-{i}",
+                title=f"Page {i}",
+                bodies=[
+                    WABody(
+                        f"Page {i}",
+                        [
+                            WATpl("Template", template=template),
+                            WABlk(
+                                f"Message {i}",
+                                buttons=[PageBtn("Go to page", target_page)],
+                            ),
+                        ],
+                    )
+                ],
+                tags=[f"tag-{i}"],
+                triggers=[f"trigger-{i}"],
+            )
+            return PageBuilder.link_related(page, [target_page])
+
+        def count_listing_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get("/api/v2/pages/?whatsapp=true")
+            assert response.status_code == 200
+            return len(ctx.captured_queries), response.json()
+
+        build_page(1)
+        # Run this once without counting to get one-off queries out of the way
+        count_listing_queries()
+        num_queries, content = count_listing_queries()
+        assert content["count"] == 2
+
+        for i in range(2, 5):
+            build_page(i)
+        assert count_listing_queries()[0] == num_queries
+
+        results = count_listing_queries()[1]["results"]
+        [page] = [r for r in results if r["title"] == "Page 4"]
+        assert page["meta"]["parent"]["id"] == main_menu.id
+        assert page["tags"] == ["tag-4"]
+        assert page["triggers"] == ["trigger-4"]
+        assert page["related_pages"] == [
+            {
+                "id": page["related_pages"][0]["id"],
+                "value": target_page.id,
+                "title": "Target Page",
+            }
+        ]
+        assert page["body"]["text"]["id"] == str(template.id)
+        assert page["body"]["is_whatsapp_template"] is True
+        assert page["body"]["whatsapp_template_name"] == "test_template"
+
     @pytest.mark.parametrize("platform", ALL_PLATFORMS)
     def test_detail_view_content(self, uclient, platform):
         """
@@ -1521,6 +1604,32 @@ class TestOrderedContentSetAPI:
         assert response.status_code == 200
         assert content["count"] == 2
 
+    def test_orderedcontent_endpoint_filter_queries(self, uclient):
+        """
+        Filtering on profile fields is done in the database, so the number of
+        queries doesn't depend on the number of ordered content sets
+        """
+        url = "/api/v2/orderedcontent/?gender=female&age=18 - 25"
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get(url)
+            assert response.json()["count"] == 0
+            return len(ctx.captured_queries)
+
+        queries = count_queries()
+        for i in range(5):
+            ordered_content_set = OrderedContentSet(
+                name="Test set",
+                slug=f"ordered-set-{i + 2}",
+                locale=self.default_locale,
+                profile_fields=[("gender", "female"), ("age", "26 - 35")],
+            )
+            ordered_content_set.save()
+            ordered_content_set.save_revision().publish()
+
+        assert count_queries() == queries
+
     def test_orderedcontent_endpoint_filter_female_on_gender_profile_field_qa_flag_set(
         self, uclient
     ):
@@ -1867,6 +1976,100 @@ class TestOrderedContentSetAPI:
 
         assert response.status_code == 404
 
+    def create_draft_sets(self, count):
+        for i in range(count):
+            ordered_content_set = OrderedContentSet(
+                name=f"Set {i}",
+                slug=f"draft-set-{i}",
+                locale=self.default_locale,
+                profile_fields=[("gender", "male")],
+            )
+            ordered_content_set.save()
+            ordered_content_set.save_revision().publish()
+            ordered_content_set.name = f"Draft set {i}"
+            ordered_content_set.profile_fields = [("gender", "female")]
+            ordered_content_set.save_revision()
+
+    def test_orderedcontent_drafts_with_filters(self, uclient: Any) -> None:
+        """
+        Drafts are returned with the qa param, even when the listing is filtered,
+        and the profile field filters use the drafts' profile fields
+        """
+        self.create_draft_sets(2)
+
+        response = uclient.get(
+            "/api/v2/orderedcontent/?qa=True&locale=en&slug=draft-set-1"
+        )
+        [result] = response.json()["results"]
+        assert result["name"] == "Draft set 1"
+
+        response = uclient.get("/api/v2/orderedcontent/?qa=True&gender=female")
+        names = [r["name"] for r in response.json()["results"]]
+        assert sorted(names) == sorted(
+            ["Test set", "Test set timed", "Draft set 0", "Draft set 1"]
+        )
+
+        response = uclient.get("/api/v2/orderedcontent/?gender=female")
+        names = [r["name"] for r in response.json()["results"]]
+        assert sorted(names) == ["Test set", "Test set timed"]
+
+    def test_orderedcontent_drafts_pagination(self, uclient: Any) -> None:
+        """
+        Each page of drafts has the right objects, and loading the drafts takes the
+        same number of queries however many there are
+        """
+        self.create_draft_sets(6)
+
+        names = []
+        for page in [1, 2]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get(f"/api/v2/orderedcontent/?qa=True&page={page}")
+            names += [r["name"] for r in response.json()["results"]]
+            revision_queries = [
+                q for q in ctx.captured_queries if "wagtailcore_revision" in q["sql"]
+            ]
+            assert len(revision_queries) == 1
+
+        assert response.json()["count"] == 8
+        assert sorted(names) == sorted(
+            ["Test set", "Test set timed"] + [f"Draft set {i}" for i in range(6)]
+        )
+
+    def test_orderedcontent_drafts_filter_queries(self, uclient: Any) -> None:
+        """
+        The drafts' profile fields are only loaded once to filter the listing
+        """
+        self.create_draft_sets(3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = uclient.get("/api/v2/orderedcontent/?qa=True&gender=female")
+
+        assert response.json()["count"] == 5
+        content_queries = [
+            q
+            for q in ctx.captured_queries
+            if '"wagtailcore_revision"."content" FROM' in q["sql"]
+        ]
+        # One for the profile fields, and one for the drafts on the page
+        assert len(content_queries) == 2
+
+    def test_drafts_keep_object_fields(self) -> None:
+        """
+        Drafts keep the same fields from the saved object as Wagtail's drafts do
+        """
+        self.create_draft_sets(1)
+        ordered_content_set = OrderedContentSet.objects.get(slug="draft-set-0")
+        content = ordered_content_set.latest_revision.content
+
+        draft = with_content_json(ordered_content_set, content)
+        expected = ordered_content_set.with_content_json(content)
+
+        assert draft.name == "Draft set 0"
+        for field in OrderedContentSet._meta.concrete_fields:
+            assert field.value_from_object(draft) == field.value_from_object(
+                expected
+            ), field.name
+
     def test_orderedcontent_new_draft(self, uclient: Any) -> None:
         """
         New revisions are returned if the qa param is set
@@ -2965,6 +3168,24 @@ class TestAssessmentAPI:
         content = json.loads(response.content)
         assert content["count"] == 0
 
+    def test_assessment_drafts_with_filters(self, uclient: Any) -> None:
+        """
+        Drafts are returned with the qa param, even when the listing is filtered
+        """
+        self.assessment.title = "Draft title"
+        self.assessment.high_inflection = 7.0
+        self.assessment.save_revision()
+
+        response = uclient.get("/api/v2/assessment/?qa=True&locale=en&tag=tag1")
+        [result] = response.json()["results"]
+        assert result["title"] == "Draft title"
+        assert result["high_inflection"] == 7.0
+        assert result["locale"] == "en"
+
+        response = uclient.get("/api/v2/assessment/?locale=en")
+        [result] = response.json()["results"]
+        assert result["title"] == "Test Assessment"
+
 
 @pytest.mark.django_db
 class TestAssessmentLocaleFilterAPI:
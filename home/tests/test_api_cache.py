@@ -0,0 +1,186 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from wagtail.models import Locale
+
+from home import api_cache
+from home.models import ContentPage, HomePage, PageView, WhatsAppTemplate
+
+from .page_builder import PageBuilder, WABlk, WABody, WATpl
+
+
+@pytest.fixture()
+def uclient(client, django_user_model):
+    """
+    Access the user interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_user(**creds)
+    client.login(**creds)
+    return client
+
+
+@pytest.mark.django_db
+class TestAPICache:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        self.main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+
+    def create_content_page(self, slug="page", blocks=None):
+        return PageBuilder.build_cp(
+            parent=self.main_menu,
+            slug=slug,
+            title="Page",
+            bodies=[WABody("Page", blocks or [WABlk("Message")])],
+        )
+
+    def test_v3_detail_cached(self, uclient):
+        """
+        The second request for a page is served from the cache, but both requests
+        are recorded as page views
+        """
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+
+        first = uclient.get(url)
+        second = uclient.get(url)
+
+        assert first.json() == second.json()
+        assert api_cache.get_stats() == {"hits": 1, "misses": 1}
+        assert PageView.objects.filter(page=page).count() == 2
+
+    def test_v2_detail_cached(self, uclient):
+        """
+        The second request for a page is served from the cache, but both requests
+        are recorded as page views
+        """
+        page = self.create_content_page()
+        url = f"/api/v2/pages/{page.id}/?whatsapp=true"
+
+        first = uclient.get(url)
+        second = uclient.get(url)
+
+        assert first.json() == second.json()
+        assert api_cache.get_stats() == {"hits": 1, "misses": 1}
+        assert PageView.objects.filter(page=page).count() == 2
+
+    def test_query_params_in_key(self, uclient):
+        """
+        Requests for a different message or channel aren't served from the same entry,
+        but page view data doesn't affect the cache
+        """
+        page = self.create_content_page(blocks=[WABlk("One"), WABlk("Two")])
+        url = f"/api/v2/pages/{page.id}/?whatsapp=true"
+
+        uclient.get(url)
+        response = uclient.get(f"{url}&message=2")
+        uclient.get(f"{url}&data__user=123")
+
+        assert response.json()["body"]["text"]["value"]["message"] == "Two"
+        assert api_cache.get_stats() == {"hits": 1, "misses": 2}
+
+    def test_drafts_not_cached(self, uclient):
+        """
+        QA and draft requests always return the latest content
+        """
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp&return_drafts=true"
+
+        uclient.get(url)
+        page.whatsapp_title = "Draft title"
+        page.save_revision()
+        response = uclient.get(url)
+
+        assert response.json()["title"] == "Draft title"
+        assert api_cache.get_stats() == {"hits": 0, "misses": 0}
+
+    def test_invalidated_on_publish(self, uclient, django_capture_on_commit_callbacks):
+        """
+        Publishing a page invalidates the cache once the publish is committed
+        """
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+
+        uclient.get(url)
+        page.whatsapp_title = "New title"
+        with django_capture_on_commit_callbacks() as callbacks:
+            page.save_revision().publish()
+        version = api_cache.get_version()
+        for callback in callbacks:
+            callback()
+        assert api_cache.get_version() != version
+        response = uclient.get(url)
+
+        assert response.json()["title"] == "New title"
+        assert api_cache.get_stats() == {"hits": 0, "misses": 2}
+
+    def test_invalidated_on_delete(self, uclient, django_capture_on_commit_callbacks):
+        """
+        Deleting a page invalidates the cache
+        """
+        page = self.create_content_page()
+        related = self.create_content_page(slug="related")
+        PageBuilder.link_related(page, [related])
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+
+        assert uclient.get(url).json()["related_pages"] == [
+            {"slug": "related", "title": "Page"}
+        ]
+        with django_capture_on_commit_callbacks(execute=True):
+            ContentPage.objects.get(id=related.id).delete()
+
+        assert uclient.get(url).json()["related_pages"] == []
+
+    def test_invalidated_on_template_publish(
+        self, uclient, django_capture_on_commit_callbacks
+    ):
+        """
+        Publishing a WhatsApp template invalidates the pages that use it
+        """
+        template = WhatsAppTemplate.objects.create(
+            slug="template",
+            message="Old message",
+            category="UTILITY",
+            locale=Locale.objects.first(),
+            submission_name="template",
+        )
+        page = self.create_content_page(blocks=[WATpl("Template", template=template)])
+        url = f"/api/v2/pages/{page.id}/?whatsapp=true"
+
+        uclient.get(url)
+        template.message = "New message"
+        with django_capture_on_commit_callbacks(execute=True):
+            template.save_revision().publish()
+        response = uclient.get(url)
+
+        assert response.json()["body"]["text"]["value"]["message"] == "New message"
+
+    def test_disabled(self, uclient, settings):
+        """
+        Setting the timeout to 0 disables the cache
+        """
+        settings.API_CACHE_TIMEOUT = 0
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+
+        uclient.get(url)
+        uclient.get(url)
+
+        assert api_cache.get_stats() == {"hits": 0, "misses": 0}
+
+    def test_stats_command(self, uclient):
+        """
+        The management command shows the counts, and can reset them
+        """
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+        uclient.get(url)
+        uclient.get(url)
+        out = StringIO()
+
+        call_command("api_cache_stats", "--reset", stdout=out)
+
+        assert "Hits: 1, misses: 1, hit rate: 50.0%" in out.getvalue()
+        assert api_cache.get_stats() == {"hits": 0, "misses": 0}
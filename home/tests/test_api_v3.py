@@ -1,16 +1,27 @@
 import json
+from io import StringIO
 from pathlib import Path
 from typing import Any
 
 import pytest
 from django.core.files.base import File  # type: ignore
 from django.core.files.images import ImageFile  # type: ignore
+from django.core.management import call_command
+from django.db import connection  # type: ignore
+from django.test.utils import CaptureQueriesContext  # type: ignore
 from wagtail.documents.models import Document  # type: ignore
 from wagtail.images.models import Image  # type: ignore
 from wagtail.models import Locale
 from wagtailmedia.models import Media  # type: ignore
 
-from home.models import HomePage, WhatsAppTemplate
+from home.models import (
+    Assessment,
+    ContentPage,
+    ContentPageDraft,
+    HomePage,
+    PageView,
+    WhatsAppTemplate,
+)
 
 from .page_builder import (
     FormBtn,
@@ -608,6 +619,31 @@ class TestContentPageAPIV3:
         # exclude home pages and index pages
         assert content["count"] == 5
 
+    def test_search(self, uclient):
+        """
+        If a search query is provided, only pages that match it are returned
+        """
+        self.create_content_page(title="Health Info")
+        self.create_content_page(title="Self Help")
+        self.create_content_page(title="Self Help SMS", body_type="sms")
+
+        response = uclient.get("/api/v3/pages/?search=help")
+        content = json.loads(response.content)
+        assert sorted(page["title"] for page in content["results"]) == [
+            "Self Help",
+            "Self Help SMS",
+        ]
+
+        response = uclient.get("/api/v3/pages/?search=help&channel=sms")
+        content = json.loads(response.content)
+        assert [page["title"] for page in content["results"]] == [
+            "Self Help SMS for sms"
+        ]
+
+        response = uclient.get("/api/v3/pages/?search=help&locale=pt")
+        content = json.loads(response.content)
+        assert content["count"] == 0
+
     def test_whatsapp_draft(self, uclient):
         """
         Unpublished whatsapp pages are returned if the return_drafts param is set.
@@ -642,7 +678,9 @@ class TestContentPageAPIV3:
         assert body == f"*Default {channel} Content 1* 🏥"
 
     @pytest.mark.parametrize("channel", ALL_CHANNELS)
-    def test_channel_disabled(self, uclient, channel):
+    def test_channel_disabled(
+        self, uclient, channel, django_capture_on_commit_callbacks
+    ):
         """
         It should not return the body if enable_<channel>=false
         """
@@ -652,7 +690,8 @@ class TestContentPageAPIV3:
         assert response.content != b""
 
         setattr(page, f"enable_{channel}", False)
-        page.save_revision().publish()
+        with django_capture_on_commit_callbacks(execute=True):
+            page.save_revision().publish()
 
         response = uclient.get(f"/api/v3/pages/{page.id}/?channel={channel}")
         content = response.json()
@@ -690,9 +729,82 @@ class TestContentPageAPIV3:
         page = self.create_content_page(page, title="Content Page 1")
         uclient.get("/api/v3/pages/")
 
-        with django_assert_num_queries(9):
+        # One of these is for the listing's ETag
+        with django_assert_num_queries(8):
             uclient.get("/api/v3/pages/")
 
+    def test_number_of_queries_is_fixed_for_references(self, uclient):
+        """
+        Pages, forms, tags and triggers referenced by the pages in a listing are
+        loaded in bulk, so the number of queries doesn't grow with the page count.
+        """
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        target_page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="target-page",
+            title="Target Page",
+            bodies=[WABody("Target Page", [WABlk("Target page content")])],
+        )
+        form = Assessment(title="Test Form", slug="test-form", locale=self.locale_en)
+        form.save()
+
+        def build_page(i):
+            page = PageBuilder.build_cp(
+                parent=main_menu,
+                slug=f"page-{i}",
+                title=f"Page {i}",
+                bodies=[
+                    WABody(
+                        f"Page {i}",
+                        [
+                            WABlk(
+                                f"Message {i}",
+                                buttons=[
+                                    PageBtn("Go to page", target_page),
+                                    FormBtn("Go to form", form),
+                                ],
+                                list_items=[PageListItem("Go to page", target_page)],
+                            )
+                        ],
+                    )
+                ],
+                tags=[f"tag-{i}"],
+                triggers=[f"trigger-{i}"],
+            )
+            return PageBuilder.link_related(page, [target_page])
+
+        def count_listing_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get("/api/v3/pages/?channel=whatsapp")
+            assert response.status_code == 200
+            return len(ctx.captured_queries), response.json()
+
+        build_page(1)
+        # Run this once without counting to get one-off queries out of the way
+        count_listing_queries()
+        num_queries, content = count_listing_queries()
+        assert content["count"] == 2
+
+        for i in range(2, 5):
+            build_page(i)
+        assert count_listing_queries()[0] == num_queries
+
+        results = count_listing_queries()[1]["results"]
+        [page] = [r for r in results if r["slug"] == "page-4"]
+        assert page["tags"] == ["tag-4"]
+        assert page["triggers"] == ["trigger-4"]
+        assert page["related_pages"] == [
+            {"slug": "target-page", "title": "Target Page"}
+        ]
+        assert page["messages"][0]["buttons"] == [
+            {"type": "go_to_page", "title": "Go to page", "slug": "target-page"},
+            {"type": "go_to_form", "title": "Go to form", "slug": "test-form"},
+        ]
+        assert page["messages"][0]["list_items"] == [
+            {"type": "go_to_page", "title": "Go to page", "slug": "target-page"},
+        ]
+
     @pytest.mark.parametrize("channel", ALL_CHANNELS)
     def test_detail_view_content(self, uclient, channel):
         """
@@ -980,6 +1092,81 @@ class TestContentPageAPIV3:
         content["results"][0]["messages"][0]["text"]
         assert content["count"] == 1
 
+    def test_page_list_match_draft_tags_and_triggers(self, uclient):
+        """
+        Tags and triggers that have only been added in a draft match if
+        return_drafts is set to true
+        """
+        page = self.create_content_page(title="Content Page 1", tags=["live-tag"])
+        page.tags.add("Draft-Tag")
+        page.triggers.add("Draft-Trigger")
+        page.save_revision()
+
+        content = uclient.get("/api/v3/pages/?tag=draft-tag").json()
+        assert content["count"] == 0
+        content = uclient.get("/api/v3/pages/?tag=draft-tag&return_drafts=true").json()
+        assert [p["slug"] for p in content["results"]] == [page.slug]
+        url = "/api/v3/pages/?trigger=draft-trigger&return_drafts=true"
+        content = uclient.get(url).json()
+        assert [p["slug"] for p in content["results"]] == [page.slug]
+        url = "/api/v3/pages/?tag=draft-tag&trigger=draft-tag&return_drafts=true"
+        content = uclient.get(url).json()
+        assert content["count"] == 0
+
+    def test_page_list_stale_drafts(self, uclient):
+        """
+        Drafts of revisions that were saved without updating the draft, e.g. before
+        drafts were saved, aren't updated by the API, but by the refresh_page_drafts
+        command
+        """
+        page = self.create_content_page(title="Content Page 1")
+        page.slug = "draft-slug"
+        page.save_revision()
+        ContentPageDraft.objects.all().delete()
+
+        url = "/api/v3/pages/?slug=draft-slug&return_drafts=true"
+        assert uclient.get(url).json()["count"] == 0
+        assert not ContentPageDraft.objects.exists()
+
+        out = StringIO()
+        call_command("refresh_page_drafts", stdout=out)
+        assert out.getvalue() == "Updated 1 page drafts\n"
+
+        content = uclient.get(url).json()
+        assert [p["slug"] for p in content["results"]] == [page.slug]
+        assert ContentPageDraft.objects.get().slug == "draft-slug"
+
+    def test_number_of_queries_for_drafts(self, uclient):
+        """
+        Filtering and looking up drafts doesn't take a query per draft
+        """
+
+        def count_queries(url):
+            uclient.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get(url)
+            assert response.status_code == 200
+            return len(ctx.captured_queries)
+
+        def add_drafts(count):
+            for _ in range(count):
+                page = self.create_content_page(
+                    title=f"Draft {ContentPage.objects.count()}"
+                )
+                page.title = f"Updated {page.title}"
+                page.save_revision()
+
+        add_drafts(2)
+        list_url = "/api/v3/pages/?title=updated&tag=missing&return_drafts=true"
+        detail_url = "/api/v3/pages/draft-1/?return_drafts=true"
+        list_queries = count_queries(list_url)
+        detail_queries = count_queries(detail_url)
+
+        add_drafts(5)
+
+        assert count_queries(list_url) == list_queries
+        assert count_queries(detail_url) == detail_queries
+
     def test_list_view_multiple_filters(self, uclient):
         """
         Querying the list view with a multiple filter parameters,
@@ -1670,3 +1857,123 @@ class TestContentPageAPIV3:
         # Should return only child with matching tag
         assert content["count"] == 1
         assert content["results"][0]["slug"] == child_1.slug
+
+
+@pytest.mark.django_db
+class TestContentPagesBatchAPIV3:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        self.main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+
+    def build_page(self, i, **kwargs):
+        return PageBuilder.build_cp(
+            parent=self.main_menu,
+            slug=f"page-{i}",
+            title=f"Page {i}",
+            bodies=[WABody(f"Page {i}", [WABlk(f"Message {i}")])],
+            **kwargs,
+        )
+
+    def test_login_required(self, client):
+        response = client.get("/api/v3/pages-batch/?ids=1")
+        assert response.status_code == 401
+
+    def test_ids_and_slugs(self, uclient):
+        """
+        Pages are returned once each, in the order they were asked for, and
+        anything that wasn't found is listed
+        """
+        pages = [self.build_page(i) for i in range(3)]
+        self.build_page(3, publish=False)
+
+        response = uclient.get(
+            "/api/v3/pages-batch/",
+            {
+                "ids": f"{pages[2].id},{pages[0].id},999",
+                "slugs": "page-1, PAGE-0,page-3,missing",
+                "channel": "whatsapp",
+            },
+        )
+
+        assert response.status_code == 200
+        content = response.json()
+        assert [page["slug"] for page in content["results"]] == [
+            "page-2",
+            "page-0",
+            "page-1",
+        ]
+        assert content["count"] == 3
+        assert content["missing"] == {"ids": [999], "slugs": ["page-3", "missing"]}
+        assert content["results"][0]["messages"][0]["text"] == "Message 2"
+        assert "/api/v3/pages/page-2/?" in content["results"][0]["detail_url"]
+
+    def test_drafts(self, uclient):
+        """
+        With return_drafts, slugs are matched against the latest draft
+        """
+        page = self.build_page(0)
+        page.slug = "new-slug"
+        page.save_revision()
+        self.build_page(1, publish=False)
+
+        response = uclient.get(
+            "/api/v3/pages-batch/?slugs=new-slug,page-0,page-1&return_drafts=true"
+        )
+
+        content = response.json()
+        assert [page["slug"] for page in content["results"]] == ["new-slug", "page-1"]
+        assert content["missing"] == {"ids": [], "slugs": ["page-0"]}
+
+    def test_number_of_queries_is_fixed(self, uclient):
+        """
+        The pages are fetched with one query and their references are resolved
+        together, so the number of queries doesn't grow with the batch size
+        """
+        pages = [self.build_page(i) for i in range(6)]
+
+        def count_queries(batch):
+            ids = ",".join(str(page.id) for page in batch)
+            with CaptureQueriesContext(connection) as ctx:
+                response = uclient.get(f"/api/v3/pages-batch/?ids={ids}")
+            assert response.json()["count"] == len(batch)
+            return len(ctx.captured_queries)
+
+        count_queries(pages[:1])
+        assert count_queries(pages[:2]) == count_queries(pages)
+
+    def test_record_page_views(self, uclient):
+        """
+        Page views are only recorded when asked for, with one insert for the batch
+        """
+        pages = [self.build_page(i) for i in range(3)]
+        ids = ",".join(str(page.id) for page in pages)
+
+        uclient.get(f"/api/v3/pages-batch/?ids={ids}")
+        assert PageView.objects.count() == 0
+
+        with CaptureQueriesContext(connection) as ctx:
+            uclient.get(
+                f"/api/v3/pages-batch/?ids={ids}&record_page_views=true"
+                "&channel=whatsapp&whatsapp=true&data__user=123"
+            )
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        assert len(inserts) == 1
+        views = PageView.objects.order_by("page_id")
+        assert [view.page_id for view in views] == [page.id for page in pages]
+        assert {(view.platform, view.data["user"]) for view in views} == {
+            ("whatsapp", "123")
+        }
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            "",
+            "ids=one",
+            "ids=1&channel=unknown",
+            "ids=" + ",".join(str(i) for i in range(101)),
+        ],
+    )
+    def test_invalid(self, uclient, params):
+        response = uclient.get(f"/api/v3/pages-batch/?{params}")
+        assert response.status_code == 400
@@ -197,7 +197,8 @@ class ImportExport:
         Export all assessments in the configured format.
         """
         url = f"/admin/snippets/home/assessment/?export={self.format}"
-        content = self.admin_client.get(url).content
+        response = self.admin_client.get(url)
+        content = b"".join(response.streaming_content)
         if self.format == "csv":
             print("-v-CONTENT-v-")
             print(content.decode())
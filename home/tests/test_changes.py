@@ -0,0 +1,249 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+from wagtail.models import Locale
+
+from home.models import (
+    Assessment,
+    ContentChange,
+    HomePage,
+    OrderedContentSet,
+    WhatsAppTemplate,
+)
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def uclient(client, django_user_model):
+    """
+    Access the user interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_user(**creds)
+    client.login(**creds)
+    return client
+
+
+@pytest.fixture()
+def on_commit(django_capture_on_commit_callbacks):
+    """
+    Changes are only recorded once they're committed
+    """
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+def build_page(parent, slug, publish=True):
+    return PageBuilder.build_cp(
+        parent=parent,
+        slug=slug,
+        title=slug.title(),
+        bodies=[WABody(slug.title(), [WABlk("Message")])],
+        publish=publish,
+    )
+
+
+def make_change(id, slug):
+    return ContentChange.objects.create(
+        id=id,
+        kind=ContentChange.Kind.CONTENT_PAGE,
+        object_id=id,
+        action=ContentChange.Action.PUBLISH,
+        slug=slug,
+        language_code="en",
+    )
+
+
+def age_changes(seconds):
+    ContentChange.objects.update(timestamp=F("timestamp") - timedelta(seconds=seconds))
+
+
+def changes():
+    return list(
+        ContentChange.objects.order_by("id").values_list("kind", "action", "slug")
+    )
+
+
+@pytest.mark.django_db
+class TestRecordChanges:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        self.home_page = HomePage.objects.first()
+        self.locale = Locale.objects.get(language_code="en")
+
+    def test_pages(self, on_commit):
+        with on_commit():
+            main_menu = PageBuilder.build_cpi(self.home_page, "main-menu", "Main Menu")
+            other_menu = PageBuilder.build_cpi(self.home_page, "other", "Other")
+            page = build_page(main_menu, "page")
+        revision_id = page.live_revision_id
+        with on_commit():
+            page.move(other_menu, pos="last-child")
+        with on_commit():
+            page.refresh_from_db()
+            page.unpublish()
+        with on_commit():
+            main_menu.delete()
+
+        assert changes() == [
+            ("contentpageindex", "publish", "main-menu"),
+            ("contentpageindex", "publish", "other"),
+            ("contentpage", "publish", "page"),
+            ("contentpage", "move", "page"),
+            ("contentpage", "unpublish", "page"),
+            # Wagtail unpublishes pages before deleting them
+            ("contentpageindex", "unpublish", "main-menu"),
+            ("contentpageindex", "delete", "main-menu"),
+        ]
+        published = ContentChange.objects.filter(object_id=page.id).first()
+        assert published.revision_id == revision_id
+        assert published.language_code == "en"
+
+    def test_snippets(self, on_commit):
+        template = WhatsAppTemplate.objects.create(
+            slug="template", message="Hello", category="UTILITY", locale=self.locale
+        )
+        form = Assessment.objects.create(
+            title="Form", slug="form", locale=self.locale, generic_error="Error"
+        )
+        ordered_set = OrderedContentSet.objects.create(
+            name="Set", slug="set", locale=self.locale
+        )
+        with on_commit():
+            for obj in [template, form, ordered_set]:
+                obj.save_revision().publish()
+            form.unpublish()
+            ordered_set.delete()
+
+        assert changes() == [
+            ("whatsapptemplate", "publish", "template"),
+            ("assessment", "publish", "form"),
+            ("orderedcontentset", "publish", "set"),
+            ("assessment", "unpublish", "form"),
+            ("orderedcontentset", "delete", "set"),
+        ]
+
+    def test_drafts_and_rollbacks(self, on_commit, django_capture_on_commit_callbacks):
+        """
+        Saving drafts isn't a change, and changes that aren't committed aren't
+        recorded
+        """
+        with on_commit():
+            page = build_page(self.home_page, "page")
+        with on_commit():
+            page.title = "Draft"
+            page.save_revision()
+        with django_capture_on_commit_callbacks(execute=False):
+            build_page(self.home_page, "rolled-back")
+
+        assert changes() == [("contentpage", "publish", "page")]
+
+
+@pytest.mark.django_db
+class TestChangesAPI:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self, settings):
+        self.home_page = HomePage.objects.first()
+        # List changes as soon as they're committed
+        settings.CHANGES_DELAY = 0
+
+    def test_login_required(self, client):
+        response = client.get("/api/v3/changes/")
+        assert response.status_code == 401
+
+    def test_sync(self, uclient, on_commit):
+        """
+        Clients get the changes after their cursor, oldest first, a page at a time,
+        and the cursor to fetch the next changes from
+        """
+        with on_commit():
+            pages = [build_page(self.home_page, f"page-{i}") for i in range(3)]
+
+        content = uclient.get("/api/v3/changes/?limit=2").json()
+        assert [c["object_id"] for c in content["changes"]] == [
+            pages[0].id,
+            pages[1].id,
+        ]
+        assert content["has_more"] is True
+        assert content["changes"][0] == {
+            "id": content["changes"][0]["id"],
+            "kind": "contentpage",
+            "object_id": pages[0].id,
+            "action": "publish",
+            "slug": "page-0",
+            "locale": "en",
+            "revision_id": pages[0].live_revision_id,
+            "timestamp": content["changes"][0]["timestamp"],
+        }
+
+        cursor = content["cursor"]
+        content = uclient.get(f"/api/v3/changes/?since={cursor}&limit=2").json()
+        assert [c["object_id"] for c in content["changes"]] == [pages[2].id]
+        assert content["has_more"] is False
+
+        # Clients that are up to date keep their cursor
+        cursor = content["cursor"]
+        content = uclient.get(f"/api/v3/changes/?since={cursor}").json()
+        assert content == {"changes": [], "cursor": cursor, "has_more": False}
+
+    def test_latest(self, uclient, on_commit):
+        """
+        Clients that have just synced everything can start from the latest change
+        """
+        with on_commit():
+            build_page(self.home_page, "old")
+        content = uclient.get("/api/v3/changes/?since=latest").json()
+        assert content["changes"] == []
+
+        with on_commit():
+            page = build_page(self.home_page, "new")
+        content = uclient.get(f"/api/v3/changes/?since={content['cursor']}").json()
+        assert [c["object_id"] for c in content["changes"]] == [page.id]
+
+    def test_out_of_order_commits(self, uclient, settings):
+        """
+        A change that's committed after a change with a higher id isn't skipped,
+        because changes aren't listed until they're CHANGES_DELAY seconds old
+        """
+        settings.CHANGES_DELAY = 5
+        make_change(1, "old")
+        age_changes(10)
+        # 3 is committed before 2
+        make_change(3, "early")
+
+        content = uclient.get("/api/v3/changes/").json()
+        assert [c["slug"] for c in content["changes"]] == ["old"]
+        assert content["cursor"] == 1
+        assert content["has_more"] is False
+        content = uclient.get("/api/v3/changes/?since=latest").json()
+        assert content["cursor"] == 1
+
+        make_change(2, "late")
+        content = uclient.get("/api/v3/changes/?since=1").json()
+        assert content["changes"] == []
+
+        age_changes(10)
+        content = uclient.get("/api/v3/changes/?since=1").json()
+        assert [c["slug"] for c in content["changes"]] == ["late", "early"]
+        assert content["cursor"] == 3
+
+    def test_filters(self, uclient, on_commit):
+        pt, _ = Locale.objects.get_or_create(language_code="pt")
+        pt_home = HomePage.add_root(locale=pt, title="Home (pt)", slug="home-pt")
+        with on_commit():
+            build_page(self.home_page, "en-page")
+            pt_page = build_page(pt_home, "pt-page")
+            WhatsAppTemplate.objects.create(
+                slug="template", message="Hello", category="UTILITY", locale=pt
+            ).save_revision().publish()
+
+        content = uclient.get("/api/v3/changes/?kind=contentpage&locale=pt").json()
+        assert [c["object_id"] for c in content["changes"]] == [pt_page.id]
+
+    @pytest.mark.parametrize(
+        "query", ["since=abc", "limit=0", "limit=1001", "kind=page", "bogus=1"]
+    )
+    def test_invalid_parameters(self, uclient, query):
+        response = uclient.get(f"/api/v3/changes/?{query}")
+        assert response.status_code == 400
@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+import pytest
+from django.utils.http import http_date
+from wagtail.models import Locale
+
+from home.models import (
+    Assessment,
+    HomePage,
+    OrderedContentSet,
+    PageView,
+    WhatsAppTemplate,
+)
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def uclient(client, django_user_model):
+    """
+    Access the user interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_user(**creds)
+    client.login(**creds)
+    return client
+
+
+def fail_to_serialize(*args, **kwargs):
+    raise AssertionError("Not modified responses shouldn't be serialized")
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        self.main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+
+    def create_content_page(self, slug="page", publish=True):
+        return PageBuilder.build_cp(
+            parent=self.main_menu,
+            slug=slug,
+            title="Page",
+            bodies=[WABody("Page", [WABlk("Message")])],
+            publish=publish,
+        )
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "/api/v3/pages/{id}/?channel=whatsapp",
+            "/api/v3/pages/page/?channel=whatsapp",
+            "/api/v2/pages/{id}/?whatsapp=true",
+        ],
+    )
+    def test_page_detail(self, uclient, url, monkeypatch):
+        """
+        Page responses have an ETag and Last-Modified, and requests with a matching
+        If-None-Match get a 304 without the page being serialized, but the page view
+        is still recorded
+        """
+        page = self.create_content_page()
+        url = url.format(id=page.id)
+
+        response = uclient.get(url)
+        etag = response["ETag"]
+        assert response.status_code == 200
+        assert etag.startswith('"')
+        assert response["Last-Modified"] == http_date(
+            int(page.last_published_at.timestamp())
+        )
+
+        monkeypatch.setattr(
+            "home.serializers_v3.ContentPageSerializerV3.to_representation",
+            fail_to_serialize,
+        )
+        monkeypatch.setattr(
+            "home.serializers.ContentPageSerializer.to_representation",
+            fail_to_serialize,
+        )
+        response = uclient.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert PageView.objects.filter(page=page).count() == 2
+
+    def test_if_modified_since(self, uclient):
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/"
+        published = page.last_published_at
+
+        response = uclient.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(published.timestamp() + 1)
+        )
+        assert response.status_code == 304
+
+        response = uclient.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=http_date(
+                (published - timedelta(seconds=2)).timestamp()
+            ),
+        )
+        assert response.status_code == 200
+
+    def test_etag_changes(self, uclient, django_capture_on_commit_callbacks):
+        """
+        The ETag depends on the query parameters, and changes when anything is
+        published, because responses include the titles of related pages
+        """
+        page = self.create_content_page()
+        url = f"/api/v3/pages/{page.id}/?channel=whatsapp"
+        etag = uclient.get(url)["ETag"]
+
+        assert uclient.get(url + "&message=1")["ETag"] != etag
+        assert uclient.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self.create_content_page(slug="other")
+        response = uclient.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+    def test_drafts(self, uclient):
+        """
+        Drafts can change without anything being published, so they don't get
+        validators
+        """
+        page = self.create_content_page()
+
+        for url in [
+            f"/api/v3/pages/{page.id}/?return_drafts=true",
+            f"/api/v2/pages/{page.id}/?qa=true",
+            "/api/v3/pages/?return_drafts=true",
+            "/api/v2/orderedcontent/?qa=true",
+        ]:
+            response = uclient.get(url)
+            assert response.status_code == 200
+            assert "ETag" not in response
+
+    @pytest.mark.parametrize(
+        "url", ["/api/v3/pages/", "/api/v2/pages/", "/api/v3/whatsapptemplates/"]
+    )
+    def test_listing(self, uclient, url, django_capture_on_commit_callbacks):
+        """
+        Listings have an ETag from the revisions and number of the objects in them,
+        and the latest Last-Modified
+        """
+        self.create_content_page()
+        template = WhatsAppTemplate.objects.create(
+            slug="template",
+            message="Hello",
+            category="UTILITY",
+            locale=Locale.objects.get(language_code="en"),
+        )
+        template.save_revision().publish()
+
+        response = uclient.get(url)
+        etag = response["ETag"]
+        assert "Last-Modified" in response
+        assert uclient.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+        with django_capture_on_commit_callbacks(execute=True):
+            page = self.create_content_page(slug="page-2")
+            page.unpublish()
+        response = uclient.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+
+    @pytest.mark.parametrize("endpoint", ["orderedcontent", "assessment"])
+    def test_forms_and_ordered_sets(self, uclient, endpoint):
+        locale = Locale.objects.get(language_code="en")
+        if endpoint == "orderedcontent":
+            obj = OrderedContentSet(name="Set", slug="set", locale=locale)
+        else:
+            obj = Assessment(
+                title="Form", slug="form", locale=locale, generic_error="Error"
+            )
+        obj.save()
+        obj.save_revision().publish()
+
+        for url in [f"/api/v2/{endpoint}/", f"/api/v2/{endpoint}/{obj.id}/"]:
+            response = uclient.get(url)
+            assert response.status_code == 200
+            etag = response["ETag"]
+            assert uclient.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
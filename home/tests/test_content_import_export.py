@@ -14,6 +14,9 @@ import pytest
 from django.core import serializers  # type: ignore
 from django.core.files.base import File  # type: ignore
 from django.core.files.images import ImageFile  # type: ignore
+from django.core.management import call_command  # type: ignore
+from django.db import connection  # type: ignore
+from django.test.utils import CaptureQueriesContext  # type: ignore
 from openpyxl import load_workbook
 from pytest_django.fixtures import SettingsWrapper
 from wagtail.documents.models import Document  # type: ignore
@@ -21,6 +24,7 @@ from wagtail.images.models import Image  # type: ignore
 from wagtail.models import Locale, Page  # type: ignore
 from wagtailmedia.models import Media  # type: ignore
 
+from home import import_content_pages
 from home.content_import_export import import_content
 from home.import_helpers import ImportException
 from home.models import (
@@ -257,11 +261,18 @@ def _update_field(
 def normalise_revisions(pages: DbDicts) -> DbDicts:
     if "latest_revision" not in list(pages)[0]["fields"]:
         return pages
-    min_latest = min(p["fields"]["latest_revision"] for p in pages)
-    min_live = min(p["fields"]["live_revision"] for p in pages)
-    pages = _update_field(pages, "latest_revision", lambda v: v - min_latest)
-    pages = _update_field(pages, "live_revision", lambda v: v - min_live)
-    return pages
+    # Imports save one revision per page, in file order, while building pages in
+    # tests can save more, in any order, so we only check that the latest revision
+    # is the live one.
+    return [_normalise_revisions(p) for p in pages]
+
+
+def _normalise_revisions(page: DbDict) -> DbDict:
+    fields = page["fields"]
+    is_live = fields["latest_revision"] == fields["live_revision"]
+    return page | {
+        "fields": fields | {"latest_revision": is_live, "live_revision": is_live}
+    }
 
 
 def _remove_fields(pages: DbDicts, field_names: set[str]) -> DbDicts:
@@ -464,7 +475,8 @@ class ImportExport:
             loc = Locale.objects.get(language_code=locale)
             locale = str(loc)
             url = f"{url}&locale__id__exact={loc.id}"
-        content = self.admin_client.get(url).content
+        response = self.admin_client.get(url)
+        content = b"".join(response.streaming_content)
         # Hopefully we can get rid of this at some point.
         if locale:
             content = self._filter_export(content, locale=locale)
@@ -482,7 +494,7 @@ class ImportExport:
         url = f"/admin/snippets/home/orderedcontentset/?export={self.format}"
 
         response = self.admin_client.get(url)
-        return response.content
+        return b"".join(response.streaming_content)
 
     def import_content(self, content_bytes: bytes, **kw: Any) -> Any:
         """
@@ -623,6 +635,24 @@ class TestImportExportRoundtrip:
         src, dst = csv_impexp.csvs2dicts(csv_bytes, content)
         assert dst == src
 
+    def test_less_simple_in_batches(
+        self, csv_impexp: ImportExport, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        Pages are saved and published in batches, and links between pages in
+        different batches are kept.
+
+        (This uses exported_content_20230911-variations-linked-page.csv.)
+        """
+        monkeypatch.setattr(import_content_pages, "PAGE_BATCH_SIZE", 1)
+        set_profile_field_options()
+        csv_bytes = csv_impexp.import_file(
+            "exported_content_20230911-variations-linked-page.csv"
+        )
+        content = csv_impexp.export_content()
+        src, dst = csv_impexp.csvs2dicts(csv_bytes, content)
+        assert dst == src
+
     def test_multiple_messages(self, csv_impexp: ImportExport) -> None:
         """
         Importing a CSV file containing multiple messages of each type for a
@@ -1012,9 +1042,7 @@ class TestImportExport:
         an error message should get sent back to the user.
 
         FIXME:
-         * We currently assume that messages belong to the content page immediately
-           above them, but we don't check or enforce this.
-         * We also get the locale from the content page immediately above the message.
+         * We get the locale from the content page immediately above the message.
         """
         with pytest.raises(ImportException) as e:
             csv_impexp.import_file("message-row-missing-page.csv")
@@ -1025,15 +1053,27 @@ class TestImportExport:
             "'English', but no such page exists"
         ]
 
+    def test_message_not_after_page(self, csv_impexp: ImportExport) -> None:
+        """
+        Messages belong to the content page above them, so a message for a page
+        that's earlier in the import is an error.
+        """
+        with pytest.raises(ImportException) as e:
+            csv_impexp.import_file("message-row-not-after-page.csv")
+
+        assert e.value.row_num == 5
+        assert e.value.message == [
+            "This is a message for page with slug 'cp-import-export' and locale "
+            "'English', but it isn't in the rows that follow that page"
+        ]
+
     def test_variation_for_missing_page(self, csv_impexp: ImportExport) -> None:
         """
         If we try to import a variation message for a page that isn't in the
         same import, an error message should get sent back to the user.
 
         FIXME:
-         * We currently assume that messages belong to the content page immediately
-           above them, but we don't check or enforce this.
-         * We also get the locale from the content page immediately above the message.
+         * We get the locale from the content page immediately above the message.
         """
         with pytest.raises(ImportException) as e:
             csv_impexp.import_file("variation-row-missing-page.csv")
@@ -1974,6 +2014,131 @@ class TestImportExport:
         )
         assert importer.import_warnings[0].row_num == 3
 
+    def test_lookups(self, csv_impexp: ImportExport) -> None:
+        """
+        Parents and templates are looked up once for the whole import, instead of
+        for each row
+        """
+        WhatsAppTemplate.objects.create(
+            category="UTILITY",
+            slug="template",
+            message="Template message",
+            locale=Locale.objects.get(),
+        )
+        rows = ["message,slug,parent,web_title,whatsapp_template_slug,language_code"]
+        rows.append("0,main_menu,,Main Menu,,en")
+        for i in range(5):
+            rows.append(f"1,page_{i},Main Menu,Page {i},template,en")
+
+        with CaptureQueriesContext(connection) as ctx:
+            importer = csv_impexp.import_content("\n".join(rows).encode())
+
+        assert importer.summary() == "6 pages created, 0 updated, 0 unchanged"
+        page_0 = ContentPage.objects.get(slug="page_0")
+        assert page_0.get_parent().title == "Main Menu"
+        assert page_0.whatsapp_body[0].block_type == "Whatsapp_Template"
+        queries = [q["sql"] for q in ctx.captured_queries]
+        assert not [q for q in queries if '"wagtailcore_page"."title" =' in q]
+        assert not [q for q in queries if '"home_whatsapptemplate"."slug" =' in q]
+
+
+@pytest.mark.django_db
+class TestDeltaImport:
+    """
+    Pages that haven't changed since they were last imported are skipped.
+    """
+
+    def test_reimport_unchanged(self, csv_impexp: ImportExport) -> None:
+        """
+        Importing the same file again doesn't save any new revisions
+        """
+        importer = csv_impexp.import_content(
+            csv_impexp.read_bytes("contentpage_required_fields.csv")
+        )
+        assert importer.summary() == "3 pages created, 0 updated, 0 unchanged"
+        revisions = list(Page.objects.values_list("pk", "latest_revision_id"))
+
+        importer = csv_impexp.import_content(
+            csv_impexp.read_bytes("contentpage_required_fields.csv"), purge=False
+        )
+
+        assert importer.summary() == "0 pages created, 0 updated, 3 unchanged"
+        assert list(Page.objects.values_list("pk", "latest_revision_id")) == revisions
+
+    def test_reimport_changed(self, csv_impexp: ImportExport) -> None:
+        """
+        Only the pages that have changed in the file are saved
+        """
+        content = csv_impexp.import_file("contentpage_required_fields.csv")
+        health_info = ContentPage.objects.get(slug="health_info")
+        first_time_user = ContentPage.objects.get(slug="first_time_user")
+
+        content = content.replace(b",health info,", b",health information,")
+        importer = csv_impexp.import_content(content, purge=False)
+
+        assert importer.summary() == "0 pages created, 1 updated, 2 unchanged"
+        assert importer.updated_pages == [("health_info", health_info.locale)]
+        health_info.refresh_from_db()
+        assert health_info.title == "health information"
+        assert health_info.live_revision_id == health_info.latest_revision_id
+        assert (
+            ContentPage.objects.get(pk=first_time_user.pk).latest_revision_id
+            == first_time_user.latest_revision_id
+        )
+
+    def test_reimport_edited(self, csv_impexp: ImportExport) -> None:
+        """
+        Pages that were changed after they were imported are imported again, even
+        if the file hasn't changed
+        """
+        content = csv_impexp.import_file("contentpage_required_fields.csv")
+        page = ContentPage.objects.get(slug="health_info")
+        page.title = "edited"
+        page.save_revision()
+
+        importer = csv_impexp.import_content(content, purge=False)
+
+        assert importer.summary() == "0 pages created, 1 updated, 2 unchanged"
+        page.refresh_from_db()
+        assert page.title == "health info"
+        assert page.live_revision_id == page.latest_revision_id
+
+    def test_dry_run(self, csv_impexp: ImportExport) -> None:
+        """
+        A dry run reports what would change, without saving anything
+        """
+        content = csv_impexp.import_file("contentpage_required_fields.csv")
+        content = content.replace(b",health info,", b",health information,")
+        revisions = list(Page.objects.values_list("pk", "latest_revision_id"))
+
+        importer = csv_impexp.import_content(content, purge=False, dry_run=True)
+
+        assert importer.summary() == "0 pages created, 1 updated, 2 unchanged"
+        assert list(Page.objects.values_list("pk", "latest_revision_id")) == revisions
+        assert ContentPage.objects.get(slug="health_info").title == "health info"
+
+    def test_command(self) -> None:
+        """
+        The import_content command imports the file, and lists the pages it saved
+        """
+        path = IMP_EXP_DATA_BASE / "contentpage_required_fields.csv"
+        out = StringIO()
+        call_command("import_content", str(path), "--dry-run", stdout=out)
+        assert not ContentPage.objects.exists()
+        assert out.getvalue().splitlines() == [
+            "Created main_menu (en)",
+            "Created first_time_user (en)",
+            "Created health_info (en)",
+            "Dry run, nothing was saved: 3 pages created, 0 updated, 0 unchanged",
+        ]
+
+        call_command("import_content", str(path), stdout=StringIO())
+        out = StringIO()
+        call_command("import_content", str(path), stdout=out)
+        assert out.getvalue().splitlines() == [
+            "0 pages created, 0 updated, 3 unchanged"
+        ]
+
 
 @pytest.mark.django_db
 class TestExport:
@@ -2016,6 +2181,79 @@ class TestExport:
         src, dst = csv_impexp.xlsxs2dicts(imported_content, exported_content)
         assert src == dst
 
+    def test_export_streamed(self, admin_client: Any) -> None:
+        """
+        Exports are streamed, and XLSX exports keep their layout and styles
+        """
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        PageBuilder.build_cp(
+            parent=main_menu,
+            slug="ha-menu",
+            title="HealthAlert menu",
+            bodies=[WABody("HA menu", [WABlk("Welcome WA")])],
+        )
+
+        response = admin_client.get("/admin/home/contentpage/?export=csv")
+        assert response.streaming
+        assert response["Content-Type"] == "application/CSV"
+        [header, *_] = b"".join(response.streaming_content).decode().splitlines()
+        assert header.startswith("structure,message,page_id,slug,")
+
+        response = admin_client.get("/admin/home/contentpage/?export=xlsx")
+        assert response.streaming
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        worksheet = get_active_sheet(workbook)
+        assert worksheet.freeze_panes == "E2"
+        assert worksheet["A1"].value is None
+        assert worksheet["B1"].value == "structure"
+        assert worksheet.column_dimensions["B"].width == 16
+        assert worksheet["B1"].style == "header_style"
+        assert worksheet["E3"].border.left.style == "thin"
+        [row] = [r for r in worksheet.iter_rows(min_row=3) if r[1].value == "Sub 1.1"]
+        assert row[1].style == "Normal"
+        assert row[1].alignment.wrap_text
+        assert worksheet.row_dimensions[3].height == 60
+
+    def test_export_number_of_queries(self, csv_impexp: ImportExport) -> None:
+        """
+        The number of queries doesn't depend on the number of pages
+        """
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        target_page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="target",
+            title="Target",
+            bodies=[WABody("Target", [WABlk("Target")])],
+        )
+
+        def build_page(i: int) -> None:
+            page = PageBuilder.build_cp(
+                parent=target_page,
+                slug=f"page-{i}",
+                title=f"Page {i}",
+                bodies=[WABody(f"Page {i}", [WABlk(f"Message {i}")])],
+                tags=[f"tag-{i}"],
+                triggers=[f"trigger-{i}"],
+                quick_replies=[f"reply-{i}"],
+            )
+            PageBuilder.link_related(page, [target_page])
+
+        def count_export_queries() -> int:
+            with CaptureQueriesContext(connection) as ctx:
+                csv_impexp.export_content()
+            return len(ctx.captured_queries)
+
+        build_page(1)
+        # Run this once without counting to get one-off queries out of the way
+        count_export_queries()
+        num_queries = count_export_queries()
+
+        for i in range(2, 5):
+            build_page(i)
+        assert count_export_queries() == num_queries
+
     def test_export_wa_with_image(self, impexp: ImportExport) -> None:
         img_path = Path("home/tests/test_static") / "test.jpeg"
         img_wa = mk_img(img_path, "wa_image")
@@ -2122,6 +2360,27 @@ class TestExport:
         assert content is not None
 
 
+# The export threads have their own database connections, so they can only see
+# committed data
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_export_locales_in_threads(
+    csv_impexp: ImportExport, settings: SettingsWrapper
+) -> None:
+    """
+    Exporting locales at the same time produces the same export, in the same order
+    """
+    pt, _created = Locale.objects.get_or_create(language_code="pt")
+    HomePage.add_root(locale=pt, title="Home (pt)", slug="home-pt")
+    set_profile_field_options()
+    csv_bytes = csv_impexp.import_file("translations.csv")
+
+    content = csv_impexp.export_content()
+    settings.EXPORT_LOCALE_WORKERS = 2
+    assert csv_impexp.export_content() == content
+    src, dst = csv_impexp.csvs2dicts(csv_bytes, content)
+    assert dst == src
+
+
 @pytest.fixture(params=["csv", "xlsx"])
 def impexp(request: Any, admin_client: Any) -> ImportExport:
     return ImportExport(admin_client, request.param)
@@ -0,0 +1,210 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from home.models import ContentPageRating, HomePage, PageView
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def token_client(django_user_model):
+    creds = {"username": "test", "password": "test"}
+    user = django_user_model.objects.create_user(**creds)
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def read_ndjson(response):
+    content = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def read_csv(response):
+    content = b"".join(response.streaming_content).decode()
+    return list(csv.reader(StringIO(content)))
+
+
+@pytest.mark.django_db
+class TestDataExport:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self, settings):
+        # Export rows as soon as they're saved
+        settings.DATA_EXPORT_DELAY = 0
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        self.page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="page",
+            title="Page",
+            bodies=[WABody("Page", [WABlk("Message")])],
+        )
+        self.revision = self.page.get_latest_revision()
+
+    def create_views(self, count, **kwargs):
+        return [
+            self.page.views.create(revision=self.revision, **kwargs)
+            for _ in range(count)
+        ]
+
+    def test_requires_token(self, client):
+        """
+        The export needs the same token authentication as the list
+        """
+        response = client.get("/api/v2/custom/pageviews/export/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_ndjson(self, token_client):
+        """
+        Every page view is exported as a line of JSON, oldest first, followed by a
+        resume token
+        """
+        views = self.create_views(3, data={"user": "1"}, platform="whatsapp")
+
+        response = token_client.get("/api/v2/custom/pageviews/export/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        *rows, end = read_ndjson(response)
+        assert [row["id"] for row in rows] == [pv.id for pv in views]
+        assert rows[0] == {
+            "id": views[0].id,
+            "timestamp": views[0].timestamp.isoformat(),
+            "page": self.page.id,
+            "revision": self.revision.id,
+            "data": {"user": "1"},
+            "platform": "whatsapp",
+            "message": None,
+        }
+        assert list(end.keys()) == ["resume_token"]
+
+    def test_csv(self, token_client):
+        """
+        Page views can be exported as CSV, with the resume token in the last row
+        """
+        [view] = self.create_views(1, data={"user": "1"})
+
+        response = token_client.get("/api/v2/custom/pageviews/export/?format=csv")
+
+        assert response["Content-Type"] == "text/csv"
+        header, row, end = read_csv(response)
+        assert dict(zip(header, row, strict=True)) == {
+            "id": str(view.id),
+            "timestamp": view.timestamp.isoformat(),
+            "page": str(self.page.id),
+            "revision": str(self.revision.id),
+            "data": '{"user": "1"}',
+            "platform": "web",
+            "message": "",
+        }
+        assert end[0] == "#resume_token"
+
+    def test_resume(self, token_client, settings):
+        """
+        Passing back the resume token exports only the rows after the previous
+        export, even if they share a timestamp
+        """
+        settings.DATA_EXPORT_CHUNK_SIZE = 2
+        first = self.create_views(3)
+        *_, end = read_ndjson(token_client.get("/api/v2/custom/pageviews/export/"))
+        second = self.create_views(2)
+        PageView.objects.update(timestamp=first[-1].timestamp)
+
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/", {"resume_token": end["resume_token"]}
+        )
+
+        *rows, new_end = read_ndjson(response)
+        assert [row["id"] for row in rows] == [pv.id for pv in second]
+
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/",
+            {"resume_token": new_end["resume_token"]},
+        )
+        assert read_ndjson(response) == [new_end]
+
+    def test_rows_saved_late(self, token_client, settings):
+        """
+        Rows are only exported once they're DATA_EXPORT_DELAY old, so that a row
+        that's saved after a newer row, e.g. a buffered page view, isn't skipped
+        """
+        settings.DATA_EXPORT_DELAY = 60
+        now = timezone.now()
+        [old] = self.create_views(1, timestamp=now - timedelta(minutes=10))
+        *rows, end = read_ndjson(token_client.get("/api/v2/custom/pageviews/export/"))
+        assert [row["id"] for row in rows] == [old.id]
+
+        [newer] = self.create_views(1, timestamp=now - timedelta(seconds=20))
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/", {"resume_token": end["resume_token"]}
+        )
+        assert read_ndjson(response) == [end]
+        # Saved after the export that didn't include the newer row
+        [late] = self.create_views(1, timestamp=now - timedelta(seconds=30))
+        PageView.objects.update(timestamp=F("timestamp") - timedelta(minutes=1))
+
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/", {"resume_token": end["resume_token"]}
+        )
+        *rows, end = read_ndjson(response)
+        assert [row["id"] for row in rows] == [late.id, newer.id]
+
+    def test_invalid_resume_token(self, token_client):
+        """
+        An invalid resume token is an error, rather than exporting everything
+        """
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/?format=csv&resume_token=invalid"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not response.streaming
+
+    def test_filters(self, token_client, settings):
+        """
+        The export takes the same filters as the list
+        """
+        [old] = self.create_views(1, data={"user": "1"})
+        [new] = self.create_views(1, data={"user": "1"})
+        self.create_views(1, data={"user": "2"})
+
+        response = token_client.get(
+            "/api/v2/custom/pageviews/export/",
+            {"data__user": "1", "timestamp_gt": old.timestamp.isoformat()},
+        )
+        *rows, _ = read_ndjson(response)
+        assert [row["id"] for row in rows] == [new.id]
+
+        settings.PAGE_VIEW_INDEXED_DATA_KEYS = ["user"]
+        response = token_client.get("/api/v2/custom/pageviews/export/?data__tag=a")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_ratings(self, token_client):
+        """
+        Ratings can be exported too
+        """
+        rating = ContentPageRating.objects.create(
+            page=self.page, revision=self.revision, helpful=True, data={"user": "1"}
+        )
+        ContentPageRating.objects.create(
+            page=self.page, revision=self.revision, helpful=False, data={"user": "2"}
+        )
+
+        response = token_client.get(
+            "/api/v2/custom/ratings/export/?format=csv&data__user=1"
+        )
+
+        header, row, _ = read_csv(response)
+        assert dict(zip(header, row, strict=True))["id"] == str(rating.id)
+        assert dict(zip(header, row, strict=True))["helpful"] == "True"
@@ -0,0 +1,174 @@
+"""
+Import timings and peak memory use for large files. These are slow, so they only
+run when RUN_IMPORT_BENCHMARKS is set. The measurements are recorded as properties
+of each test in the JUnit XML report, e.g.
+
+    RUN_IMPORT_BENCHMARKS=1 pytest home/tests/test_import_benchmarks.py -k 1000 \
+        --junitxml=import-benchmarks.xml
+
+Postgres timings are more realistic than the default in-memory sqlite, see
+CONTENTREPO_DATABASE.
+"""
+
+import csv
+import os
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+from queue import Queue
+
+import pytest
+from wagtail.models import Revision
+from wagtail.rich_text import RichText  # type: ignore
+
+from home.content_import_export import import_content
+from home.import_helpers import validate_fields, validate_using_form
+from home.models import ContentPage, HomePage, WhatsappBlock
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        not os.environ.get("RUN_IMPORT_BENCHMARKS"),
+        reason="RUN_IMPORT_BENCHMARKS isn't set",
+    ),
+]
+
+HEADERS = [
+    "structure",
+    "message",
+    "slug",
+    "parent",
+    "web_title",
+    "whatsapp_title",
+    "whatsapp_body",
+    "translation_tag",
+    "tags",
+    "quick_replies",
+    "triggers",
+    "buttons",
+    "related_pages",
+    "language_code",
+]
+
+
+def content_csv(pages: int) -> bytes:
+    """
+    An index page with `pages` content pages, each with a message that has a
+    go_to_page button and a related page pointing at the previous page
+    """
+    out = StringIO()
+    writer = csv.DictWriter(out, HEADERS)
+    writer.writeheader()
+    writer.writerow(
+        {
+            "structure": "Menu 1",
+            "message": "0",
+            "slug": "bench-index",
+            "web_title": "Bench index",
+            "language_code": "en",
+        }
+    )
+    for i in range(pages):
+        previous = f"bench-page-{max(i - 1, 0)}"
+        writer.writerow(
+            {
+                "structure": f"Sub 1.{i + 1}",
+                "message": "1",
+                "slug": f"bench-page-{i}",
+                "parent": "Bench index",
+                "web_title": f"Bench page {i}",
+                "whatsapp_title": f"Bench page {i}",
+                "whatsapp_body": f"Message for page {i}",
+                "tags": f"tag-{i % 50}, tag-{i % 7}",
+                "quick_replies": f"reply-{i % 20}",
+                "triggers": f"trigger-{i % 30}",
+                "buttons": (
+                    '[{"type": "go_to_page", "title": "Back", '
+                    f'"slug": "{previous}"}}]'
+                ),
+                "related_pages": previous,
+                "language_code": "en",
+            }
+        )
+    return out.getvalue().encode()
+
+
+@pytest.mark.parametrize("rows", [1_000, 10_000, 50_000])
+def test_import_timing(rows: int, record_property) -> None:
+    content = content_csv(rows)
+
+    start = time.perf_counter()
+    import_content(BytesIO(content), "CSV", Queue())
+    elapsed = time.perf_counter() - start
+
+    record_property("seconds", round(elapsed, 1))
+    record_property("rows_per_second", round(rows / elapsed))
+    assert ContentPage.objects.count() == rows
+    # One revision per content page, and one for the index page
+    assert Revision.objects.count() == rows + 1
+
+
+def peak_import_memory(rows: int) -> int:
+    content = content_csv(rows)
+    tracemalloc.start()
+    try:
+        import_content(BytesIO(content), "CSV", Queue())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert ContentPage.objects.count() == rows
+    return peak
+
+
+def test_import_memory(record_property) -> None:
+    """
+    Rows are read from the file and pages are saved in batches, so the peak memory
+    use shouldn't grow much with the size of the file. 50 times the rows should use
+    well under 5 times the memory, where holding every row would use about 50 times.
+    """
+    # Each import purges the content of the one before
+    small = peak_import_memory(1_000)
+    large = peak_import_memory(50_000)
+
+    record_property("peak_mib_1000", round(small / 2**20, 1))
+    record_property("peak_mib_50000", round(large / 2**20, 1))
+    assert large < small * 5
+
+
+@pytest.mark.parametrize("pages", [1_000])
+def test_validation_timing(pages: int, record_property) -> None:
+    """
+    Validating a page's fields directly is faster than validating them with the
+    edit form
+    """
+    home_page = HomePage.objects.first()
+    target = ContentPage(title="Target", slug="target")
+    home_page.add_child(instance=target)
+    page = ContentPage(title="Page", slug="page", locale=home_page.locale)
+    page.body.append(("paragraph", RichText("<p>Body</p>")))
+    for i in range(5):
+        message = {
+            "message": f"Message {i}",
+            "buttons": [
+                {"type": "next_message", "value": {"title": "Next"}},
+                {"type": "go_to_page", "value": {"title": "Back", "page": target.pk}},
+            ],
+        }
+        page.whatsapp_body.append(
+            ("Whatsapp_Message", WhatsappBlock().to_python(message))
+        )
+    edit_handler = page.edit_handler.bind_to_model(ContentPage)
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        validate_using_form(edit_handler, page, 1)
+    form_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        validate_fields(page, 1)
+    elapsed = time.perf_counter() - start
+
+    record_property("seconds", round(elapsed, 1))
+    record_property("form_seconds", round(form_elapsed, 1))
+    assert elapsed < form_elapsed
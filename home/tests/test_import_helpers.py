@@ -0,0 +1,164 @@
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from wagtail.rich_text import RichText  # type: ignore
+
+from home.import_helpers import (
+    ImportException,
+    validate_fields,
+    validate_using_form,
+)
+from home.models import (
+    ContentPage,
+    HomePage,
+    MessengerBlock,
+    SMSBlock,
+    USSDBlock,
+    ViberBlock,
+    WhatsappBlock,
+)
+
+from .helpers import set_profile_field_options
+
+
+def whatsapp_message(**value: Any) -> tuple[str, Any]:
+    return (
+        "Whatsapp_Message",
+        WhatsappBlock().to_python({"message": "Hello", **value}),
+    )
+
+
+def next_message(title: str) -> dict[str, Any]:
+    return {"type": "next_message", "value": {"title": title}}
+
+
+def go_to_page(title: str, page: ContentPage) -> dict[str, Any]:
+    return {"type": "go_to_page", "value": {"title": title, "page": page.pk}}
+
+
+def long_message(page: ContentPage, length: int) -> None:
+    page.whatsapp_body.append(
+        whatsapp_message(message="a" * length, buttons=[next_message("Next")])
+    )
+
+
+# The form never finds errors in rich text
+VALID_CASES = {
+    "valid",
+    "empty web paragraph",
+    "blank web paragraph",
+    "blank html paragraph",
+}
+
+CASES: dict[str, Callable[[ContentPage], None]] = {
+    "valid": lambda page: None,
+    "no title": lambda page: setattr(page, "title", ""),
+    "long title": lambda page: setattr(page, "title", "a" * 256),
+    "long whatsapp title": lambda page: setattr(page, "whatsapp_title", "a" * 201),
+    "no message": lambda page: page.whatsapp_body.append(whatsapp_message(message="")),
+    "long message": lambda page: page.whatsapp_body.append(
+        whatsapp_message(message="a" * 4097)
+    ),
+    "long message with buttons": lambda page: long_message(page, 1025),
+    "long footer": lambda page: page.whatsapp_body.append(
+        whatsapp_message(footer="a" * 61)
+    ),
+    "long button": lambda page: page.whatsapp_body.append(
+        whatsapp_message(buttons=[next_message("a" * 21)])
+    ),
+    "too many buttons": lambda page: page.whatsapp_body.append(
+        whatsapp_message(buttons=[next_message(f"Next {i}") for i in range(4)])
+    ),
+    "long list title": lambda page: page.whatsapp_body.append(
+        whatsapp_message(list_title="a" * 25)
+    ),
+    "long list item": lambda page: page.whatsapp_body.append(
+        whatsapp_message(list_items=[next_message("a" * 25)])
+    ),
+    "too many list items": lambda page: page.whatsapp_body.append(
+        whatsapp_message(list_items=[next_message(f"Item {i}") for i in range(11)])
+    ),
+    "variation without restriction": lambda page: page.whatsapp_body.append(
+        whatsapp_message(
+            variation_messages=[{"message": "Hi", "variation_restrictions": []}]
+        )
+    ),
+    "invalid variation": lambda page: page.whatsapp_body.append(
+        whatsapp_message(
+            variation_messages=[
+                {
+                    "message": "Hi",
+                    "variation_restrictions": [{"type": "gender", "value": "other"}],
+                }
+            ]
+        )
+    ),
+    "long sms": lambda page: page.sms_body.append(
+        ("SMS_Message", SMSBlock().to_python({"message": "a" * 460}))
+    ),
+    "long ussd": lambda page: page.ussd_body.append(
+        ("USSD_Message", USSDBlock().to_python({"message": "a" * 161}))
+    ),
+    "long messenger": lambda page: page.messenger_body.append(
+        ("messenger_block", MessengerBlock().to_python({"message": "a" * 2001}))
+    ),
+    "long viber": lambda page: page.viber_body.append(
+        ("viber_message", ViberBlock().to_python({"message": "a" * 7001}))
+    ),
+    "empty web paragraph": lambda page: page.body.append(("paragraph", RichText(""))),
+    "blank web paragraph": lambda page: page.body.append(("paragraph", RichText(" "))),
+    "blank html paragraph": lambda page: page.body.append(
+        ("paragraph", RichText("<p></p>"))
+    ),
+}
+
+
+def validation_errors(validate: Callable[[], None]) -> list[str] | None:
+    try:
+        validate()
+    except ImportException as e:
+        assert e.row_num == 3
+        return e.message
+    return None
+
+
+@pytest.mark.django_db
+class TestValidateFields:
+    @pytest.mark.parametrize("case", CASES)
+    def test_same_errors_as_form(self, case: str) -> None:
+        """
+        Validating the fields directly raises the same errors as validating them
+        with the edit form
+        """
+        set_profile_field_options()
+        home_page = HomePage.objects.first()
+        target = ContentPage(title="Target", slug="target")
+        home_page.add_child(instance=target)
+        page = ContentPage(title="Page", slug="page", locale=home_page.locale)
+        page.whatsapp_body.append(
+            whatsapp_message(list_items=[go_to_page("Target", target)])
+        )
+        page.related_pages.append(("related_page", target))
+        page.body.append(("paragraph", RichText("<p>Body</p>")))
+        CASES[case](page)
+
+        edit_handler = page.edit_handler.bind_to_model(ContentPage)
+        form_errors = validation_errors(
+            lambda: validate_using_form(edit_handler, page, 3)
+        )
+        errors = validation_errors(lambda: validate_fields(page, 3))
+
+        assert errors == form_errors
+        assert (errors is None) == (case in VALID_CASES)
+
+    def test_slug_in_use(self) -> None:
+        """
+        Slugs that are in use aren't errors, because imports update the page with
+        that slug
+        """
+        home_page = HomePage.objects.first()
+        home_page.add_child(instance=ContentPage(title="Page", slug="page"))
+        page = ContentPage(title="Page", slug="page", locale=home_page.locale)
+
+        validate_fields(page, 3)
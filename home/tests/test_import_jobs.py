@@ -0,0 +1,309 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+from wagtail.models import Locale  # type: ignore
+
+from home.import_jobs import (
+    JobLease,
+    claim_next_job,
+    create_job,
+    get_progress,
+    get_progress_key,
+    run_job,
+)
+from home.models import ContentPage, HomePage, ImportJob
+
+from .helpers import set_profile_field_options
+
+IMPORT_EXPORT_DATA = Path("home/tests/import-export-data")
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+@pytest.fixture(autouse=True)
+def worker(settings):
+    """
+    Leave jobs for the worker, so that tests can run them when they want to
+    """
+    settings.IMPORT_JOB_RUNNER = "worker"
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """
+    Keep the uploaded files out of the media directory
+    """
+    settings.MEDIA_ROOT = tmp_path
+
+
+def read_file(filename: str) -> ContentFile:
+    return ContentFile((IMPORT_EXPORT_DATA / filename).read_bytes(), name=filename)
+
+
+def create_content_job(filename: str) -> ImportJob:
+    return create_job(ImportJob.Kind.CONTENT, read_file(filename), "CSV", purge=False)
+
+
+@pytest.mark.django_db
+class TestImportJobs:
+    def test_run(self):
+        """
+        The worker runs queued jobs, saves the result, and deletes the file
+        """
+        job = create_content_job("contentpage_required_fields.csv")
+        name = job.file.name
+        assert default_storage.exists(name)
+
+        out = StringIO()
+        call_command("run_import_jobs", "--once", stdout=out)
+
+        assert f"Finished import {job.pk}: Content import successful" in out.getvalue()
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert job.result_messages == [
+            "Content import successful",
+            "3 pages created, 0 updated, 0 unchanged",
+        ]
+        assert not job.file
+        assert not default_storage.exists(name)
+        assert job.attempts == 1
+        assert ContentPage.objects.filter(slug="first_time_user").exists()
+
+    def test_run_failed(self):
+        """
+        Import errors are saved as the result
+        """
+        job = create_job(
+            ImportJob.Kind.ORDERED_CONTENT_SET,
+            read_file("ordered_content_broken.csv"),
+            "CSV",
+            purge=False,
+        )
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert job.result_messages == [
+            "Ordered content set import failed on row 2: Row Test Set has 2 times, "
+            "2 units, 3 before_or_afters, 3 page_slugs and 3 contact_fields and they "
+            "should all be equal."
+        ]
+
+    def test_claim_order(self):
+        """
+        Jobs are run in the order they were uploaded. Running jobs are skipped
+        unless their lease has expired, when they're run again, even if they've
+        stopped updating their progress.
+        """
+        first = create_content_job("contentpage_required_fields.csv")
+        second = create_content_job("contentpage_required_fields.csv")
+
+        assert claim_next_job() == first
+        assert get_progress(first.pk) == 0
+        assert claim_next_job() == second
+        assert claim_next_job() is None
+
+        cache.delete(get_progress_key(first.pk))
+        assert claim_next_job() is None
+
+        expired = timezone.now() - timedelta(seconds=1)
+        ImportJob.objects.filter(pk=first.pk).update(locked_until=expired)
+        job = claim_next_job()
+        assert job == first
+        assert job.attempts == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lease_renewed(settings):
+    """
+    A running job's lease is renewed until it's finished
+    """
+    settings.IMPORT_JOB_TIMEOUT = 1
+    create_content_job("contentpage_required_fields.csv")
+    job = claim_next_job()
+    claimed_until = job.locked_until
+
+    with JobLease(job):
+        time.sleep(0.5)
+        job.refresh_from_db()
+        assert job.locked_until > claimed_until
+    job.refresh_from_db()
+    renewed_until = job.locked_until
+
+    time.sleep(0.5)
+    job.refresh_from_db()
+    assert job.locked_until == renewed_until
+
+
+@pytest.mark.django_db
+class TestImportJobViews:
+    def test_upload_and_poll(self, admin_client):
+        """
+        Uploading a file saves a job, which the page polls until it's finished. The
+        result is only shown once.
+        """
+        with (IMPORT_EXPORT_DATA / "contentpage_required_fields.csv").open("rb") as f:
+            response = admin_client.post(
+                "/admin/import/", {"file": f, "file_type": "CSV", "purge": "False"}
+            )
+        [job] = ImportJob.objects.all()
+        assert response.context["job"] == job
+        assert job.locale is None
+        assert not job.purge
+
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert response.json() == {"loading": True, "progress": None}
+        response = admin_client.get("/admin/import/")
+        assert response.context["loading"]
+
+        call_command("run_import_jobs", "--once", stdout=StringIO())
+
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert response.json() == {"loading": False}
+        assert [str(m) for m in get_messages(response.wsgi_request)] == [
+            "Content import successful",
+            "3 pages created, 0 updated, 0 unchanged",
+        ]
+        # The messages haven't been displayed yet, but aren't added again
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert [str(m) for m in get_messages(response.wsgi_request)] == [
+            "Content import successful",
+            "3 pages created, 0 updated, 0 unchanged",
+        ]
+        response = admin_client.get("/admin/import/")
+        assert not response.context["loading"]
+
+    def test_stopped_thread(self, admin_client, settings):
+        """
+        A job that was running in a thread in a process that stopped fails
+        """
+        settings.IMPORT_JOB_RUNNER = "thread"
+        job = ImportJob.objects.create(
+            kind=ImportJob.Kind.ASSESSMENT,
+            file_type="CSV",
+            status=ImportJob.Status.RUNNING,
+        )
+
+        url = f"/admin/import_assessment/?job={job.pk}"
+        response = admin_client.get(url, **XHR)
+
+        assert response.json() == {"loading": False}
+        assert [str(m) for m in get_messages(response.wsgi_request)] == [
+            "CMS Forms import failed"
+        ]
+
+
+@pytest.mark.django_db
+class TestSplitImportJobs:
+    @pytest.fixture(autouse=True)
+    def partition_by_locale(self, settings):
+        settings.IMPORT_PARTITION_BY_LOCALE = True
+        pt, _created = Locale.objects.get_or_create(language_code="pt")
+        HomePage.add_root(locale=pt, title="Home (pt)", slug="home-pt")
+        set_profile_field_options()
+
+    def test_split(self, admin_client):
+        """
+        Content imports for every locale are split into a job for each locale, and
+        the job finishes with their results once they've all finished
+        """
+        job = create_content_job("translations.csv")
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.SPLIT
+        partitions = list(job.partitions.order_by("pk"))
+        assert [p.locale.language_code for p in partitions] == ["en", "pt"]
+        assert not any(p.file for p in partitions)
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert response.json() == {
+            "loading": True,
+            "progress": 0,
+            "locales": {"en": 0, "pt": 0},
+        }
+
+        run_job(claim_next_job())
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert response.json() == {
+            "loading": True,
+            "progress": 50,
+            "locales": {"en": 100, "pt": 0},
+        }
+
+        out = StringIO()
+        call_command("run_import_jobs", "--once", stdout=out)
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert job.result_messages == [
+            "en: Content import successful",
+            "en: 2 pages created, 0 updated, 0 unchanged",
+            "pt: Content import successful",
+            "pt: 2 pages created, 0 updated, 0 unchanged",
+        ]
+        assert not job.file
+        locales = ContentPage.objects.values_list("locale__language_code", flat=True)
+        assert set(locales) == {"en", "pt"}
+
+        response = admin_client.get(f"/admin/import/?job={job.pk}", **XHR)
+        assert response.json() == {"loading": False}
+
+    def test_one_locale(self):
+        """
+        Files with one locale are imported in the uploaded job
+        """
+        job = create_content_job("contentpage_required_fields.csv")
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert job.result_messages == [
+            "Content import successful",
+            "3 pages created, 0 updated, 0 unchanged",
+        ]
+        assert not job.partitions.exists()
+
+    def test_purge_not_split(self):
+        """
+        Imports that purge existing content aren't split, so that the content is
+        only purged if the whole import succeeds
+        """
+        job = create_job(
+            ImportJob.Kind.CONTENT, read_file("translations.csv"), "CSV", purge=True
+        )
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert not job.partitions.exists()
+        assert job.result_messages == [
+            "Content import successful",
+            "4 pages created, 0 updated, 0 unchanged",
+        ]
+
+    def test_split_failed(self):
+        """
+        Errors found while reading the file fail the uploaded job before it's split
+        """
+        job = create_content_job("invalid-locale-name.csv")
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        assert job.status == ImportJob.Status.FINISHED
+        assert not job.partitions.exists()
+        assert job.result_messages == [
+            "Content import failed on row 2: Language not found: NotEnglish"
+        ]
@@ -405,6 +405,36 @@ class OrderedContentSetTests(TestCase):
 
         assert ordered_content_set.status() == "In Moderation"
 
+    def test_profile_field_columns(self) -> None:
+        """
+        The profile field columns match the live profile fields, and are only updated
+        when a draft is published
+        """
+        ordered_content_set = OrderedContentSet(
+            name="Test Title",
+            slug="ordered-set-2",
+            locale=Locale.objects.get(language_code="en"),
+        )
+        ordered_content_set.profile_fields.append(("gender", "female"))
+        ordered_content_set.profile_fields.append(("age", "18 - 25"))
+        ordered_content_set.save()
+        ordered_content_set.refresh_from_db()
+        self.assertEqual(ordered_content_set.profile_gender, "female")
+        self.assertEqual(ordered_content_set.profile_age, "18 - 25")
+        self.assertEqual(ordered_content_set.profile_relationship, "")
+
+        ordered_content_set.profile_fields = [("relationship", "single")]
+        revision = ordered_content_set.save_revision()
+        ordered_content_set.refresh_from_db()
+        self.assertEqual(ordered_content_set.profile_gender, "female")
+        self.assertEqual(ordered_content_set.profile_relationship, "")
+
+        revision.publish()
+        ordered_content_set.refresh_from_db()
+        self.assertEqual(ordered_content_set.profile_gender, "")
+        self.assertEqual(ordered_content_set.profile_age, "")
+        self.assertEqual(ordered_content_set.profile_relationship, "single")
+
     def test_search_fields_include_profile_fields(self) -> None:
         """
         OrderedContentSet search config should index concrete fields used by the
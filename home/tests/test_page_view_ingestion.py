@@ -0,0 +1,132 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from home import page_view_ingestion
+from home.models import HomePage, PageView
+from home.page_view_ingestion import MemoryBuffer, flush_page_views
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def uclient(client, django_user_model):
+    """
+    Access the user interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_user(**creds)
+    client.login(**creds)
+    return client
+
+
+@pytest.fixture()
+def buffer(settings, monkeypatch):
+    """
+    Buffer page views in memory, without a background thread saving them
+    """
+    settings.PAGE_VIEW_INGESTION = "memory"
+    buffer = MemoryBuffer(batch_size=2)
+    monkeypatch.setattr(page_view_ingestion, "_buffer", buffer)
+    return buffer
+
+
+@pytest.mark.django_db
+class TestPageViewIngestion:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        self.page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="page",
+            title="Page",
+            bodies=[WABody("Page", [WABlk("One"), WABlk("Two")])],
+        )
+
+    def test_sync(self, uclient):
+        """
+        By default page views are saved during the request
+        """
+        uclient.get(f"/api/v2/pages/{self.page.id}/?whatsapp=true&message=2")
+
+        [page_view] = PageView.objects.all()
+        assert page_view.page_id == self.page.id
+        assert page_view.revision_id == self.page.live_revision_id
+        assert page_view.platform == "whatsapp"
+        assert page_view.message == 2
+
+    def test_buffered(self, uclient, buffer):
+        """
+        Buffered page views aren't saved until the buffer is flushed, and keep the
+        time of the request
+        """
+        uclient.get(f"/api/v2/pages/{self.page.id}/?whatsapp=true&data__user=1")
+        uclient.get(f"/api/v3/pages/{self.page.id}/?channel=whatsapp")
+        uclient.get(f"/api/v3/pages/{self.page.id}/?channel=sms&message=2")
+        assert PageView.objects.count() == 0
+        assert buffer.depth() == 3
+        requested_at = [pv["timestamp"] for pv in buffer.peek(3)]
+
+        assert buffer.flush() == 3
+
+        assert buffer.depth() == 0
+        page_views = PageView.objects.order_by("id")
+        assert [pv.platform for pv in page_views] == ["whatsapp", "web", "web"]
+        assert [pv.data for pv in page_views] == [{"user": "1"}, {}, {}]
+        assert [pv.message for pv in page_views] == [None, None, 2]
+        assert [pv.timestamp.isoformat() for pv in page_views] == requested_at
+        assert {pv.revision_id for pv in page_views} == {self.page.live_revision_id}
+
+    def test_batches(self, buffer, django_assert_num_queries):
+        """
+        Each batch is saved with a single insert
+        """
+        for _ in range(5):
+            self.page.save_page_view({"whatsapp": "true"})
+
+        # Checking for deleted pages and revisions, then the insert, for 3 batches
+        with django_assert_num_queries(9):
+            assert flush_page_views(buffer, batch_size=2) == 5
+        assert PageView.objects.count() == 5
+
+    def test_deleted_page(self, buffer):
+        """
+        Page views for deleted pages are dropped, without losing the rest of the batch
+        """
+        other_page = PageBuilder.build_cp(
+            parent=self.page.get_parent(), slug="other", title="Other", bodies=[]
+        )
+        self.page.save_page_view({"whatsapp": "true"})
+        other_page.save_page_view({"whatsapp": "true"})
+        other_page.delete()
+
+        assert buffer.flush() == 1
+        assert buffer.depth() == 0
+        [page_view] = PageView.objects.all()
+        assert page_view.page_id == self.page.id
+
+    def test_command(self, buffer):
+        """
+        The command shows the backlog, and saves everything in the buffer
+        """
+        for _ in range(3):
+            self.page.save_page_view({"whatsapp": "true"})
+
+        out = StringIO()
+        call_command("ingest_page_views", "--backlog", stdout=out)
+        assert out.getvalue() == "Backlog: 3\n"
+
+        out = StringIO()
+        call_command("ingest_page_views", "--once", stdout=out)
+        assert "Saved 3 page views, backlog: 0" in out.getvalue()
+        assert PageView.objects.count() == 3
+
+    def test_command_sync(self):
+        """
+        The command can't be used if page views aren't buffered
+        """
+        with pytest.raises(CommandError):
+            call_command("ingest_page_views", "--once")
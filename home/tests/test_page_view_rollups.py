@@ -0,0 +1,185 @@
+import json
+from datetime import date, datetime
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+
+from home.models import HomePage, PageView, PageViewCount
+from home.page_view_rollups import refresh_page_view_counts
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def admin_client(client, django_user_model):
+    """
+    Access admin interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_superuser(**creds)
+    client.login(**creds)
+    return client
+
+
+@pytest.mark.django_db
+class TestPageViewRollups:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        self.pages = [
+            PageBuilder.build_cp(
+                parent=main_menu,
+                slug=f"page-{i}",
+                title=f"Page {i}",
+                bodies=[WABody(f"Page {i}", [WABlk(f"Message {i}")])],
+            )
+            for i in range(2)
+        ]
+
+    def create_view(self, page, timestamp, platform="whatsapp"):
+        return PageView.objects.create(
+            page=page,
+            revision=page.get_latest_revision(),
+            platform=platform,
+            timestamp=datetime.fromisoformat(f"{timestamp}+00:00"),
+        )
+
+    def create_views(self):
+        page_1, page_2 = self.pages
+        self.create_view(page_1, "2024-01-01T00:00:00")
+        self.create_view(page_1, "2024-01-01T23:59:59")
+        self.create_view(page_1, "2024-01-01T12:00:00", platform="web")
+        self.create_view(page_1, "2024-01-02T08:00:00")
+        self.create_view(page_2, "2024-01-02T09:00:00")
+        self.create_view(page_2, "2024-02-10T10:00:00", platform="sms")
+
+    def assert_counts_match(self):
+        total = PageViewCount.objects.aggregate(total=Sum("count"))["total"]
+        assert total == PageView.objects.count()
+        for page in self.pages:
+            for platform in ["whatsapp", "web", "sms"]:
+                counts = PageViewCount.objects.filter(page=page, platform=platform)
+                views = PageView.objects.filter(page=page, platform=platform)
+                assert (counts.aggregate(t=Sum("count"))["t"] or 0) == views.count()
+
+    def test_counts(self):
+        """
+        Page views are counted per page, platform and day
+        """
+        self.create_views()
+
+        assert refresh_page_view_counts() == 5
+
+        counts = PageViewCount.objects.order_by("date", "page_id", "platform")
+        assert [
+            (c.date.isoformat(), c.page_id, c.platform, c.count) for c in counts
+        ] == [
+            ("2024-01-01", self.pages[0].id, "web", 1),
+            ("2024-01-01", self.pages[0].id, "whatsapp", 2),
+            ("2024-01-02", self.pages[0].id, "whatsapp", 1),
+            ("2024-01-02", self.pages[1].id, "whatsapp", 1),
+            ("2024-02-10", self.pages[1].id, "sms", 1),
+        ]
+        self.assert_counts_match()
+
+    def test_incremental(self, settings):
+        """
+        Refreshing recounts the days after the high-water mark, including any late
+        page views within the lookback, without counting anything twice
+        """
+        settings.PAGE_VIEW_ROLLUP_LOOKBACK_DAYS = 1
+        self.create_views()
+        refresh_page_view_counts()
+
+        # Late, but within the lookback
+        self.create_view(self.pages[0], "2024-02-09T10:00:00")
+        self.create_view(self.pages[1], "2024-02-10T11:00:00", platform="sms")
+        self.create_view(self.pages[1], "2024-02-11T11:00:00")
+        refresh_page_view_counts()
+        refresh_page_view_counts()
+
+        self.assert_counts_match()
+        # The January counts weren't recounted
+        assert PageViewCount.objects.filter(date__lt=date(2024, 2, 1)).count() == 4
+
+    def test_deleted_page(self):
+        """
+        Counts for deleted pages are removed with the page
+        """
+        self.create_views()
+        refresh_page_view_counts()
+
+        self.pages[1].delete()
+
+        self.assert_counts_match()
+
+    def test_command(self):
+        """
+        The command backfills all the counts
+        """
+        self.create_views()
+        PageViewCount.objects.create(
+            page=self.pages[0], platform="web", date=date(2024, 3, 1), count=99
+        )
+        out = StringIO()
+
+        call_command("rollup_page_views", "--all", stdout=out)
+
+        assert out.getvalue() == "Saved 5 page view counts\n"
+        self.assert_counts_match()
+
+    def test_page_view_report(self, admin_client):
+        """
+        The page view report shows the counts per month
+        """
+        self.create_views()
+        refresh_page_view_counts()
+
+        response = admin_client.get(reverse("page_view_report"))
+
+        data = json.loads(response.context["page_view_data"])
+        assert data == {
+            "data": [{"x": "2024-01-01", "y": 5}, {"x": "2024-02-01", "y": 1}],
+            "labels": ["2024-01-01", "2024-02-01"],
+        }
+
+    def test_page_view_report_filters(self, admin_client):
+        """
+        The page view report can be filtered by date, platform and page
+        """
+        self.create_views()
+        refresh_page_view_counts()
+        url = reverse("page_view_report")
+
+        response = admin_client.get(
+            url,
+            {
+                "timestamp_0": "2024-01-02",
+                "timestamp_1": "2024-02-28",
+                "platform": "whatsapp",
+                "page": self.pages[0].id,
+            },
+        )
+
+        data = json.loads(response.context["page_view_data"])
+        assert data["data"] == [{"x": "2024-01-01", "y": 1}]
+
+    def test_stale_content_report(self, admin_client):
+        """
+        The stale content report shows and filters on the counted page views
+        """
+        self.create_views()
+        refresh_page_view_counts()
+        url = reverse("stale_content_report")
+
+        response = admin_client.get(url, {"o": "view_counter"})
+        view_counts = {p.id: p.view_counter for p in response.context["object_list"]}
+        assert view_counts[self.pages[0].id] == 4
+        assert view_counts[self.pages[1].id] == 2
+
+        response = admin_client.get(url, {"view_counter": 2})
+        assert [p.id for p in response.context["object_list"]] == [self.pages[1].id]
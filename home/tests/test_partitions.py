@@ -0,0 +1,179 @@
+from datetime import date, datetime, timezone
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from home.models import HomePage, PageView
+from home.partitions import (
+    Partition,
+    add_months,
+    create_partition,
+    get_partitions,
+    month_start,
+    parse_partition,
+    partition_name,
+    partitions_to_archive,
+    restore_archive,
+)
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning is Postgres only"
+)
+
+
+def test_add_months():
+    assert add_months(date(2024, 11, 1), 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -13) == date(2022, 12, 1)
+
+
+def test_parse_partition():
+    """
+    The partitions' ranges can be worked out from their names
+    """
+    assert parse_partition("home_pageview_p2024_12") == Partition(
+        "home_pageview_p2024_12", "home_pageview", date(2025, 1, 1)
+    )
+    assert parse_partition("home_contentpagerating_before_2024_03") == Partition(
+        "home_contentpagerating_before_2024_03",
+        "home_contentpagerating",
+        date(2024, 3, 1),
+    )
+    assert parse_partition("home_pageview_default") is None
+
+
+def test_partitions_to_archive():
+    """
+    Only partitions that end before the retention period are archived
+    """
+    partitions = [
+        parse_partition("home_pageview_before_2024_01"),
+        parse_partition("home_pageview_p2024_01"),
+        parse_partition("home_pageview_p2024_02"),
+        parse_partition("home_pageview_p2024_03"),
+    ]
+
+    archive = partitions_to_archive(partitions, 1, today=date(2024, 3, 15))
+
+    assert [p.name for p in archive] == [
+        "home_pageview_before_2024_01",
+        "home_pageview_p2024_01",
+    ]
+
+
+def test_restore_invalid_archive(tmp_path):
+    with pytest.raises(ValueError):
+        restore_archive(tmp_path / "home_page_p2024_01.csv.gz")
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="Postgres is partitioned")
+def test_commands_need_postgres():
+    with pytest.raises(CommandError):
+        call_command("maintain_partitions")
+    with pytest.raises(CommandError):
+        call_command("restore_partition_archive", "home_pageview_p2024_01.csv.gz")
+
+
+@postgres_only
+@pytest.mark.django_db
+class TestPartitions:
+    @pytest.fixture(autouse=True)
+    def create_test_data(self):
+        home_page = HomePage.objects.first()
+        main_menu = PageBuilder.build_cpi(home_page, "main-menu", "Main Menu")
+        self.page = PageBuilder.build_cp(
+            parent=main_menu,
+            slug="page",
+            title="Page",
+            bodies=[WABody("Page", [WABlk("Message")])],
+        )
+
+    def create_view(self, timestamp):
+        return PageView.objects.create(
+            page=self.page,
+            revision=self.page.get_latest_revision(),
+            timestamp=timestamp,
+        )
+
+    def get_partition(self, page_view):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM home_pageview WHERE id = %s",
+                [page_view.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_monthly_partitions(self):
+        """
+        Page views are saved in the partition for their month, or the partition for
+        everything from before partitioning
+        """
+        now = datetime.now(timezone.utc)
+        page_view = self.create_view(now)
+        old_page_view = self.create_view(datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+        assert self.get_partition(page_view) == partition_name(
+            "home_pageview", month_start(now.date())
+        )
+        assert self.get_partition(old_page_view).startswith("home_pageview_before_")
+        assert PageView.objects.filter(page=self.page).count() == 2
+
+    def test_maintain_creates_partitions(self):
+        """
+        Partitions are created for the coming months
+        """
+        call_command("maintain_partitions", "--months-ahead", "6", stdout=StringIO())
+
+        month = month_start(date.today())
+        names = {p.name for p in get_partitions("home_pageview")}
+        for months in range(7):
+            assert partition_name("home_pageview", add_months(month, months)) in names
+
+    def test_create_partition_moves_default_rows(self):
+        """
+        Rows that were saved in the default partition are moved to the new partition
+        """
+        month = add_months(month_start(date.today()), 24)
+        page_view = self.create_view(
+            datetime(month.year, month.month, 2, tzinfo=timezone.utc)
+        )
+        assert self.get_partition(page_view) == "home_pageview_default"
+
+        assert create_partition("home_pageview", month)
+
+        assert self.get_partition(page_view) == partition_name("home_pageview", month)
+
+    def test_archive_and_restore(self, tmp_path: Path):
+        """
+        Old partitions are archived and dropped, and can be restored into a separate
+        table
+        """
+        old_page_view = self.create_view(datetime(2020, 1, 1, tzinfo=timezone.utc))
+        page_view = self.create_view(datetime.now(timezone.utc))
+        out = StringIO()
+
+        call_command(
+            "maintain_partitions",
+            "--retention-months=0",
+            f"--archive-dir={tmp_path}",
+            stdout=out,
+        )
+
+        assert not PageView.objects.filter(id=old_page_view.id).exists()
+        assert PageView.objects.filter(id=page_view.id).exists()
+        [archive] = tmp_path.glob("home_pageview_before_*.csv.gz")
+        assert f"Archived {archive}" in out.getvalue()
+
+        call_command("restore_partition_archive", str(archive), stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            table = archive.name.removesuffix(".csv.gz") + "_restored"
+            cursor.execute(f"SELECT id FROM {table}")  # noqa: S608
+            assert cursor.fetchall() == [(old_page_view.id,)]
@@ -0,0 +1,174 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from wagtail.models import Locale
+
+from home.models import ContentPage, ContentPageSearch, HomePage
+from home.search import page_text, search_config, search_pages
+
+from .page_builder import PageBuilder, SBlk, SBody, WABlk, WABody
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Full-text search is Postgres only"
+)
+
+
+def build_page(slug, title, message="Hello", web_body=None, publish=True):
+    home_page = HomePage.objects.first()
+    return PageBuilder.build_cp(
+        parent=home_page,
+        slug=slug,
+        title=title,
+        bodies=[WABody(f"WA {title}", [WABlk(message)])],
+        web_body=web_body,
+        publish=publish,
+    )
+
+
+def search_slugs(query, language_code="en"):
+    return [
+        page.slug
+        for page in search_pages(ContentPage.objects.live(), query, language_code)
+    ]
+
+
+def test_search_config(settings):
+    """
+    Languages use their own text search configuration, regional codes use their
+    language's, and unknown languages don't stem words
+    """
+    settings.SEARCH_LANGUAGE_CONFIGS = {"zu": "zulu_custom", "fr": "simple"}
+    assert search_config("en") == "english"
+    assert search_config("pt-BR") == "portuguese"
+    assert search_config("zu") == "zulu_custom"
+    assert search_config("fr") == "simple"
+    assert search_config("xh") == "simple"
+
+
+@pytest.mark.django_db
+def test_page_text():
+    """
+    Titles are weighted above messages, which are weighted above the web body
+    """
+    home_page = HomePage.objects.first()
+    page = PageBuilder.build_cp(
+        parent=home_page,
+        slug="page",
+        title="Page",
+        bodies=[
+            WABody("WA title", [WABlk("WA message")]),
+            SBody("SMS title", [SBlk("SMS message")]),
+        ],
+        web_body=["<b>Web</b> body"],
+    )
+
+    text = page_text(page)
+
+    assert text["A"] == ["Page", "WA title", "SMS title", "", "", ""]
+    assert text["B"] == ["", "WA message", "SMS message"]
+    assert text["C"] == ["Web body"]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="Postgres is indexed")
+def test_search_without_postgres():
+    """
+    Without Postgres there's no index, so searches match the titles
+    """
+    build_page("malaria", "Malaria")
+    build_page("other", "Other", message="Malaria")
+    build_page("wa-title", "Prevention")
+
+    assert search_slugs("MALARIA") == ["malaria"]
+    assert search_slugs("wa prev") == ["wa-title"]
+    assert not ContentPageSearch.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="Postgres is indexed")
+def test_reindex_without_postgres():
+    with pytest.raises(CommandError):
+        call_command("reindex_search")
+
+
+@postgres_only
+@pytest.mark.django_db
+class TestSearch:
+    def test_ranked(self):
+        """
+        Pages that match in their titles rank above pages that match in their bodies,
+        and words are matched by their stems
+        """
+        build_page("body", "Body", web_body=["Vaccinations for children"])
+        build_page("message", "Message", message="When to get a vaccine")
+        build_page("title", "Vaccines")
+        build_page("other", "Other")
+
+        assert search_slugs("vaccination") == ["title", "message", "body"]
+
+    def test_web_search_syntax(self):
+        build_page("malaria", "Malaria symptoms")
+        build_page("malaria-prevention", "Malaria prevention")
+
+        assert search_slugs("malaria -prevention") == ["malaria"]
+        assert search_slugs('"prevention malaria"') == []
+
+    def test_locale_config(self):
+        """
+        Pages are indexed with the configuration of their locale, so Portuguese
+        words are stemmed as Portuguese
+        """
+        pt, _ = Locale.objects.get_or_create(language_code="pt")
+        pt_home = HomePage.add_root(locale=pt, title="Home (pt)", slug="home-pt")
+        PageBuilder.build_cp(
+            parent=pt_home,
+            slug="gravidez",
+            title="Gravidez",
+            bodies=[WABody("Gravidez", [WABlk("Cuidados durante a gravidez")])],
+        )
+
+        pages = ContentPage.objects.live().filter(locale=pt)
+        assert [p.slug for p in search_pages(pages, "cuidado", "pt")] == ["gravidez"]
+
+    def test_publish_and_unpublish(self):
+        """
+        Pages are indexed when they're published and removed when they're
+        unpublished, and drafts aren't indexed until they're published
+        """
+        page = build_page("page", "Malaria")
+        assert search_slugs("malaria") == ["page"]
+
+        page.title = "Dengue"
+        page.save_revision()
+        assert search_slugs("dengue") == []
+
+        page.get_latest_revision().publish()
+        assert search_slugs("dengue") == ["page"]
+
+        page.unpublish()
+        assert not ContentPageSearch.objects.filter(page=page).exists()
+
+    def test_reindex(self):
+        """
+        Reindexing indexes every live page in batches, and drops unpublished pages
+        """
+        for i in range(5):
+            build_page(f"page-{i}", f"Malaria {i}")
+        ContentPageSearch.objects.all().delete()
+        unpublished = build_page("unpublished", "Malaria", publish=False)
+        ContentPageSearch.objects.create(page=unpublished)
+
+        out = StringIO()
+        call_command("reindex_search", batch_size=2, stdout=out)
+
+        assert out.getvalue().splitlines() == [
+            "Indexed 2 pages",
+            "Indexed 4 pages",
+            "Indexed 5 pages",
+            "Reindexed 5 pages",
+        ]
+        assert len(search_slugs("malaria")) == 5
+        assert not ContentPageSearch.objects.filter(page=unpublished).exists()
@@ -0,0 +1,103 @@
+"""
+Full-text search timings for a large site. These are slow and need Postgres, so they
+only run when RUN_SEARCH_BENCHMARKS is set and CONTENTREPO_DATABASE is a Postgres
+database. The timings are recorded as properties of the test in the JUnit XML
+report, e.g.
+
+    RUN_SEARCH_BENCHMARKS=1 pytest home/tests/test_search_benchmarks.py \
+        --junitxml=search-benchmarks.xml
+"""
+
+import os
+import statistics
+import time
+
+import pytest
+from django.db import connection
+from wagtail.rich_text import RichText  # type: ignore
+
+from home import search
+from home.models import ContentPage, HomePage, WhatsappBlock
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        not os.environ.get("RUN_SEARCH_BENCHMARKS"),
+        reason="RUN_SEARCH_BENCHMARKS isn't set",
+    ),
+    pytest.mark.skipif(
+        connection.vendor != "postgresql", reason="Full-text search is Postgres only"
+    ),
+]
+
+TOPICS = [
+    "malaria",
+    "vaccine",
+    "pregnancy",
+    "nutrition",
+    "breastfeeding",
+    "diabetes",
+    "tuberculosis",
+    "hypertension",
+    "contraception",
+    "hygiene",
+]
+
+QUERIES = [
+    "malaria",
+    "vaccinations",
+    "pregnancy nutrition",
+    '"clinic visit"',
+    "diabetes -hypertension",
+    "hygiene or contraception",
+]
+
+
+def build_pages(pages: int) -> None:
+    home_page = HomePage.objects.first()
+    for i in range(pages):
+        topic = TOPICS[i % len(TOPICS)]
+        other = TOPICS[(i * 7) % len(TOPICS)]
+        page = ContentPage(
+            title=f"{topic.title()} {i}",
+            slug=f"bench-page-{i}",
+            whatsapp_title=f"About {topic}",
+            enable_whatsapp=True,
+        )
+        page.whatsapp_body.append(
+            (
+                "Whatsapp_Message",
+                WhatsappBlock().to_python(
+                    {"message": f"What to know about {other} before a clinic visit"}
+                ),
+            )
+        )
+        page.body.append(("paragraph", RichText(f"<p>{topic} and {other}</p>")))
+        home_page.add_child(instance=page)
+
+
+@pytest.mark.parametrize("pages", [50_000])
+def test_search_latency(pages: int, record_property) -> None:
+    build_pages(pages)
+
+    start = time.perf_counter()
+    for _ in search.reindex(1000):
+        pass
+    elapsed = time.perf_counter() - start
+    record_property("index_seconds", round(elapsed, 1))
+    record_property("index_pages_per_second", round(pages / elapsed))
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE home_contentpagesearch")
+
+    live_pages = ContentPage.objects.live()
+    for query in QUERIES:
+        timings = []
+        for _ in range(20):
+            start = time.perf_counter()
+            results = list(search.search_pages(live_pages, query, "en")[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        record_property(f"{query} median_ms", round(statistics.median(timings), 1))
+        record_property(f"{query} p95_ms", round(p95, 1))
+        assert results
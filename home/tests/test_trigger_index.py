@@ -0,0 +1,189 @@
+import pytest
+from wagtail.models import Locale
+
+from home import trigger_index
+from home.models import ContentTrigger, HomePage
+from home.trigger_index import Keyword, Trie, find_matches, normalise
+
+from .page_builder import PageBuilder, WABlk, WABody
+
+
+@pytest.fixture()
+def uclient(client, django_user_model):
+    """
+    Access the user interface
+    """
+    creds = {"username": "test", "password": "test"}
+    django_user_model.objects.create_user(**creds)
+    client.login(**creds)
+    return client
+
+
+def build_page(slug, triggers=(), quick_replies=(), parent=None, publish=True):
+    return PageBuilder.build_cp(
+        parent=parent or HomePage.objects.first(),
+        slug=slug,
+        title=slug.title(),
+        bodies=[WABody(slug.title(), [WABlk(f"{slug} message")])],
+        triggers=triggers,
+        quick_replies=quick_replies,
+        publish=publish,
+    )
+
+
+def matched(text, language_codes=("en",)):
+    return [
+        (match.keyword.page_id, match.keyword.name)
+        for match in find_matches(text, language_codes)
+    ]
+
+
+def test_normalise():
+    """
+    Accents, case, extra whitespace and punctuation around words are ignored
+    """
+    assert normalise("  Olá,   MÃE! ") == ["ola", "mae"]
+    assert normalise("Straße") == ["strasse"]
+    assert normalise("¿qué? ?") == ["que", "?"]
+    assert normalise("don't stop") == ["don't", "stop"]
+    assert normalise("") == []
+
+
+def test_trie_matches_whole_words():
+    trie = Trie()
+    hi = Keyword(1, "hi", "trigger")
+    help_me = Keyword(2, "help me", "trigger")
+    trie.add(["hi"], hi)
+    trie.add(["help", "me"], help_me)
+
+    matches = list(trie.find(["please", "help", "me", "hi"]))
+
+    assert [(m.keyword, m.start, m.end, m.exact) for m in matches] == [
+        (help_me, 1, 3, False),
+        (hi, 3, 4, False),
+    ]
+    assert list(trie.find(["high", "help"])) == []
+
+
+@pytest.mark.django_db
+class TestFindMatches:
+    def test_best_matches_first(self):
+        """
+        Whole-message matches come first, then longer matches, then earlier ones,
+        with one match for each page
+        """
+        greeting = build_page("greeting", triggers=["Hi"])
+        help_page = build_page("help", triggers=["help me", "help"])
+        menu = build_page("menu", quick_replies=["Menu"])
+
+        assert matched("hi") == [(greeting.id, "Hi")]
+        assert matched("Hi, MENU please help me") == [
+            (help_page.id, "help me"),
+            (greeting.id, "Hi"),
+            (menu.id, "Menu"),
+        ]
+        assert matched("help") == [(help_page.id, "help")]
+        assert matched("whatever") == []
+        assert matched("   ") == []
+
+    def test_live_pages_in_locale(self):
+        """
+        Only the triggers on live pages in the requested locales match
+        """
+        pt, _ = Locale.objects.get_or_create(language_code="pt")
+        pt_home = HomePage.add_root(locale=pt, title="Home (pt)", slug="home-pt")
+        en_page = build_page("en-page", triggers=["Olá"])
+        pt_page = build_page("pt-page", triggers=["olá"], parent=pt_home)
+        build_page("draft", triggers=["ola"], publish=False)
+
+        assert matched("OLA") == [(en_page.id, "Olá")]
+        assert matched("ola", ["pt"]) == [(pt_page.id, "olá")]
+        assert matched("ola", ["en", "pt"]) == [
+            (en_page.id, "Olá"),
+            (pt_page.id, "olá"),
+        ]
+
+    def test_uses_index(self, django_assert_num_queries):
+        """
+        Once a locale's index has been built, matching doesn't query the database
+        """
+        build_page("greeting", triggers=["hi"])
+        find_matches("hi", ["en"])
+
+        with django_assert_num_queries(0):
+            find_matches("hi there", ["en"])
+
+    def test_rebuilt_when_published(self, django_capture_on_commit_callbacks):
+        """
+        Publishing or unpublishing a page rebuilds its locale's index, and only that
+        locale's index
+        """
+        page = build_page("greeting", triggers=["hi"])
+        assert matched("hello", ["en", "pt"]) == []
+        en_trie = trigger_index._tries["en"][1]
+        pt_trie = trigger_index._tries["pt"][1]
+
+        page.triggers.add("hello")
+        with django_capture_on_commit_callbacks(execute=True):
+            page.save_revision().publish()
+        assert matched("hello", ["en", "pt"]) == [(page.id, "hello")]
+        assert trigger_index._tries["en"][1] is not en_trie
+        assert trigger_index._tries["pt"][1] is pt_trie
+
+        with django_capture_on_commit_callbacks(execute=True):
+            page.unpublish()
+        assert matched("hello") == []
+
+    def test_rebuilt_when_renamed(self, django_capture_on_commit_callbacks):
+        page = build_page("greeting", triggers=["hi"])
+        assert matched("hey") == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            trigger = ContentTrigger.objects.get(name="hi")
+            trigger.name = "hey"
+            trigger.save()
+        assert matched("hey") == [(page.id, "hey")]
+
+
+@pytest.mark.django_db
+class TestResolveTriggerAPI:
+    def test_login_required(self, client):
+        response = client.get("/api/v2/pages/resolve_trigger/?text=hi")
+        assert response.status_code == 401
+
+    def test_resolve_trigger(self, uclient):
+        """
+        The matching pages are returned with their content and the trigger or quick
+        reply that they matched, best matches first
+        """
+        greeting = build_page("greeting", triggers=["Hi"])
+        menu = build_page("menu", quick_replies=["Main menu"])
+        build_page("other", triggers=["bye"])
+
+        response = uclient.get(
+            "/api/v2/pages/resolve_trigger/",
+            {"text": "Hí! main  menu", "locale": "en", "whatsapp": "true"},
+        )
+
+        assert response.status_code == 200
+        content = response.json()
+        assert content["count"] == 2
+        [menu_result, greeting_result] = content["results"]
+        assert menu_result["id"] == menu.id
+        assert menu_result["match"] == {
+            "name": "Main menu",
+            "kind": "quick_reply",
+            "exact": False,
+        }
+        assert menu_result["body"]["text"]["value"]["message"] == "menu message"
+        assert greeting_result["id"] == greeting.id
+        assert greeting_result["match"]["kind"] == "trigger"
+
+    def test_channel_and_unknown_parameters(self, uclient):
+        build_page("greeting", triggers=["hi"])
+
+        response = uclient.get("/api/v2/pages/resolve_trigger/?text=hi&sms=true")
+        assert response.json() == {"count": 0, "results": []}
+
+        response = uclient.get("/api/v2/pages/resolve_trigger/?text=hi&bogus=1")
+        assert response.status_code == 400
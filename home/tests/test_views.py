@@ -238,6 +238,48 @@ class TestPageViews:
             "message": None,
         }
 
+    def test_get_views_based_on_data(self, api_client):
+        """
+        Page views can be filtered on their data, along with the timestamp
+        """
+        page = self.create_content_page()
+        revision = page.get_latest_revision()
+        first = page.views.create(revision=revision, data={"user": "1", "tag": "a"})
+        second = page.views.create(revision=revision, data={"user": "1", "tag": "b"})
+        page.views.create(revision=revision, data={"user": "2", "tag": "a"})
+
+        response = api_client.get("/api/v2/custom/pageviews/?data__user=1")
+        assert [pv["id"] for pv in response.json()["results"]] == [first.id, second.id]
+
+        query = {"data__user": "1", "timestamp_gt": first.timestamp.isoformat()}
+        response = api_client.get(f"/api/v2/custom/pageviews/?{urlencode(query)}")
+        assert [pv["id"] for pv in response.json()["results"]] == [second.id]
+
+    def test_get_views_based_on_indexed_data(self, api_client, settings):
+        """
+        Only the indexed data keys can be filtered on, which defaults to user
+        """
+        page = self.create_content_page()
+        revision = page.get_latest_revision()
+        page_view = page.views.create(revision=revision, data={"user": "1"})
+        page.views.create(revision=revision, data={"user": "2"})
+
+        response = api_client.get("/api/v2/custom/pageviews/?data__user=1")
+        assert [pv["id"] for pv in response.json()["results"]] == [page_view.id]
+
+        response = api_client.get("/api/v2/custom/pageviews/?data__tag=a")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {
+            "data__tag": ["Filtering on this data key is not supported"]
+        }
+
+        response = api_client.get("/api/v2/custom/pageviews/?data__user__gt=1")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        settings.PAGE_VIEW_INDEXED_DATA_KEYS = ["user", "tag"]
+        response = api_client.get("/api/v2/custom/pageviews/?data__tag=a")
+        assert response.status_code == status.HTTP_200_OK
+
     def test_page_view_uses_live_revision_when_draft_exists(self, api_client):
         page = self.create_content_page()
         live_revision = page.live_revision
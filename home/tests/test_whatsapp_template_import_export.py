@@ -259,7 +259,8 @@ class ImportExport:
         Export all (or filtered) content in the configured format.
         """
         url = f"/admin/snippets/home/whatsapptemplate/?export={self.format}"
-        content = self.admin_client.get(url).content
+        response = self.admin_client.get(url)
+        content = b"".join(response.streaming_content)
         # Hopefully we can get rid of this at some point.
         if self.format == "csv":
             print("-v-CONTENT-v-")
@@ -0,0 +1,170 @@
+"""
+An in-process index of the triggers and quick replies of live content pages, so
+that a user's message can be matched against all of them in one request, see
+`ContentPagesViewSet.resolve_trigger_view`.
+
+Trigger names and messages are normalised the same way: accents are removed, the
+text is casefolded, and it's split into words on whitespace, with any punctuation
+stripped from the ends of each word. Each locale's triggers are kept in a trie of
+words, so finding every trigger in a message is a walk of the trie from each word
+in the message, however many triggers there are, and triggers only ever match
+whole words.
+
+Each process builds a locale's trie the first time it's used. Publishing,
+unpublishing or deleting a page, or renaming or deleting a trigger, moves that
+locale's version in the cache on to a new one (see home/signals.py), and each
+process rebuilds only that locale's trie the next time it's used.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from wagtail.models import Locale
+
+from .models import QuickReplyContent, TriggeredContent
+
+VERSION_KEY = "trigger-index:version:{}"
+
+TRIGGER = "trigger"
+QUICK_REPLY = "quick_reply"
+
+EDGE_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+@dataclass(frozen=True)
+class Keyword:
+    page_id: int
+    name: str
+    kind: str
+
+
+@dataclass(frozen=True)
+class Match:
+    keyword: Keyword
+    # The words of the message that matched
+    start: int
+    end: int
+    # Whether the keyword is the whole message
+    exact: bool
+
+
+@dataclass
+class Trie:
+    children: dict[str, "Trie"] = field(default_factory=dict)
+    keywords: list[Keyword] = field(default_factory=list)
+
+    def add(self, words: list[str], keyword: Keyword) -> None:
+        node = self
+        for word in words:
+            node = node.children.setdefault(word, Trie())
+        node.keywords.append(keyword)
+
+    def find(self, words: list[str]) -> Iterator[Match]:
+        for start in range(len(words)):
+            node: Trie | None = self
+            for end in range(start + 1, len(words) + 1):
+                node = node.children.get(words[end - 1])
+                if node is None:
+                    break
+                exact = start == 0 and end == len(words)
+                for keyword in node.keywords:
+                    yield Match(keyword, start, end, exact)
+
+
+def normalise(text: str) -> list[str]:
+    """
+    The words of the text, without accents, casefolded and without punctuation
+    around them. Words that are only punctuation, e.g. "?", are kept as they are.
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return [EDGE_PUNCTUATION.sub("", word) or word for word in text.split()]
+
+
+def build_trie(language_code: str) -> Trie:
+    trie = Trie()
+    for model, kind in [(TriggeredContent, TRIGGER), (QuickReplyContent, QUICK_REPLY)]:
+        items = model.objects.filter(
+            content_object__live=True,
+            content_object__locale__language_code=language_code,
+        ).values_list("content_object_id", "tag__name")
+        for page_id, name in items:
+            words = normalise(name)
+            if words:
+                trie.add(words, Keyword(page_id, name, kind))
+    return trie
+
+
+_lock = threading.Lock()
+_tries: dict[str, tuple[int, Trie]] = {}
+
+
+def get_versions(language_codes: Iterable[str]) -> dict[str, int]:
+    keys = {VERSION_KEY.format(code): code for code in language_codes}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # Start from somewhere new, like the API cache versions, so that a version
+        # that's been evicted can't match a trie built before it was evicted
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_trie(language_code: str, version: int) -> Trie:
+    with _lock:
+        cached = _tries.get(language_code)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    # If the locale changes while we're building, we save the trie under the old
+    # version, so that it's rebuilt again the next time it's used
+    trie = build_trie(language_code)
+    with _lock:
+        _tries[language_code] = (version, trie)
+    return trie
+
+
+def find_matches(text: str, language_codes: Iterable[str]) -> list[Match]:
+    """
+    The best match for each page with a trigger or quick reply in the text. Matches
+    of the whole message come first, then the longest matches, then the earliest
+    ones, with triggers before quick replies.
+    """
+    words = normalise(text)
+    if not words:
+        return []
+    matches = [
+        match
+        for language_code, version in get_versions(language_codes).items()
+        for match in get_trie(language_code, version).find(words)
+    ]
+    matches.sort(
+        key=lambda m: (
+            not m.exact,
+            m.start - m.end,
+            m.start,
+            m.keyword.kind != TRIGGER,
+            m.keyword.page_id,
+        )
+    )
+    best: dict[int, Match] = {}
+    for match in matches:
+        best.setdefault(match.keyword.page_id, match)
+    return list(best.values())
+
+
+def invalidate(language_code: str) -> None:
+    key = VERSION_KEY.format(language_code)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_all() -> None:
+    for language_code in Locale.objects.values_list("language_code", flat=True):
+        invalidate(language_code)
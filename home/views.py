@@ -1,7 +1,5 @@
 import json
 import logging
-import queue
-import threading
 from pathlib import Path
 from typing import Any
 
@@ -10,17 +8,18 @@ import markdown
 from django.conf import settings
 from django.contrib import messages
 from django.db import connection as db_connection
-from django.db.models import Count, F, Q
-from django.db.models.functions import TruncMonth
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
 from django.forms import MultiWidget
 from django.forms.widgets import NumberInput
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django_filters import rest_framework as filters
 from rest_framework import permissions
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.mixins import CreateModelMixin, ListModelMixin
 from rest_framework.pagination import CursorPagination
@@ -42,10 +41,24 @@ from wagtail.snippets.views.snippets import IndexView as IndexViewWhatsAppTempla
 
 from home.whatsapp import submit_to_meta_action
 
-from .assessment_import_export import import_assessment
-from .content_import_export import import_content
-from .forms import UploadContentFileForm, UploadOrderedContentSetFileForm
-from .import_helpers import ImportAssessmentException, ImportException
+from .data_export import (
+    RESUME_TOKEN_PARAM,
+    CSVRenderer,
+    NDJSONRenderer,
+    stream_export,
+)
+from .forms import (
+    UploadContentFileForm,
+    UploadFileForm,
+    UploadOrderedContentSetFileForm,
+)
+from .import_jobs import (
+    create_job,
+    fail_stopped_job,
+    get_partition_progress,
+    get_progress,
+    is_stopped,
+)
 from .mixins import (
     SpreadsheetExportMixin,
     SpreadsheetExportMixinAssessment,
@@ -55,14 +68,11 @@ from .mixins import (
 from .models import (
     ContentPage,
     ContentPageRating,
-    OrderedContentSet,
+    ImportJob,
     PageView,
+    PageViewCount,
 )
-from .ordered_content_import_export import import_ordered_sets
 from .serializers import ContentPageRatingSerializer, PageViewSerializer
-from .whatsapp_template_import_export import (
-    import_whatsapptemplate,
-)
 
 logger = logging.getLogger(__name__)
 
@@ -191,6 +201,24 @@ class PageViewFilterSet(WagtailFilterSet):
         fields = ["timestamp", "platform", "page"]
 
 
+class PageViewCountFilterSet(WagtailFilterSet):
+    """
+    The same filters as PageViewFilterSet, for the daily page view counts
+    """
+
+    timestamp = django_filters.DateFromToRangeFilter(
+        field_name="date",
+        label=_("Date Range"),
+        widget=MultiWidget(widgets=[AdminDateInput, AdminDateInput]),
+    )
+    platform = django_filters.ChoiceFilter(choices=PageViewFilterSet.platform_choices)
+    page = django_filters.ModelChoiceFilter(queryset=ContentPage.objects)
+
+    class Meta:
+        model = PageViewCount
+        fields = ["timestamp", "platform", "page"]
+
+
 class ContentPageReportView(ReportView):
     header_icon = "time"
     title = "Content Pages"
@@ -204,18 +232,20 @@ class ContentPageReportView(ReportView):
     )
 
     def get_queryset(self):
-        return ContentPage.objects.annotate(view_counter=Count("views")).all()
+        return ContentPage.objects.annotate(
+            view_counter=Coalesce(Sum("view_counts__count"), 0)
+        ).all()
 
 
 class PageViewReportView(ReportView):
     header_icon = "doc-empty"
     title = "Page views"
     template_name = "reports/page_view_report.html"
-    filterset_class = PageViewFilterSet
+    filterset_class = PageViewCountFilterSet
     paginate_by = None
 
     def get_queryset(self):
-        return PageView.objects.all()
+        return PageViewCount.objects.all()
 
     def get_filtered_queryset(self):
         return self.filter_queryset(self.get_queryset())
@@ -223,13 +253,13 @@ class PageViewReportView(ReportView):
     def get_views_data(self):
         view_per_month = list(
             self.get_filtered_queryset()[1]
-            .annotate(month=TruncMonth("timestamp"))
+            .annotate(month=TruncMonth("date"))
             .values("month")
-            .annotate(x=F("month"), y=Count("page_id"))
+            .annotate(x=F("month"), y=Sum("count"))
             .values("x", "y")
         )
         view_per_month.sort(key=lambda item: item["x"])
-        labels = [item["x"].date() for item in view_per_month]
+        labels = [item["x"] for item in view_per_month]
         return {"data": view_per_month, "labels": labels}
 
     def get_context_data(self, **kwargs):
@@ -240,381 +270,107 @@ class PageViewReportView(ReportView):
         return context
 
 
-class UploadThread(threading.Thread):
-    def __init__(self, file, file_type, **kwargs):
-        self.file = file
-        self.file_type = file_type
-        self.result_queue = queue.Queue()
-        self.progress_queue = queue.Queue()
-        super().__init__(**kwargs)
-
-
-class ContentUploadThread(UploadThread):
-    def __init__(self, purge, locale, **kwargs):
-        self.purge = purge
-        self.locale = locale
-        super().__init__(**kwargs)
-
-    def run(self) -> None:
-        warnings = []
-        try:
-            importer = import_content(
-                self.file, self.file_type, self.progress_queue, self.purge, self.locale
-            )
-
-        except ImportException as e:
-            self.result_queue.put(
-                (
-                    messages.ERROR,
-                    [
-                        f"Content import failed on row {e.row_num}: {msg}"
-                        for msg in e.message
-                    ],
-                )
-            )
-        except Exception:
-            self.result_queue.put((messages.ERROR, ["Content import failed"]))
-            logger.exception("Content import failed")
-        else:
-            warnings = importer.import_warnings
-            if warnings:
-                self.result_queue.put(
-                    (
-                        messages.WARNING,
-                        [
-                            "Content import successful",
-                            *[
-                                f"row {warning.row_num}: {warning.message}"
-                                for warning in warnings
-                            ],
-                        ],
-                    )
-                )
-            else:
-                self.result_queue.put((messages.SUCCESS, ["Content import successful"]))
-
-        # Wait until the user has fetched the result message to close the thread
-        self.result_queue.join()
-
-
-class AssessmentUploadThread(UploadThread):
-    def __init__(self, purge, locale, **kwargs):
-        self.purge = purge
-        self.locale = locale
-        super().__init__(**kwargs)
-
-    def run(self):
-        try:
-            import_assessment(
-                self.file, self.file_type, self.progress_queue, self.purge, self.locale
-            )
-        except ImportAssessmentException as e:
-            self.result_queue.put(
-                (
-                    messages.ERROR,
-                    f"CMS Forms import failed on row {e.row_num}: {e.message}",
-                )
-            )
-        except ImportException as e:
-            self.result_queue.put(
-                (
-                    messages.ERROR,
-                    [
-                        f"CMS Forms import failed on row {e.row_num}: {msg}"
-                        for msg in e.message
-                    ],
-                )
-            )
-        except Exception:
-            self.result_queue.put((messages.ERROR, "CMS Forms import failed"))
-            logger.exception("CMS Forms import failed")
-        else:
-            self.result_queue.put((messages.SUCCESS, "CMS Forms import successful"))
-        # Wait until the user has fetched the result message to close the thread
-        self.result_queue.join()
-
-
-class OrderedContentSetUploadThread(UploadThread):
-    def __init__(self, purge, **kwargs):
-        self.purge = purge
-        super().__init__(**kwargs)
-
-    def run(self):
-        try:
-            import_ordered_sets(self.file, self.file_type, self.progress_queue)
-        except ImportException as e:
-            self.result_queue.put(
-                (
-                    messages.ERROR,
-                    [
-                        f"Ordered content set import failed on row {e.row_num}: {msg}"
-                        for msg in e.message
-                    ],
-                )
-            )
-        except Exception:
-            self.result_queue.put((messages.ERROR, "Ordered content set import failed"))
-            logger.exception("Ordered content set import failed")
-
-        else:
-            self.result_queue.put(
-                (messages.SUCCESS, "Ordered content set import successful")
-            )
-        # Wait until the user has fetched the result message to close the thread
-        self.result_queue.join()
-
+class ImportJobUploadView(View):
+    """
+    Saves uploaded files as import jobs, see home/import_jobs.py. While a job is
+    running, the page polls for its progress, and then shows its result.
+    """
 
-class OrderedContentSetUploadView(View):
-    form_class = UploadOrderedContentSetFileForm
-    template_name = "orderedcontentset_upload.html"
+    form_class: type[UploadFileForm] = UploadContentFileForm
+    template_name: str
+    job_kind: str
+
+    def get_job_options(self, form: UploadFileForm) -> dict[str, Any]:
+        return {
+            "purge": form.cleaned_data["purge"] == "True",
+            "locale": form.cleaned_data["locale"],
+        }
+
+    def get_running_job(self) -> ImportJob | None:
+        return (
+            ImportJob.objects.filter(kind=self.job_kind, partition_of=None)
+            .exclude(status=ImportJob.Status.FINISHED)
+            .order_by("-created_at")
+            .first()
+        )
 
     def get(self, request, *args, **kwargs):
-        thread = next(
-            (
-                t
-                for t in threading.enumerate()
-                if t.name == "OrderedContentSetUploadThread"
-            ),
-            None,
-        )
         if request.headers.get("x-requested-with") == "XMLHttpRequest":
-            if not thread:
-                return JsonResponse({"loading": False})
-            try:
-                # If there's a result message from the thread, send it to the user,
-                # and call task_done to end the thread.
-                level, text = thread.result_queue.get_nowait()
-                messages.add_message(request, level, text)
-                thread.result_queue.task_done()
-                return JsonResponse({"loading": False})
-            except queue.Empty:
-                # No message means that the task is still running
-                # Get the latest task progress and return that too
-                progress = None
-                try:
-                    while True:
-                        progress = thread.progress_queue.get_nowait()
-                except queue.Empty:
-                    pass
-
-                return JsonResponse({"loading": True, "progress": progress})
+            return self.get_job_state(request)
         form = self.form_class()
+        job = self.get_running_job()
         return render(
-            request, self.template_name, {"form": form, "loading": thread is not None}
+            request,
+            self.template_name,
+            {"form": form, "loading": job is not None, "job": job},
         )
 
-    def post(self, request, *args, **kwargs):
-        form = self.form_class(request.POST, request.FILES)
-        if form.is_valid():
-            if form.cleaned_data["purge"] == "True":
-                OrderedContentSet.objects.all().delete()
-            OrderedContentSetUploadThread(
-                form.cleaned_data["purge"],
-                file=request.FILES["file"],
-                file_type=form.cleaned_data["file_type"],
-                name="OrderedContentSetUploadThread",
-            ).start()
-            loading = "OrderedContentSetUploadThread" in [
-                th.name for th in threading.enumerate()
-            ]
-            return render(
-                request, self.template_name, {"form": form, "loading": loading}
+    def get_job_state(self, request):
+        job_id = request.GET.get("job", "")
+        if job_id.isdigit():
+            job = ImportJob.objects.filter(kind=self.job_kind, pk=job_id).first()
+        else:
+            job = self.get_running_job()
+        if job is None:
+            return JsonResponse({"loading": False})
+        if settings.IMPORT_JOB_RUNNER == "thread":
+            for stopped_job in [job, *job.partitions.all()]:
+                if is_stopped(stopped_job):
+                    fail_stopped_job(stopped_job)
+            job.refresh_from_db()
+        if job.status == ImportJob.Status.SPLIT:
+            locales = get_partition_progress(job)
+            progress = sum(locales.values()) // max(len(locales), 1)
+            return JsonResponse(
+                {"loading": True, "progress": progress, "locales": locales}
             )
-
-
-class ContentUploadView(View):
-    form_class = UploadContentFileForm
-    template_name = "upload.html"
-
-    def get(self, request, *args, **kwargs):
-        thread = next(
-            (t for t in threading.enumerate() if t.name == "ContentUploadThread"), None
-        )
-        if request.headers.get("x-requested-with") == "XMLHttpRequest":
-            if not thread:
-                return JsonResponse({"loading": False})
-
-            try:
-                # If there's a result message from the thread, send it to the user,
-                # and call task_done to end the thread.
-                level, texts = thread.result_queue.get_nowait()
-                if isinstance(texts, str):
-                    text = [texts]
-                for text in texts:
-                    messages.add_message(request, level, text)
-                thread.result_queue.task_done()
-                return JsonResponse({"loading": False})
-            except queue.Empty:
-                # No message means that the task is still running
-                # Get the latest task progress and return that too
-                progress = None
-                try:
-                    while True:
-                        progress = thread.progress_queue.get_nowait()
-                except queue.Empty:
-                    pass
-
-                return JsonResponse({"loading": True, "progress": progress})
-        form = self.form_class()
-        return render(
-            request, self.template_name, {"form": form, "loading": thread is not None}
+        if job.status != ImportJob.Status.FINISHED:
+            return JsonResponse({"loading": True, "progress": get_progress(job.pk)})
+        # Only show the result once, to the first user to see that it's finished
+        shown = ImportJob.objects.filter(pk=job.pk, result_shown=False).update(
+            result_shown=True
         )
+        if shown:
+            for text in job.result_messages:
+                messages.add_message(request, job.result_level, text)
+        return JsonResponse({"loading": False})
 
     def post(self, request, *args, **kwargs):
         form = self.form_class(request.POST, request.FILES)
         if form.is_valid():
-            ContentUploadThread(
-                form.cleaned_data["purge"],
-                form.cleaned_data["locale"],
-                file=request.FILES["file"],
-                file_type=form.cleaned_data["file_type"],
-                name="ContentUploadThread",
-            ).start()
-            loading = "ContentUploadThread" in [th.name for th in threading.enumerate()]
+            job = create_job(
+                self.job_kind,
+                request.FILES["file"],
+                form.cleaned_data["file_type"],
+                **self.get_job_options(form),
+            )
             return render(
-                request, self.template_name, {"form": form, "loading": loading}
+                request, self.template_name, {"form": form, "loading": True, "job": job}
             )
 
 
-class AssessmentUploadView(View):
-    form_class = UploadContentFileForm
-    template_name = "assessment_upload.html"
+class OrderedContentSetUploadView(ImportJobUploadView):
+    form_class = UploadOrderedContentSetFileForm
+    template_name = "orderedcontentset_upload.html"
+    job_kind = ImportJob.Kind.ORDERED_CONTENT_SET
 
-    def get(self, request, *args, **kwargs):
-        thread = next(
-            (t for t in threading.enumerate() if t.name == "AssessmentUploadThread"),
-            None,
-        )
-        if request.headers.get("x-requested-with") == "XMLHttpRequest":
-            if not thread:
-                return JsonResponse({"loading": False})
+    def get_job_options(self, form: UploadFileForm) -> dict[str, Any]:
+        return {"purge": form.cleaned_data["purge"] == "True"}
 
-            try:
-                # If there's a result message from the thread, send it to the user,
-                # and call task_done to end the thread.
-                level, text = thread.result_queue.get_nowait()
-                messages.add_message(request, level, text)
-                thread.result_queue.task_done()
-                return JsonResponse({"loading": False})
-            except queue.Empty:
-                # No message means that the task is still running
-                # Get the latest task progress and return that too
-                progress = None
-                try:
-                    while True:
-                        progress = thread.progress_queue.get_nowait()
-                except queue.Empty:
-                    pass
-
-                return JsonResponse({"loading": True, "progress": progress})
-        form = self.form_class()
-        return render(
-            request, self.template_name, {"form": form, "loading": thread is not None}
-        )
-
-    def post(self, request, *args, **kwargs):
-        form = self.form_class(request.POST, request.FILES)
-        if form.is_valid():
-            AssessmentUploadThread(
-                form.cleaned_data["purge"],
-                form.cleaned_data["locale"],
-                file=request.FILES["file"],
-                file_type=form.cleaned_data["file_type"],
-                name="AssessmentUploadThread",
-            ).start()
-            loading = "AssessmentUploadThread" in [
-                th.name for th in threading.enumerate()
-            ]
-            return render(
-                request, self.template_name, {"form": form, "loading": loading}
-            )
 
+class ContentUploadView(ImportJobUploadView):
+    template_name = "upload.html"
+    job_kind = ImportJob.Kind.CONTENT
 
-class WhatsAppTemplateUploadThread(UploadThread):
-    def __init__(self, purge, locale, **kwargs):
-        self.purge = purge
-        self.locale = locale
-        super().__init__(**kwargs)
 
-    def run(self) -> None:
-        try:
-            import_whatsapptemplate(
-                self.file, self.file_type, self.progress_queue, self.purge, self.locale
-            )
-        except ImportException as e:
-            self.result_queue.put(
-                (
-                    messages.ERROR,
-                    f"WhatsAppTemplate import failed on row {e.row_num}: {e.message}",
-                )
-            )
-        except Exception:
-            self.result_queue.put((messages.ERROR, "WhatsAppTemplate import failed"))
-            logger.exception("WhatsAppTemplate import failed")
-        else:
-            self.result_queue.put(
-                (messages.SUCCESS, "WhatsAppTemplate import successful")
-            )
-        # Wait until the user has fetched the result message to close the thread
-        self.result_queue.join()
+class AssessmentUploadView(ImportJobUploadView):
+    template_name = "assessment_upload.html"
+    job_kind = ImportJob.Kind.ASSESSMENT
 
 
-class WhatsAppTemplateUploadView(View):
-    form_class = UploadContentFileForm
+class WhatsAppTemplateUploadView(ImportJobUploadView):
     template_name = "whatsapptemplate_upload.html"
-
-    def get(self, request, *args, **kwargs):
-        thread = next(
-            (
-                t
-                for t in threading.enumerate()
-                if t.name == "WhatsAppTemplateUploadThread"
-            ),
-            None,
-        )
-        if request.headers.get("x-requested-with") == "XMLHttpRequest":
-            if not thread:
-                return JsonResponse({"loading": False})
-
-            try:
-                # If there's a result message from the thread, send it to the user,
-                # and call task_done to end the thread.
-                level, text = thread.result_queue.get_nowait()
-                messages.add_message(request, level, text)
-                thread.result_queue.task_done()
-                return JsonResponse({"loading": False})
-            except queue.Empty:
-                # No message means that the task is still running
-                # Get the latest task progress and return that too
-                progress = None
-                try:
-                    while True:
-                        progress = thread.progress_queue.get_nowait()
-                except queue.Empty:
-                    pass
-
-                return JsonResponse({"loading": True, "progress": progress})
-        form = self.form_class()
-        return render(
-            request, self.template_name, {"form": form, "loading": thread is not None}
-        )
-
-    def post(self, request, *args, **kwargs):
-        form = self.form_class(request.POST, request.FILES)
-        if form.is_valid():
-            WhatsAppTemplateUploadThread(
-                form.cleaned_data["purge"],
-                form.cleaned_data["locale"],
-                file=request.FILES["file"],
-                file_type=form.cleaned_data["file_type"],
-                name="WhatsAppTemplateUploadThread",
-            ).start()
-            loading = "WhatsAppTemplateUploadThread" in [
-                th.name for th in threading.enumerate()
-            ]
-            return render(
-                request, self.template_name, {"form": form, "loading": loading}
-            )
+    job_kind = ImportJob.Kind.WHATSAPP_TEMPLATE
 
 
 def CursorPaginationFactory(field):
@@ -633,17 +389,55 @@ def CursorPaginationFactory(field):
     return CustomCursorPagination
 
 
-class PageViewFilter(filters.FilterSet):
+class DataFilterSet(filters.FilterSet):
+    """
+    As well as the declared filters, rows can be filtered on the values in their
+    data, e.g. `data__user=123`.
+    """
+
     timestamp_gt = filters.IsoDateTimeFilter(field_name="timestamp", lookup_expr="gt")
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        for param, value in self.data.items():
+            if param.startswith("data__"):
+                queryset = queryset.filter(self.get_data_filter(param, value))
+        return queryset
+
+    def get_indexed_data_keys(self) -> list[str] | None:
+        """
+        The data keys that can be filtered on, or None to allow any key
+        """
+        return None
+
+    def get_data_filter(self, param: str, value: str) -> Q:
+        path = param.removeprefix("data__")
+        indexed_keys = self.get_indexed_data_keys()
+        if indexed_keys is not None and path not in indexed_keys:
+            raise ValidationError(
+                {param: ["Filtering on this data key is not supported"]}
+            )
+        if "__" not in path and db_connection.vendor == "postgresql":
+            # Containment, rather than a key lookup, can use a GIN index
+            return Q(data__contains={path: value})
+        return Q(**{param: value})
+
+
+class PageViewFilter(DataFilterSet):
+    """
+    Only the keys in PAGE_VIEW_INDEXED_DATA_KEYS can be filtered on, so that every
+    data filter can use the index on the data field.
+    """
+
     class Meta:
         model = PageView
         fields: list = []
 
+    def get_indexed_data_keys(self) -> list[str] | None:
+        return settings.PAGE_VIEW_INDEXED_DATA_KEYS or []
 
-class ContentPageRatingFilter(filters.FilterSet):
-    timestamp_gt = filters.IsoDateTimeFilter(field_name="timestamp", lookup_expr="gt")
 
+class ContentPageRatingFilter(DataFilterSet):
     class Meta:
         model = ContentPageRating
         fields: list = []
@@ -656,6 +450,26 @@ class GenericListViewset(GenericViewSet, ListModelMixin):
     authentication_classes = (TokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Streams every matching row as NDJSON or CSV, instead of a page at a time.
+        Takes the same filters as the list, and a resume token from the end of a
+        previous export.
+        """
+        queryset = self.filter_queryset(self.queryset)
+        export_format = request.accepted_renderer.format
+        rows = stream_export(
+            queryset, export_format, request.GET.get(RESUME_TOKEN_PARAM)
+        )
+        response = StreamingHttpResponse(
+            rows, content_type=request.accepted_renderer.media_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.basename}.{export_format}"'
+        )
+        return response
+
 
 class PageViewViewSet(GenericListViewset):
     queryset = PageView.objects.all()
@@ -663,13 +477,8 @@ class PageViewViewSet(GenericListViewset):
     filterset_class = PageViewFilter
 
     def get_queryset(self):
-        # filter the queryset by data jsonfield:
         queryset = self.queryset
 
-        for key, value in self.request.GET.items():
-            if "data__" in key:
-                queryset = queryset.filter(**{key: value})
-
         # Only return unique pages
         if self.request.GET.get("unique_pages", False) == "true":
             if db_connection.vendor == "postgresql":
@@ -1,7 +1,7 @@
+from collections.abc import Iterator
 from logging import getLogger
 
 from django.db import transaction  # type: ignore
-from django.http import HttpResponse  # type: ignore
 from wagtail.query import PageQuerySet  # type: ignore
 
 from .export_whatsapp_templates import (
@@ -13,20 +13,16 @@ from .import_whatsapp_templates import WhatsAppTemplateImporter
 logger = getLogger(__name__)
 
 
-def export_xlsx_whatsapp_template(
-    queryset: PageQuerySet, response: HttpResponse
-) -> None:
+def export_xlsx_whatsapp_template(queryset: PageQuerySet) -> Iterator[bytes]:
     exporter = WhatsAppTemplateExporter(queryset)
     export_rows = exporter.perform_export()
-    WhatsAppTemplateExportWriter(export_rows).write_xlsx(response)
+    return WhatsAppTemplateExportWriter(export_rows).write_xlsx()
 
 
-def export_csv_whatsapp_template(
-    queryset: PageQuerySet, response: HttpResponse
-) -> None:
+def export_csv_whatsapp_template(queryset: PageQuerySet) -> Iterator[str]:
     exporter = WhatsAppTemplateExporter(queryset)
     export_rows = exporter.perform_export()
-    WhatsAppTemplateExportWriter(export_rows).write_csv(response)
+    return WhatsAppTemplateExportWriter(export_rows).write_csv()
 
 
 @transaction.atomic